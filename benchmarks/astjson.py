@@ -0,0 +1,105 @@
+"""Throughput and peak memory of writing an AST to a file: `json` against `astjson.dump` and `serialize.dumps`,
+and the time to get the nodes back from what was written, compared to parsing the source again.
+
+`json.dump` streams, but through the encoder written in Python; `json.dumps` without indentation encodes in C,
+but builds the whole text first.
+
+Run with `python -m benchmarks.astjson [--size BYTES] [--shape SHAPE]`.
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+
+from benchmarks.corpus import SHAPES
+from nyr.parser import astjson
+from nyr.parser import node
+from nyr.parser import serialize
+from nyr.parser.parser import Parser
+
+
+def _time(function: Callable[[], Any], repeat: int) -> float:
+	"""Best time of `function()` in seconds, with the garbage collector off"""
+	best = float("inf")
+	for _ in range(repeat):
+		gc.collect()
+		gc.disable()
+		try:
+			start = time.perf_counter()
+			function()
+			best = min(best, time.perf_counter() - start)
+		finally:
+			gc.enable()
+	return best
+
+
+def _peak(function: Callable[[], Any]) -> int:
+	"""Bytes allocated at most while `function()` runs"""
+	gc.collect()
+	tracemalloc.start()
+	function()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return peak
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=2_000_000, type=int, help="Size of the program in bytes")
+	argparser.add_argument("--shape", default="mixed", choices=SHAPES, help="Shape of the program")
+	argparser.add_argument("--repeat", default=3, type=int, help="Number of runs, the fastest one counts")
+	args = argparser.parse_args(arguments)
+
+	source = SHAPES[args.shape](args.size)
+	program = Parser().parse(source)
+
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "ast")
+
+		def textWriter(write: Callable[[Any], None]) -> Callable[[], None]:
+			def run():
+				with open(path, "w") as f:
+					write(f)
+			return run
+
+		def binaryWriter():
+			with open(path, "wb") as f:
+				f.write(serialize.dumps(program))
+
+		print(f"{'writer':<24} {'output':>10} {'time':>9} {'MB/s':>8} {'peak memory':>12}")
+		for name, write in (
+			("json.dump, indented", textWriter(lambda f: json.dump(program, f, cls=node.ComplexEncoder, indent=2))),
+			("astjson.dump, indented", textWriter(lambda f: astjson.dump(program, f, 2))),
+			("json.dump, compact", textWriter(lambda f: json.dump(program, f, cls=node.ComplexEncoder, separators=(",", ":")))),
+			("json.dumps, compact", textWriter(lambda f: f.write(json.dumps(program, cls=node.ComplexEncoder, separators=(",", ":"))))),
+			("astjson.dump, compact", textWriter(lambda f: astjson.dump(program, f, None))),
+			("serialize.dumps", binaryWriter),
+		):
+			seconds = _time(write, args.repeat)
+			size = os.path.getsize(path)
+			peak = _peak(write)
+			print(f"{name:<24} {size / 2 ** 20:>6.1f} MiB {seconds:8.3f}s {size / 1e6 / seconds:8.1f} {peak / 2 ** 20:>8.1f} MiB")
+
+	print(f"\n{'reader':<24} {'time':>9}")
+	indented = astjson.dumps(program, 2)
+	compact = astjson.dumps(program, None)
+	binary = serialize.dumps(program)
+	for name, read in (
+		("Parser.parse", lambda: Parser().parse(source)),
+		("astjson.loads, indented", lambda: astjson.loads(indented)),
+		("astjson.loads, compact", lambda: astjson.loads(compact)),
+		("serialize.loads", lambda: serialize.loads(binary)),
+	):
+		print(f"{name:<24} {_time(read, args.repeat):8.3f}s")
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""Throughput of `nyr.batch` with an increasing number of worker processes.
+
+Run with `python -m benchmarks.batch [--files N] [--size BYTES]`.
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from benchmarks.corpus import mixed
+from nyr.batch import parseFiles
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--files", default=400, type=int, help="Number of files")
+	argparser.add_argument("--size", default=20_000, type=int, help="Size of each file in bytes")
+	argparser.add_argument("--jobs", default=os.cpu_count() or 1, type=int, help="Highest number of worker processes")
+	args = argparser.parse_args(arguments)
+
+	with tempfile.TemporaryDirectory() as directory:
+		source = mixed(args.size)
+		paths = []
+		for i in range(args.files):
+			path = Path(directory) / f"file{i}.nyr"
+			path.write_text(source)
+			paths.append(path)
+
+		total = args.files * len(source) / 2 ** 20
+		print(f"input: {args.files} files, {total:.1f} MiB, {os.cpu_count()} CPUs")
+
+		jobs = 1
+		single = None
+		while True:
+			start = time.perf_counter()
+			results = list(parseFiles(paths, jobs, useCache=False))
+			elapsed = time.perf_counter() - start
+			assert all(result.ok for result in results)
+
+			single = single or elapsed
+			print(f"{jobs:3} jobs: {elapsed:7.2f} s, {total / elapsed:6.2f} MiB/s, {single / elapsed:5.2f}x")
+
+			if jobs >= args.jobs:
+				break
+			jobs = min(2 * jobs, args.jobs)
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,81 @@
+"""Synthetic nyr programs of controllable size and shape.
+
+Every generator takes the approximate size of the program in bytes and returns its source;
+`SHAPES` maps the shape names used on the command line of the benchmarks to the generators.
+"""
+from collections.abc import Callable
+
+from benchmarks.tokenizer import SNIPPET
+
+# Nesting depth of the `nesting` shape, the recursive descent parser runs out of stack at ~35
+DEPTH = 24
+
+
+def _repeat(template: str, size: int, **fields: object) -> str:
+	"""Concatenates `template.format(i=i, **fields)` for i = 0, 1, ... until it is `size` bytes long"""
+	parts: list[str] = []
+	total = 0
+	i = 0
+	while total < size:
+		part = template.format(i=i, **fields)
+		parts.append(part)
+		total += len(part)
+		i += 1
+	return "".join(parts)
+
+
+def functions(size: int) -> str:
+	"""Many small function declarations, each called once"""
+	return _repeat(
+		"def f{i}(a, b) {{\n\tlet c = a * b + {i};\n\tif (c > 10) {{\n\t\treturn c - b;\n\t}}\n\treturn c;\n}}\nf{i}({i}, 2);\n",
+		size,
+	)
+
+
+def statements(size: int) -> str:
+	"""One long flat list of simple statements"""
+	return _repeat("let v{i} = {i};\nv{i} += v{i} * 2 - 1;\nx.y = v{i};\n", size)
+
+
+def nesting(size: int, depth: int = DEPTH) -> str:
+	"""Statements whose expressions are nested `depth` levels deep"""
+	expression = "{i}"
+	for level in range(depth):
+		expression = ("(# + 1)", "-#", "f(#, 2)", "a[#]", "(# * 2 == 4)")[level % 5].replace("#", expression)
+	return _repeat("let x{i} = " + expression + ";\n", size)
+
+
+def expressions(size: int) -> str:
+	"""Long expressions using the operators of every precedence level"""
+	return _repeat("x{i} = a + b * {i} - c / d % e == f < g && h | i ^ j & k || !l;\n", size)
+
+
+def strings(size: int, length: int = 4096) -> str:
+	"""Few tokens, each a long string literal"""
+	return _repeat('let s{i} = "{text}";\n', size, text="lorem ipsum " * (length // 12))
+
+
+def comments(size: int) -> str:
+	"""Code that is mostly line and block comments"""
+	return _repeat(
+		"// line comment {i}, explaining in detail what follows\n"
+		"/* block comment {i}\n * spanning\n * several lines\n */\n"
+		"let c{i} = {i}; // trailing comment\n",
+		size,
+	)
+
+
+def mixed(size: int) -> str:
+	"""A mix of all constructs, as in `benchmarks.tokenizer`"""
+	return _repeat(SNIPPET, size)
+
+
+SHAPES: dict[str, Callable[[int], str]] = {
+	"functions": functions,
+	"statements": statements,
+	"nesting": nesting,
+	"expressions": expressions,
+	"strings": strings,
+	"comments": comments,
+	"mixed": mixed,
+}
@@ -0,0 +1,89 @@
+"""Memory, conversion and transfer costs of `FlatAst` compared to node objects.
+
+Transferring is what writing a tree to disk or sending it to another process costs: turning it into
+bytes and back, for `FlatAst.toBytes` / `fromBytes`, `serialize.dumps` / `loads` and pickling the nodes.
+
+Run with `python -m benchmarks.flat [--size BYTES]`.
+"""
+import argparse
+import gc
+import pickle
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+
+from benchmarks.corpus import mixed
+from nyr.parser import serialize
+from nyr.parser.flat import FlatAst
+from nyr.parser.parser import Parser
+
+
+def _time(function: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+	"""Returns the result of `function()` and its best time in seconds, with the garbage collector off"""
+	best = float("inf")
+	result = None
+	for _ in range(repeat):
+		gc.collect()
+		gc.disable()
+		try:
+			start = time.perf_counter()
+			result = function()
+			best = min(best, time.perf_counter() - start)
+		finally:
+			gc.enable()
+	return result, best
+
+
+def _retained(function: Callable[[], Any]) -> tuple[Any, int]:
+	"""Returns the result of `function()` and the bytes it keeps alive"""
+	gc.collect()
+	tracemalloc.start()
+	before, _ = tracemalloc.get_traced_memory()
+	result = function()
+	gc.collect()
+	retained = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+	return result, retained
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=2_000_000, type=int, help="Size of the program in bytes")
+	argparser.add_argument("--repeat", default=3, type=int, help="Number of runs, the fastest one counts")
+	args = argparser.parse_args(arguments)
+
+	source = mixed(args.size)
+	program, objectBytes = _retained(lambda: Parser().parse(source))
+	flat, flatBytes = _retained(lambda: FlatAst.fromProgram(program))
+	nodes = len(flat)
+	print(f"input: {len(source) / 2 ** 20:.1f} MiB, {nodes} nodes")
+	print(f"memory    objects {objectBytes / nodes:6.1f} B/node, flat {flatBytes / nodes:6.1f} B/node")
+
+	_, toFlat = _time(lambda: FlatAst.fromProgram(program), args.repeat)
+	_, toObjects = _time(flat.toProgram, args.repeat)
+	print(f"convert   to flat {toFlat:6.3f} s, to objects {toObjects:6.3f} s")
+
+	print(f"{'transfer':<19} {'bytes':>10} {'encode':>9} {'decode':>9}")
+	for name, encode, decode in (
+		("FlatAst", flat.toBytes, FlatAst.fromBytes),
+		("serialize", lambda: serialize.dumps(program), serialize.loads),
+		("pickle of nodes", lambda: pickle.dumps(program, pickle.HIGHEST_PROTOCOL), pickle.loads),
+	):
+		# pickling a deep tree recurses
+		limit = sys.getrecursionlimit()
+		sys.setrecursionlimit(max(limit, 100_000))
+		try:
+			data, encodeTime = _time(encode, args.repeat)
+			_, decodeTime = _time(lambda: decode(data), args.repeat)
+		finally:
+			sys.setrecursionlimit(limit)
+		print(f"{name:<19} {len(data):>10} {encodeTime:8.3f}s {decodeTime:8.3f}s")
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,60 @@
+"""Parse time of the grammar alone, from already tokenized input.
+
+Besides the best time this reports the number of Python function calls per token, which does not
+depend on the machine and shows how many grammar levels each token descends through.
+
+Run with `python -m benchmarks.grammar [--shape NAME ...] [--size MB]`.
+"""
+import argparse
+import sys
+import time
+from collections.abc import Sequence
+
+from benchmarks.corpus import SHAPES
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import Tokenizer
+
+
+def countCalls(tokens: Sequence[Token]) -> int:
+	calls = 0
+
+	def profile(frame, event, arg):
+		nonlocal calls
+		if event == "call":
+			calls += 1
+
+	sys.setprofile(profile)
+	try:
+		Parser().parseTokens(tokens)
+	finally:
+		sys.setprofile(None)
+	return calls
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--shape", action="append", choices=SHAPES, help="Shape of the generated programs (default: all)")
+	argparser.add_argument("--size", default=0.1, type=float, help="Input size in MB")
+	argparser.add_argument("--repeat", default=10, type=int, help="Number of runs (best is reported)")
+	args = argparser.parse_args(arguments)
+
+	print(f"{'shape':<11} {'tokens':>8} {'parse':>10} {'calls/token':>12}")
+	for shape in args.shape or SHAPES:
+		t = Tokenizer()
+		t.init(SHAPES[shape](int(args.size * 1024 * 1024)))
+		tokens = t.getTokens()
+
+		best = float("inf")
+		for _ in range(args.repeat):
+			start = time.perf_counter()
+			Parser().parseTokens(tokens)
+			best = min(best, time.perf_counter() - start)
+
+		print(f"{shape:<11} {len(tokens):>8} {best * 1000:8.1f}ms {countCalls(tokens) / len(tokens):12.1f}")
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,124 @@
+"""Memory and time of parsing with an `InternTable`, and what it saves when comparing trees.
+
+For each shape of `benchmarks.corpus` this reports, without interning, with interned leaves and with
+interned expressions too: the memory the tree keeps alive per node, what the table adds to that as long
+as it is kept (to share nodes with later trees), the parse time, and the time to compare
+the trees of two parses of the same program node by node (which stops at the first shared node, so
+trees parsed with the same table compare in about the time of walking their statements).
+
+Run with `python -m benchmarks.interning [--shape NAME ...] [--size MB]`.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+from typing import Optional
+
+from benchmarks.corpus import SHAPES
+from nyr.parser.interning import InternTable
+from nyr.parser.node import Node
+from nyr.parser.parser import Parser
+
+
+def _equal(a: Any, b: Any) -> bool:
+	"""Whether `a` and `b` are the same tree, ignoring spans"""
+	stack = [(a, b)]
+	while stack:
+		a, b = stack.pop()
+		if a is b:
+			continue
+		if isinstance(a, Node):
+			if type(a) is not type(b):
+				return False
+			stack.extend((getattr(a, field), getattr(b, field)) for field in a._fields)
+		elif isinstance(a, list):
+			if not isinstance(b, list) or len(a) != len(b):
+				return False
+			stack.extend(zip(a, b))
+		elif type(a) is not type(b) or a != b:
+			return False
+	return True
+
+
+def _count(root: Node) -> int:
+	"""Number of nodes under `root`, shared ones once per reference"""
+	count = 0
+	stack: list[Any] = [root]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, Node):
+			count += 1
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+	return count
+
+
+def _time(function: Callable[[], Any]) -> tuple[Any, float]:
+	"""Returns the result of `function()` and its time in seconds, with the garbage collector off"""
+	gc.collect()
+	gc.disable()
+	try:
+		start = time.perf_counter()
+		result = function()
+		return result, time.perf_counter() - start
+	finally:
+		gc.enable()
+
+
+def measure(source: str, expressions: Optional[bool]) -> dict[str, float]:
+	"""`expressions` is `None` for no interning"""
+	def parser() -> Parser:
+		return Parser(internTable=None if expressions is None else table)
+
+	table = None if expressions is None else InternTable(expressions)
+	gc.collect()
+	tracemalloc.start()
+	before, _ = tracemalloc.get_traced_memory()
+	ast = parser().parse(source)
+	gc.collect()
+	withTable = tracemalloc.get_traced_memory()[0] - before
+	table = None
+	gc.collect()
+	retained = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+	nodes = _count(ast)
+
+	table = None if expressions is None else InternTable(expressions)
+	ast, parseTime = _time(lambda: parser().parse(source))
+	other = parser().parse(source)
+	equal, compareTime = _time(lambda: _equal(ast, other))
+	assert equal
+
+	return {
+		"retainedBytesPerNode": retained / nodes,
+		"tableBytesPerNode": max(withTable - retained, 0) / nodes,
+		"parseTime": parseTime,
+		"compareTime": compareTime,
+	}
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--shape", action="append", choices=SHAPES, help="Shape of the generated programs (default: all)")
+	argparser.add_argument("--size", default=1.0, type=float, help="Input size in MB")
+	args = argparser.parse_args(arguments)
+
+	print(f"{'shape':<11} {'interned':<11} {'retained/node':>14} {'table/node':>11} {'parse':>8} {'compare':>8}")
+	for shape in args.shape or SHAPES:
+		source = SHAPES[shape](int(args.size * 1024 * 1024))
+		for name, expressions in (("nothing", None), ("leaves", False), ("expressions", True)):
+			run = measure(source, expressions)
+			print(
+				f"{shape:<11} {name:<11} {run['retainedBytesPerNode']:>13.1f}B {run['tableBytesPerNode']:>10.1f}B "
+				f"{run['parseTime']:>7.3f}s {run['compareTime']:>7.3f}s",
+			)
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""Evaluation speed of the tree-walking `Interpreter` and of the `ClosureInterpreter`, on `examples/Fibonacci.nyr`
+and on an arithmetic loop.
+
+The example is parsed once (without its `print` calls, which the interpreter has no builtin for) and
+`fibonacci(N)` is called in addition to the calls it makes itself, so the run is dominated by visiting
+nodes: calls, comparisons, additions and subtractions. The loop does little but arithmetic on ints
+and floats, so it is dominated by evaluating operators. The closure engine is timed running a program
+compiled beforehand, the time to compile it is reported separately.
+
+Run with `python -m benchmarks.interpreter [--n N] [--iterations N] [--repeat N]`.
+"""
+import argparse
+import gc
+import os
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from nyr.interpreter.closures import ClosureInterpreter
+from nyr.interpreter.interpreter import Interpreter
+from nyr.parser import node as Node
+from nyr.parser.parser import Parser
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "Fibonacci.nyr")
+
+ARITHMETIC = """let total = 0, ratio = 0.5;
+for (let i = 0; i < {iterations}; i += 1) {{
+	total = total + i * 3 % 7 - i / 4;
+	ratio = ratio * 1.0001 + (i & 3) / 8;
+}}
+"""
+
+
+def _isPrint(statement: Node.Node) -> bool:
+	if not isinstance(statement, Node.ExpressionStatement) or not isinstance(statement.expression, Node.CallExpression):
+		return False
+	return statement.expression.callee.name == "print"
+
+
+def _best(run: Callable[[], dict], repeat: int) -> tuple[dict, float]:
+	"""The environment `run()` results in and its best time in seconds, with the garbage collector off"""
+	best = float("inf")
+	for _ in range(repeat):
+		gc.collect()
+		gc.disable()
+		try:
+			start = time.perf_counter()
+			env = run()
+			best = min(best, time.perf_counter() - start)
+		finally:
+			gc.enable()
+	return env, best
+
+
+def _compare(name: str, ast: Node.Program, variable: str, repeat: int):
+	"""Prints the times of both engines to run `ast`, and the value of `variable` they result in"""
+	env, treeTime = _best(lambda: Interpreter().interpret(ast), repeat)
+
+	engine = ClosureInterpreter()
+	start = time.perf_counter()
+	program = engine.compile(ast)
+	compileTime = time.perf_counter() - start
+	closureEnv, closureTime = _best(lambda: engine.run(program), repeat)
+	assert closureEnv == env
+
+	print(
+		f"{name:<36} {str(env[variable]):>12.12} {treeTime:>8.3f}s {closureTime:>8.3f}s "
+		f"{compileTime * 1000:>8.2f}ms {treeTime / closureTime:>7.1f}x",
+	)
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--n", default=18, type=int, help="Argument of the added fibonacci call")
+	argparser.add_argument("--iterations", default=20_000, type=int, help="Iterations of the arithmetic loop")
+	argparser.add_argument("--repeat", default=5, type=int, help="Number of runs, the fastest one counts")
+	args = argparser.parse_args(arguments)
+
+	with open(EXAMPLE) as f:
+		source = f.read()
+	ast = Parser().parse(source + f"\nlet fibN = fibonacci({args.n});\n")
+	ast.body = [statement for statement in ast.body if not _isPrint(statement)]
+
+	print(f"{'program':<36} {'result':>12} {'tree':>9} {'closure':>9} {'compile':>10} {'speedup':>8}")
+	_compare(f"fibonacci({args.n})", ast, "fibN", args.repeat)
+	_compare(f"arithmetic loop, {args.iterations} iterations", Parser().parse(ARITHMETIC.format(iterations=args.iterations)), "total", args.repeat)
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""Lazily parsed function bodies vs parsing all of them, for a script declaring many functions but calling few.
+
+Run with `python -m benchmarks.lazy [--functions N] [--calls N]`.
+"""
+import argparse
+import time
+from collections.abc import Sequence
+
+from nyr.interpreter.interpreter import Interpreter
+from nyr.parser.lazy import LazyParser
+from nyr.parser.parser import Parser
+
+FUNCTION = """def helper{i}(a, b) {{
+	let c = a * b + {i};
+	let d = (c - a) / (b + 1) % 7;
+	if (c > 10 && d != 3) {{
+		c = c - b * 2;
+	}} else {{
+		c = c * 2 + d;
+	}}
+	for (let i = 0; i < 3; i += 1) d = d * a - i;
+	return c + d;
+}}
+"""
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--functions", default=2_000, type=int, help="Number of declared functions")
+	argparser.add_argument("--calls", default=5, type=int, help="Number of them that are called")
+	argparser.add_argument("--repeat", default=5, type=int, help="Number of runs, the fastest one counts")
+	args = argparser.parse_args(arguments)
+
+	step = max(1, args.functions // max(1, args.calls))
+	source = "".join(FUNCTION.format(i=i) for i in range(args.functions))
+	source += "".join(f"let r{i} = helper{i}({i}, 3);\n" for i in range(0, args.functions, step)[:args.calls])
+
+	print(f"input:  {args.functions} functions, {args.calls} called, {len(source)} bytes")
+
+	results = {}
+	for name, parserClass in (("eager", Parser), ("lazy", LazyParser)):
+		parse = run = float("inf")
+		for _ in range(args.repeat):
+			start = time.perf_counter()
+			program = parserClass().parse(source)
+			parsed = time.perf_counter()
+			env = Interpreter().interpret(program)
+			parse = min(parse, parsed - start)
+			run = min(run, time.perf_counter() - start)
+		results[name] = env
+		print(f"{name + ':':<8}parse {parse * 1000:8.1f} ms, parse and run {run * 1000:8.1f} ms")
+
+	assert results["eager"] == results["lazy"]
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
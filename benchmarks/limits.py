@@ -0,0 +1,51 @@
+"""Overhead of checking `ParserLimits` on normal input, which none of the limits stop.
+
+Run with `python -m benchmarks.limits [--size BYTES]`.
+"""
+import argparse
+import gc
+import time
+from collections.abc import Sequence
+
+from benchmarks.corpus import mixed
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parser import Parser
+
+GENEROUS = ParserLimits(sourceBytes=1 << 30, tokens=1 << 30, nodes=1 << 30, depth=1000, seconds=3600.0)
+
+
+def _time(parser: Parser, source: str) -> float:
+	"""Like `timeit`, with the garbage collector off: the trees of earlier runs would make it the largest cost"""
+	gc.collect()
+	gc.disable()
+	try:
+		start = time.perf_counter()
+		parser.parse(source)
+		return time.perf_counter() - start
+	finally:
+		gc.enable()
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=1_000_000, type=int, help="Size of the input in bytes")
+	argparser.add_argument("--repeat", default=5, type=int, help="Number of runs, the fastest one counts")
+	args = argparser.parse_args(arguments)
+
+	source = mixed(args.size)
+	print(f"input: {len(source) / 2 ** 20:.1f} MiB")
+
+	for parserClass in (Parser, IterativeParser):
+		unlimited = limited = float("inf")
+		# alternating, so both see the same conditions
+		for _ in range(args.repeat):
+			unlimited = min(unlimited, _time(parserClass(), source))
+			limited = min(limited, _time(parserClass(GENEROUS), source))
+		print(f"{parserClass.__name__:<16} unlimited {unlimited:6.3f} s, limited {limited:6.3f} s, {(limited / unlimited - 1) * 100:+5.1f}%")
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
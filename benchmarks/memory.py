@@ -0,0 +1,68 @@
+"""Memory per AST node of parsed generated programs.
+
+For each shape of `benchmarks.corpus` this reports the size of the node objects themselves
+(including their `__dict__`, if they have one) and everything the tree keeps alive after parsing
+(node objects, lists, names and values, as traced by `tracemalloc`), both per node.
+
+Run with `python -m benchmarks.memory [--shape NAME ...] [--size MB]`.
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from collections.abc import Sequence
+from typing import Any
+
+from benchmarks.corpus import SHAPES
+from nyr.parser.node import Node
+from nyr.parser.parser import Parser
+
+
+def _nodeBytes(root: Node) -> tuple[int, int]:
+	"""Returns the number of nodes under `root` and the size of their objects"""
+	count = size = 0
+	stack: list[Any] = [root]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, Node):
+			count += 1
+			size += sys.getsizeof(value) + (sys.getsizeof(value.__dict__) if hasattr(value, "__dict__") else 0)
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+	return count, size
+
+
+def measure(source: str) -> dict[str, float]:
+	gc.collect()
+	tracemalloc.start()
+	before, _ = tracemalloc.get_traced_memory()
+	ast = Parser().parse(source)
+	gc.collect()
+	retained = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+
+	nodes, nodeBytes = _nodeBytes(ast)
+	return {
+		"nodes": nodes,
+		"objectBytesPerNode": nodeBytes / nodes,
+		"retainedBytesPerNode": retained / nodes,
+	}
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--shape", action="append", choices=SHAPES, help="Shape of the generated programs (default: all)")
+	argparser.add_argument("--size", default=2.0, type=float, help="Input size in MB")
+	args = argparser.parse_args(arguments)
+
+	print(f"{'shape':<11} {'nodes':>9} {'objects/node':>13} {'retained/node':>14}")
+	for shape in args.shape or SHAPES:
+		run = measure(SHAPES[shape](int(args.size * 1024 * 1024)))
+		print(f"{shape:<11} {run['nodes']:>9} {run['objectBytesPerNode']:>12.1f}B {run['retainedBytesPerNode']:>13.1f}B")
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
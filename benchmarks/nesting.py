@@ -0,0 +1,55 @@
+"""`IterativeParser` on deeply nested input, whose parse time must grow linearly with the depth.
+
+Each input is parsed at 1x, 2x and 4x the given depth; anything growing more than `MAX_GROWTH`
+times for 4x the depth fails. `Parser` hits the recursion limit on all of these at ~35 levels.
+
+Run with `python -m benchmarks.nesting [--depth N]`.
+"""
+import argparse
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from nyr.parser.iterative import IterativeParser
+
+# Allowed slowdown for 4x the depth (leaves room for timing noise, quadratic would be 16)
+MAX_GROWTH = 8.0
+
+CASES: dict[str, Callable[[int], str]] = {
+	"parentheses": lambda depth: "x = " + "(" * depth + "1" + ")" * depth + ";",
+	"blocks": lambda depth: "{" * depth + "x;" + "}" * depth,
+	"else if chain": lambda depth: "if (a) x; " + "else if (a) x; " * depth,
+	"unary operators": lambda depth: "x = " + "-" * depth + "1;",
+	"assignments": lambda depth: "a = " * depth + "1;",
+	"call arguments": lambda depth: "x = " + "f(" * depth + "1" + ")" * depth + ";",
+	"member indices": lambda depth: "x = " + "a[" * depth + "1" + "]" * depth + ";",
+	"functions": lambda depth: "def f() {" * depth + "}" * depth,
+	"right operands": lambda depth: "x = " + "1 + (" * depth + "1" + ")" * depth + ";",
+}
+
+
+def run(source: str) -> float:
+	start = time.perf_counter()
+	IterativeParser().parse(source)
+	return time.perf_counter() - start
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--depth", default=25_000, type=int, help="Smallest nesting depth")
+	args = argparser.parse_args(arguments)
+
+	failed = False
+
+	print(f"{'input':<18} {'1x':>9} {'2x':>9} {'4x':>9} {'growth':>7}")
+	for name, generate in CASES.items():
+		times = [run(generate(args.depth * factor)) for factor in (1, 2, 4)]
+		growth = times[2] / times[0]
+		failed |= growth > MAX_GROWTH
+		print(f"{name:<18} {times[0]:8.3f}s {times[1]:8.3f}s {times[2]:8.3f}s {growth:6.1f}x{'' if growth <= MAX_GROWTH else '  FAIL'}")
+
+	return 1 if failed else 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
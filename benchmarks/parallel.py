@@ -0,0 +1,49 @@
+"""Parsing one large generated module with `ParallelParser` vs `Parser`.
+
+Run with `python -m benchmarks.parallel [--size BYTES] [--jobs N]`.
+"""
+import argparse
+import os
+import time
+from collections.abc import Sequence
+
+from benchmarks.corpus import functions
+from nyr.parser.parallel import ParallelParser
+from nyr.parser.parser import Parser
+
+
+def _best(parse, source: str, repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		parse(source)
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=4_000_000, type=int, help="Size of the module in bytes")
+	argparser.add_argument("--jobs", default=os.cpu_count() or 1, type=int, help="Highest number of worker processes")
+	argparser.add_argument("--repeat", default=3, type=int, help="Number of runs, the fastest one counts")
+	args = argparser.parse_args(arguments)
+
+	source = functions(args.size)
+	print(f"input: {len(source) / 2 ** 20:.1f} MiB, {os.cpu_count()} CPUs")
+
+	sequential = _best(Parser().parse, source, args.repeat)
+	print(f"Parser:       {sequential:7.2f} s")
+
+	jobs = 2
+	while True:
+		elapsed = _best(ParallelParser(jobs=min(jobs, args.jobs)).parse, source, args.repeat)
+		print(f"{min(jobs, args.jobs):3} jobs:     {elapsed:7.2f} s, {sequential / elapsed:5.2f}x")
+		if jobs >= args.jobs:
+			break
+		jobs *= 2
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
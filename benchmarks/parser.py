@@ -0,0 +1,136 @@
+"""Tokenizer and parser throughput, peak memory and scaling on generated programs.
+
+For each shape of `benchmarks.corpus` and each size (doubling from `--size`) this reports
+tokens/sec of the tokenizer, nodes/sec of the parser (parsing from source, so including tokenization),
+the peak memory of a parse and how the parse time grows with the input.
+
+Results can be saved with `--save results.json` and later compared with `--baseline results.json`,
+which fails if any throughput dropped by more than `--tolerance`.
+
+Run with `python -m benchmarks.parser [--shape NAME ...] [--size MB] [--steps N]`.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from collections.abc import Sequence
+from typing import Any
+
+from benchmarks.corpus import SHAPES
+from nyr.parser.node import Node
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import Tokenizer
+
+
+def countNodes(root: Node) -> int:
+	count = 0
+	stack: list[Any] = [root]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, Node):
+			count += 1
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+	return count
+
+
+def _best(function, repeat: int) -> tuple[Any, float]:
+	"""Returns the result of `function()` and its best time in seconds"""
+	best = float("inf")
+	result = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		best = min(best, time.perf_counter() - start)
+	return result, best
+
+
+def _tokenize(source: str) -> int:
+	t = Tokenizer()
+	t.init(source)
+	return len(t.getTokenBuffer())
+
+
+def _peakMemory(source: str) -> int:
+	gc.collect()
+	tracemalloc.start()
+	Parser().parse(source)
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return peak
+
+
+def measure(source: str, repeat: int) -> dict[str, float]:
+	tokens, tokenizeTime = _best(lambda: _tokenize(source), repeat)
+	ast, parseTime = _best(lambda: Parser().parse(source), repeat)
+	nodes = countNodes(ast)
+
+	return {
+		"bytes": len(source),
+		"tokens": tokens,
+		"nodes": nodes,
+		"tokenizeSeconds": tokenizeTime,
+		"parseSeconds": parseTime,
+		"tokensPerSec": tokens / tokenizeTime,
+		"nodesPerSec": nodes / parseTime,
+		"peakBytes": _peakMemory(source),
+	}
+
+
+def compare(results: dict[str, list[dict[str, float]]], baseline: dict[str, list[dict[str, float]]], tolerance: float) -> list[str]:
+	"""Returns a description of every throughput in `results` that is more than `tolerance` below `baseline`"""
+	regressions = []
+	for shape, runs in results.items():
+		for run, base in zip(runs, baseline.get(shape, ())):
+			for key in ("tokensPerSec", "nodesPerSec"):
+				if run[key] < base[key] * (1 - tolerance):
+					regressions.append(f"{shape} ({run['bytes'] / 1024 / 1024:.2f} MB): {key} {run[key]:,.0f} < {base[key]:,.0f}")
+	return regressions
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--shape", action="append", choices=SHAPES, help="Shape of the generated programs (default: all)")
+	argparser.add_argument("--size", default=0.25, type=float, help="Smallest input size in MB")
+	argparser.add_argument("--steps", default=3, type=int, help="Number of sizes, each double the previous one")
+	argparser.add_argument("--repeat", default=3, type=int, help="Number of runs (best is reported)")
+	argparser.add_argument("--save", help="Write the results to this JSON file")
+	argparser.add_argument("--baseline", help="Compare with the results in this JSON file")
+	argparser.add_argument("--tolerance", default=0.2, type=float, help="Allowed throughput drop compared to the baseline")
+	args = argparser.parse_args(arguments)
+
+	results: dict[str, list[dict[str, float]]] = {}
+
+	print(f"{'shape':<11} {'size':>8} {'tokens':>9} {'tokens/s':>10} {'nodes':>9} {'nodes/s':>10} {'peak':>9} {'growth':>7}")
+	for shape in args.shape or SHAPES:
+		results[shape] = []
+		for step in range(args.steps):
+			source = SHAPES[shape](int(args.size * 1024 * 1024) << step)
+			run = measure(source, args.repeat)
+			results[shape].append(run)
+
+			# parse time relative to the previous size, ~2x when scaling linearly
+			growth = f"{run['parseSeconds'] / results[shape][-2]['parseSeconds']:6.2f}x" if step else ""
+			print(
+				f"{shape:<11} {run['bytes'] / 1024 / 1024:6.2f}MB {run['tokens']:>9} {run['tokensPerSec']:>10,.0f}"
+				f" {run['nodes']:>9} {run['nodesPerSec']:>10,.0f} {run['peakBytes'] / 1024 / 1024:7.1f}MB {growth:>7}",
+			)
+
+	if args.save:
+		with open(args.save, "w") as f:
+			json.dump(results, f, indent=2)
+
+	if args.baseline:
+		with open(args.baseline) as f:
+			regressions = compare(results, json.load(f), args.tolerance)
+		for regression in regressions:
+			print(f"regression: {regression}")
+		return 1 if regressions else 0
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,63 @@
+"""Tokenizer time on adversarial inputs, which must grow linearly with the input size.
+
+Each input is tokenized at 1x, 2x and 4x the given size. Linear time means 4x the input takes about
+4x as long, a quadratic tokenizer would take 16x; anything above `MAX_GROWTH` fails.
+
+Run with `python -m benchmarks.pathological [--size MB]`.
+"""
+import argparse
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from nyr.parser.tokenizer import Tokenizer
+
+# Allowed slowdown for 4x the input (leaves room for timing noise, quadratic would be 16)
+MAX_GROWTH = 8.0
+
+CASES: dict[str, Callable[[int], str]] = {
+	"unterminated block comments": lambda size: "a /* " * (size // 5),
+	"block comment of stars": lambda size: "/*" + "*" * (size - 4) + "*/",
+	"huge string": lambda size: '"' + "x" * (size - 2) + '"',
+	"unterminated string": lambda size: 'x = "' + "x" * (size - 5),
+	"whitespace run": lambda size: " " * (size - 1) + "x",
+	"whitespace before error": lambda size: " " * (size - 1) + "$",
+	"newline run": lambda size: "\n" * (size - 1) + "x",
+	"line comments": lambda size: "//\n" * (size // 3),
+	"digit run": lambda size: "1" * size,
+	"digit run with dot": lambda size: "1" * (size - 1) + ".",
+}
+
+
+def run(source: str) -> float:
+	"""Returns the time in seconds it takes to tokenize `source` (or to fail doing so)"""
+	t = Tokenizer()
+	t.init(source)
+	start = time.perf_counter()
+	try:
+		t.getTokenBuffer()
+	except SyntaxError:
+		pass
+	return time.perf_counter() - start
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=0.5, type=float, help="Smallest input size in MB")
+	args = argparser.parse_args(arguments)
+
+	size = int(args.size * 1024 * 1024)
+	failed = False
+
+	print(f"{'input':<28} {'1x':>9} {'2x':>9} {'4x':>9} {'growth':>7}")
+	for name, generate in CASES.items():
+		times = [run(generate(size * factor)) for factor in (1, 2, 4)]
+		growth = times[2] / max(times[0], 1e-6)
+		failed |= growth > MAX_GROWTH
+		print(f"{name:<28} {times[0]:8.3f}s {times[1]:8.3f}s {times[2]:8.3f}s {growth:6.1f}x{'' if growth <= MAX_GROWTH else '  FAIL'}")
+
+	return 1 if failed else 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,47 @@
+"""Incremental reparsing of an edit to one function vs parsing everything again.
+
+Run with `python -m benchmarks.reparse [--lines N]`.
+"""
+import argparse
+import time
+from collections.abc import Sequence
+
+from benchmarks.corpus import functions
+from nyr.parser.incremental import IncrementalParser
+from nyr.parser.parser import Parser
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--lines", default=20_000, type=int, help="Number of lines of the edited file")
+	argparser.add_argument("--repeat", default=10, type=int, help="Number of edits per position")
+	args = argparser.parse_args(arguments)
+
+	# ~13 bytes per line
+	source = functions(args.lines * 13)
+
+	start = time.perf_counter()
+	Parser().parse(source)
+	full = time.perf_counter() - start
+
+	print(f"input:        {source.count(chr(10))} lines, {len(source)} bytes")
+	print(f"full parse:   {full * 1000:8.1f} ms")
+
+	parser = IncrementalParser()
+	program = parser.parse(source)
+
+	# edit the body of a function near the start, in the middle and near the end of the file
+	for name, fraction in (("start", 0.01), ("middle", 0.5), ("end", 0.99)):
+		offset = source.index("return c;", int(len(source) * fraction)) + len("return c")
+		start = time.perf_counter()
+		for i in range(args.repeat):
+			program = parser.reparse(program, offset, 0, " + 1")
+			program = parser.reparse(program, offset, len(" + 1"), "")
+		incremental = (time.perf_counter() - start) / (2 * args.repeat)
+		print(f"{'reparse ' + name + ':':<14}{incremental * 1000:8.1f} ms per edit ({full / incremental:.0f}x faster)")
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,48 @@
+"""Incremental re-tokenization of a single edit vs tokenizing everything again.
+
+Run with `python -m benchmarks.retokenize [--lines N]`.
+"""
+import argparse
+import time
+from collections.abc import Sequence
+
+from benchmarks.tokenizer import generate
+from nyr.parser.tokenizer import Tokenizer
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--lines", default=50_000, type=int, help="Number of lines of the edited file")
+	argparser.add_argument("--repeat", default=20, type=int, help="Number of edits")
+	args = argparser.parse_args(arguments)
+
+	lines = generate(1).splitlines(keepends=True)
+	source = "".join(lines[i % len(lines)] for i in range(args.lines))
+
+	t = Tokenizer()
+	t.init(source)
+	start = time.perf_counter()
+	buffer = t.getTokenBuffer()
+	full = time.perf_counter() - start
+
+	# type a statement into the middle of the file, one character at a time
+	text = "let inserted = 42 * (x + 1);\n"
+	offset = len(source) // 2
+	offset = source.index("\n", offset) + 1
+	edits = 0
+	start = time.perf_counter()
+	for _ in range(args.repeat):
+		for i, char in enumerate(text):
+			buffer = t.retokenize(buffer, offset + i, 0, char)
+			edits += 1
+		offset += len(text)
+	incremental = (time.perf_counter() - start) / edits
+
+	print(f"input:        {args.lines} lines, {len(buffer)} tokens")
+	print(f"full:         {full * 1000:8.3f} ms")
+	print(f"retokenize:   {incremental * 1000:8.3f} ms per single character edit ({full / incremental:.0f}x faster)")
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,71 @@
+"""Interpreting a file while it is read (`Parser.iterStatements`) vs reading and parsing all of it first.
+
+Reports the time until the first statement runs and the peak memory of the whole run.
+Run with `python -m benchmarks.streaming [--lines N]`.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+
+from nyr.interpreter.interpreter import Interpreter
+from nyr.parser import node as Node
+from nyr.parser.parser import Parser
+
+
+def _timed(statements: Iterable[Node.Node], start: float, firsts: list[float]) -> Iterator[Node.Node]:
+	for statement in statements:
+		if not firsts:
+			firsts.append(time.perf_counter() - start)
+		yield statement
+
+
+def full(path: str) -> float:
+	firsts: list[float] = []
+	start = time.perf_counter()
+	with open(path) as f:
+		program = Parser().parse(f.read())
+	Interpreter().interpretStatements(_timed(program.body, start, firsts))
+	return firsts[0]
+
+
+def streaming(path: str) -> float:
+	firsts: list[float] = []
+	start = time.perf_counter()
+	with open(path) as f:
+		Interpreter().interpretStatements(_timed(Parser().iterStatements(f), start, firsts))
+	return firsts[0]
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--lines", default=20_000, type=int, help="Number of lines of the interpreted file")
+	args = argparser.parse_args(arguments)
+
+	fd, path = tempfile.mkstemp(suffix=".nyr")
+	try:
+		with os.fdopen(fd, "w") as f:
+			f.write("let x = 0;\n")
+			f.writelines(f"x = x + {i} * 2;\n" for i in range(args.lines - 1))
+		print(f"input:     {args.lines} lines, {os.path.getsize(path)} bytes")
+
+		for name, run in (("full", full), ("streaming", streaming)):
+			tracemalloc.start()
+			start = time.perf_counter()
+			first = run(path)
+			total = time.perf_counter() - start
+			peak = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+			print(f"{name + ':':<11}first statement after {first * 1000:8.1f} ms, done after {total * 1000:8.1f} ms, peak {peak / 2 ** 20:7.1f} MiB")
+	finally:
+		os.unlink(path)
+
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""Tokenizer throughput on multi-megabyte inputs.
+
+Run with `python -m benchmarks.tokenizer [--size MB] [--repeat N]`.
+"""
+import argparse
+import time
+from collections.abc import Sequence
+
+from nyr.parser.tokenizer import Tokenizer
+
+# Minimum throughput `Tokenizer` is expected to reach on the generated input
+TARGET_TOKENS_PER_SEC = 400_000
+
+SNIPPET = """
+// compute some numbers
+def fn{i}(a, b) {{
+	let x = a * {i} + b / 2, y = 3.25;
+	/* block
+		comment */
+	if (x >= y && !(a == b) || a != null) {{
+		x += fn{i}(a - 1, b) % 7;
+	}} else {{
+		y = "string number {i}";
+	}}
+	for (let j = 0; j < 10; j += 1) {{ x = x | j ^ 3 & 1; }}
+	return x;
+}}
+"""
+
+
+def generate(sizeMB: float) -> str:
+	target = int(sizeMB * 1024 * 1024)
+	parts: list[str] = []
+	total = 0
+	i = 0
+	while total < target:
+		part = SNIPPET.format(i=i)
+		parts.append(part)
+		total += len(part)
+		i += 1
+	return "".join(parts)
+
+
+def run(source: str, repeat: int) -> tuple[int, float]:
+	"""Returns (token count, best time in seconds)"""
+	best = float("inf")
+	count = 0
+	for _ in range(repeat):
+		t = Tokenizer()
+		t.init(source)
+		start = time.perf_counter()
+		count = len(t.getTokens())
+		best = min(best, time.perf_counter() - start)
+	return count, best
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=4.0, type=float, help="Input size in MB")
+	argparser.add_argument("--repeat", default=3, type=int, help="Number of runs (best is reported)")
+	args = argparser.parse_args(arguments)
+
+	source = generate(args.size)
+	count, seconds = run(source, args.repeat)
+	rate = count / seconds
+
+	print(f"input:      {len(source) / 1024 / 1024:.2f} MB, {count} tokens")
+	print(f"time:       {seconds:.3f} s")
+	print(f"throughput: {rate:,.0f} tokens/sec (target: {TARGET_TOKENS_PER_SEC:,})")
+	return 0 if rate >= TARGET_TOKENS_PER_SEC else 1
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,47 @@
+"""Memory per token: tuple of `Token`s vs `TokenBuffer`.
+
+Run with `python -m benchmarks.tokens [--size MB]`.
+"""
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from benchmarks.tokenizer import generate
+from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import Tokenizer
+
+
+def measure(source: str, tokenize: Callable[[Tokenizer], Sequence[Token]]) -> tuple[int, int]:
+	"""Returns (token count, bytes held by the result)"""
+	t = Tokenizer()
+	t.init(source)
+
+	gc.collect()
+	tracemalloc.start()
+	tokens = tokenize(t)
+	size, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return len(tokens), size
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser()
+	argparser.add_argument("--size", default=2.0, type=float, help="Input size in MB")
+	args = argparser.parse_args(arguments)
+
+	source = generate(args.size)
+
+	count, tupleSize = measure(source, Tokenizer.getTokens)
+	_, bufferSize = measure(source, Tokenizer.getTokenBuffer)
+
+	print(f"input:       {len(source) / 1024 / 1024:.2f} MB, {count} tokens")
+	print(f"Token tuple: {tupleSize / count:6.1f} bytes/token")
+	print(f"TokenBuffer: {bufferSize / count:6.1f} bytes/token ({tupleSize / bufferSize:.1f}x smaller)")
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
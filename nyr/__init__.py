@@ -1,40 +1,141 @@
 import argparse
-import json
+import mmap
+import os
+import re
 import sys
+from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Sequence
 from pprint import pp
+from typing import Optional
+from typing import Union
 
+from nyr.interpreter.closures import ClosureInterpreter
 from nyr.interpreter.interpreter import Interpreter
-from nyr.parser.node import ComplexEncoder
+from nyr.parser import astjson
+from nyr.parser import cache
+from nyr.parser import serialize
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.lazy import LazyParser
+from nyr.parser.node import Node
 from nyr.parser.node import Program
+from nyr.parser.parallel import ParallelParser
 from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import Source
 
 
 class Args:
 	inputFile: str
-	output: bool
+	# path to write the AST to ("" for the default one), None to not write it
+	output: Optional[str]
+	format: str
 	interpret: bool
 	printAST: bool
 	debug: bool
+	iterative: bool
+	cache: bool
+	cacheDir: Optional[str]
+	stream: bool
+	lazy: bool
+	jobs: Optional[int]
+	engine: str
 
 
-def getAst(string: str) -> Program:
-	return Parser().parse(string)
+def getParser(iterative: bool = False, lazy: bool = False, jobs: Optional[int] = None) -> Parser:
+	""" `jobs` (0 for one per CPU) selects the `ParallelParser` """
+	if lazy:
+		return LazyParser()
+	if jobs is not None:
+		return ParallelParser(jobs=jobs)
+	return (IterativeParser if iterative else Parser)()
+
+
+def getInterpreter(engine: str = "tree", debug: bool = False) -> Union[Interpreter, ClosureInterpreter]:
+	""" `engine` "tree" walks the AST (logging what it does with `debug`), "closure" compiles it to closures first """
+	if engine == "closure":
+		return ClosureInterpreter()
+	return Interpreter(debug, debug, debug)
+
+
+def getAst(string: Source, iterative: bool = False, lazy: bool = False, jobs: Optional[int] = None) -> Program:
+	return getParser(iterative, lazy, jobs).parse(string)
+
+
+def getCachedAst(string: Source, path: str, iterative: bool = False, cacheDir: Optional[str] = None, jobs: Optional[int] = None) -> Program:
+	""" Like `getAst`, but loads the AST of the file at `path` from / stores it in the cache (see `nyr.parser.cache`) """
+	return cache.parse(string, path, cacheDir, getParser(iterative, jobs=jobs))
+
+
+def _indent() -> Optional[int]:
+	return None if args.format == "compact" else 2
+
+
+def loadAst(path: str) -> Program:
+	""" Loads the AST written with -o to `path`, as JSON or in the binary format """
+	with open(path, "rb") as f:
+		data = f.read()
+	if data.lstrip()[:1] == b"{":
+		return astjson.loads(data)
+	return serialize.loads(data)
 
 
 def printAst(ast_: Program):
-	print(json.dumps(ast_, cls=ComplexEncoder, indent=2))
+	""" Prints `ast_` as JSON, compact in the compact format and indented otherwise """
+	astjson.dump(ast_, sys.stdout, _indent())
+	print()
 
 
 def interpret(ast_: Program):
-	_env = Interpreter(args.debug, args.debug, args.debug).interpret(ast_)
+	_env = getInterpreter(args.engine, args.debug).interpret(ast_)
 	print("Env = ", end="")
 	pp(_env)
 
 
+def runStream(chunks: Iterable[str]):
+	""" Parses and interprets `chunks` statement by statement, starting with the first one read
+
+		Statements are only collected (to print / output the AST at the end) if -p or -o are given.
+	"""
+	statements: Iterator[Node] = getParser(args.iterative, args.lazy).iterStatements(chunks)
+	body: list[Node] = []
+	if args.printAST or args.output is not None:
+		statements = _collecting(statements, body)
+
+	if args.interpret:
+		_env = getInterpreter(args.engine, args.debug).interpretStatements(statements)
+		print("Env = ", end="")
+		pp(_env)
+	else:
+		for _ in statements:
+			pass
+
+	if args.printAST or args.output is not None:
+		ast = Program(body)
+		if body:
+			ast.start, ast.end = body[0].start, body[-1].end
+		if args.printAST:
+			printAst(ast)
+		if args.output is not None:
+			outputAST(ast)
+
+
+def _collecting(statements: Iterator[Node], body: list[Node]) -> Iterator[Node]:
+	for statement in statements:
+		body.append(statement)
+		yield statement
+
+
 def outputAST(ast_: Program):
-	with open("./ast.json", "w") as o:
-		o.write(json.dumps(ast_, cls=ComplexEncoder, indent=2) + "\n")
+	""" Writes `ast_` to the path given with -o, by default ./ast.json (./ast.bin in the binary format) """
+	if args.format == "binary":
+		# serialized first, so nothing is written if that fails
+		data = serialize.dumps(ast_)
+		with open(args.output or "./ast.bin", "wb") as o:
+			o.write(data)
+	else:
+		with open(args.output or "./ast.json", "w") as o:
+			astjson.dump(ast_, o, _indent())
+			o.write("\n")
 
 
 args = Args()
@@ -49,7 +150,7 @@ def main(arguments: Sequence[str] = None) -> int:
 		"-f", "--file",
 		default="<stdin>",
 		type=str,
-		help="Input file (ending with .nyr)",
+		help="Input file (ending with .nyr), or an AST written with -o (ending with .json or .bin) to run without parsing",
 		dest="inputFile",
 	)
 	argparser.add_argument(
@@ -60,10 +161,22 @@ def main(arguments: Sequence[str] = None) -> int:
 	)
 	argparser.add_argument(
 		"-o", "--output",
-		action="store_true",
-		help="Output AST to ast.json",
+		nargs="?",
+		default=None,
+		const="",
+		type=str,
+		help="Output AST to PATH (default: ast.json, or ast.bin in the binary format)",
+		metavar="PATH",
 		dest="output",
 	)
+	argparser.add_argument(
+		"--format",
+		default="json",
+		choices=("json", "compact", "binary"),
+		help="Format of the AST output with -o: indented JSON, JSON without whitespace or the binary format of "
+		"nyr.parser.serialize (-p prints binary as indented JSON)",
+		dest="format",
+	)
 	argparser.add_argument(
 		"-p", "--print",
 		action="store_true",
@@ -76,16 +189,78 @@ def main(arguments: Sequence[str] = None) -> int:
 		help="Wether to print debug messages on what the interpreter is doing",
 		dest="debug",
 	)
+	argparser.add_argument(
+		"--iterative",
+		action="store_true",
+		help="Parse without recursion, for arbitrarily deeply nested input",
+		dest="iterative",
+	)
+	argparser.add_argument(
+		"--no-cache",
+		action="store_false",
+		help=f"Always parse the input file instead of using the AST cached in {cache.CACHE_DIRECTORY}",
+		dest="cache",
+	)
+	argparser.add_argument(
+		"--cache-dir",
+		default=None,
+		type=str,
+		help=f"Directory to cache ASTs in (default: {cache.CACHE_DIRECTORY} next to the input file)",
+		dest="cacheDir",
+	)
+	argparser.add_argument(
+		"--stream",
+		action="store_true",
+		help="Parse and interpret the input file statement by statement while reading it (implied for piped stdin)",
+		dest="stream",
+	)
+	argparser.add_argument(
+		"--lazy",
+		action="store_true",
+		help="Only parse function bodies when they are first called (syntax errors in them are raised then), implies --no-cache",
+		dest="lazy",
+	)
+	argparser.add_argument(
+		"--parallel",
+		nargs="?",
+		default=None,
+		const=0,
+		type=int,
+		help="Parse large input files in JOBS worker processes (default: one per CPU), split at declarations at the start of lines",
+		metavar="JOBS",
+		dest="jobs",
+	)
+	argparser.add_argument(
+		"--engine",
+		default="tree",
+		choices=("tree", "closure"),
+		help="How to interpret: walking the AST, or compiling it to Python closures first (faster, no debug messages)",
+		dest="engine",
+	)
 
+	# argparse only sets the defaults of options not in the namespace yet, so forget those of earlier calls
+	vars(args).clear()
 	argparser.parse_args(arguments, namespace=args)
+	if sum((args.lazy, args.iterative, args.jobs is not None)) > 1:
+		argparser.error("Only one of --lazy, --iterative and --parallel can be given")
+	if args.debug and args.engine != "tree":
+		argparser.error("-d only works with --engine tree")
 
 	# just ignore
 	_printAst = printAst if args.printAST else lambda _: _
-	_outputAst = outputAST if args.output else lambda _: _
+	_outputAst = outputAST if args.output is not None else lambda _: _
 	_interpret = interpret if args.interpret else lambda _: _
 
+	# Streaming mode (read from piped stdin or, with --stream, from the file)
+	if args.inputFile == "<stdin>" and not sys.stdin.isatty():
+		runStream(sys.stdin)
+
+	elif args.stream and args.inputFile.endswith(".nyr"):
+		with open(args.inputFile) as f:
+			runStream(f)
+
 	# REPL (read from stdin)
-	if args.inputFile == "<stdin>":
+	elif args.inputFile == "<stdin>":
 		while True:
 			try:
 				cmd = input("nyr> ").strip()
@@ -101,7 +276,7 @@ def main(arguments: Sequence[str] = None) -> int:
 			if ";" not in cmd:
 				cmd += ";"
 
-			ast = getAst(cmd)
+			ast = getAst(cmd, args.iterative, args.lazy)
 
 			_printAst(ast)
 			_outputAst(ast)
@@ -109,19 +284,39 @@ def main(arguments: Sequence[str] = None) -> int:
 
 	# File mode (read from file given via -f flag)
 	elif args.inputFile.endswith(".nyr"):
-		with open(args.inputFile, "r") as f:
-			text = f.read()
+		# The file is tokenized straight from the page cache instead of being read into memory
+		with open(args.inputFile, "rb") as f:
+			if os.fstat(f.fileno()).st_size == 0:
+				text = b""
+			else:
+				text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			if re.search(rb"\S", text) is None:
+				ast = None
+			elif args.cache and not args.lazy:
+				ast = getCachedAst(text, args.inputFile, args.iterative, args.cacheDir, args.jobs)
+			else:
+				ast = getAst(text, args.iterative, args.lazy, args.jobs)
+		finally:
+			if isinstance(text, mmap.mmap):
+				text.close()
 
-		if not text.strip():
+		if ast is None:
 			print("\n[!] Input file empty!\n")
 			argparser.print_help()
 		else:
-			ast = getAst(text)
-
 			_printAst(ast)
 			_outputAst(ast)
 			_interpret(ast)
 
+	# AST mode (run an AST written with -o)
+	elif args.inputFile.endswith((".json", ".bin")):
+		ast = loadAst(args.inputFile)
+		_printAst(ast)
+		_outputAst(ast)
+		_interpret(ast)
+
 	# Unknown mode
 	else:
 		argparser.print_help()
@@ -0,0 +1,195 @@
+""" Tokenizing and parsing many files at once, spread over worker processes
+
+Every worker reads, parses and serializes (see `nyr.parser.serialize`) whole files, optionally storing
+them in the AST cache, and only sends back a `FileResult`: the status and timings of the file and, if
+asked for, its serialized program, which is a few compact bytes to pickle instead of a tree of nodes.
+Files are handed out in chunks, so throughput scales with the number of cores even for small files.
+
+Run with `python -m nyr.batch [-j JOBS] PATH...` to check and pre-compile all `.nyr` files under the given paths.
+"""
+import argparse
+import os
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple
+from typing import Optional
+from typing import Union
+
+from nyr.parser import cache
+from nyr.parser import node as Node
+from nyr.parser import serialize
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.limits import ParserLimitError
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parser import Parser
+
+SUFFIX = ".nyr"
+
+
+class FileResult(NamedTuple):
+	""" What a worker reports about one file, times are in seconds """
+	path: str
+	# None if the file was parsed, else why not (e.g. the message of its `SyntaxError`)
+	error: Optional[str]
+	size: int = 0
+	readTime: float = 0.0
+	parseTime: float = 0.0
+	# whether the program was loaded from the AST cache instead of being parsed
+	cached: bool = False
+	# the `serialize.dumps` of the program, if it was asked for
+	payload: Optional[bytes] = None
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None
+
+	def program(self) -> Node.Program:
+		""" Deserializes the program of the file (the result must have a payload) """
+		if self.payload is None:
+			raise ValueError(f"No program was returned for {self.path}")
+		return serialize.loads(self.payload)
+
+
+def collectFiles(paths: Iterable[Union[str, os.PathLike]]) -> list[Path]:
+	""" The given files and the `.nyr` files under the given directories, each directory in sorted order """
+	files: list[Path] = []
+	for path in map(Path, paths):
+		if path.is_dir():
+			files.extend(sorted(file for file in path.rglob(f"*{SUFFIX}") if file.is_file()))
+		else:
+			files.append(path)
+	return files
+
+
+def parseFile(
+	path: Union[str, os.PathLike],
+	iterative: bool = False,
+	useCache: bool = True,
+	cacheDirectory: Union[None, str, os.PathLike] = None,
+	keepProgram: bool = False,
+	limits: Optional[ParserLimits] = None,
+) -> FileResult:
+	""" Parses the file at `path`, never raising for errors in it (they are reported in the result)
+
+		Files exceeding `limits` are reported as errors. Cached files are only checked against the limit
+		on their size, loading them does not parse them.
+	"""
+	path = os.fspath(path)
+	start = time.perf_counter()
+	try:
+		with open(path, "rb") as f:
+			source = f.read()
+	except OSError as e:
+		return FileResult(path, f"{type(e).__name__}: {e.strerror or e}")
+	read = time.perf_counter()
+
+	payload: Optional[bytes] = None
+	cached = False
+	try:
+		if limits is not None:
+			limits.checkSource(source)
+		if useCache:
+			key = cache.cacheKey(source)
+			entry = cache.entryPath(path, cacheDirectory)
+			cachedPayload = cache.loadPayload(entry, key)
+			if cachedPayload is not None:
+				payload, cached = bytes(cachedPayload) if keepProgram else None, True
+
+		if not cached:
+			program = (IterativeParser if iterative else Parser)(limits).parse(source)
+			if useCache or keepProgram:
+				payload = serialize.dumps(program)
+			if useCache:
+				cache.storePayload(entry, key, payload)
+	# ValueError includes UnicodeDecodeError and integer literals too long to convert
+	except (SyntaxError, RecursionError, ValueError, ParserLimitError) as e:
+		return FileResult(path, f"{type(e).__name__}: {e}", len(source), read - start, time.perf_counter() - read)
+
+	return FileResult(path, None, len(source), read - start, time.perf_counter() - read, cached, payload if keepProgram else None)
+
+
+def parseFiles(
+	paths: Sequence[Union[str, os.PathLike]],
+	jobs: Optional[int] = None,
+	iterative: bool = False,
+	useCache: bool = True,
+	cacheDirectory: Union[None, str, os.PathLike] = None,
+	keepProgram: bool = False,
+	limits: Optional[ParserLimits] = None,
+) -> Iterator[FileResult]:
+	""" Yields the `parseFile` results of `paths` in order, parsed by `jobs` processes (default: one per CPU)
+
+		With one job, or a single file, everything runs in this process.
+	"""
+	work = partial(
+		parseFile,
+		iterative=iterative,
+		useCache=useCache,
+		cacheDirectory=cacheDirectory,
+		keepProgram=keepProgram,
+		limits=limits,
+	)
+	jobs = min(jobs or os.cpu_count() or 1, len(paths))
+
+	if jobs <= 1:
+		yield from map(work, paths)
+		return
+
+	with ProcessPoolExecutor(jobs) as executor:
+		# a few chunks per worker: small enough to balance uneven files, large enough to amortize the round trips
+		yield from executor.map(work, paths, chunksize=max(1, min(64, len(paths) // (4 * jobs))))
+
+
+def _status(result: FileResult) -> str:
+	if not result.ok:
+		return f"error  {result.path}: {result.error}"
+	return (
+		f"{'cached' if result.cached else 'ok':<6} {result.path} "
+		f"({result.size / 1024:.1f} KiB, read {result.readTime * 1000:.1f} ms, parse {result.parseTime * 1000:.1f} ms)"
+	)
+
+
+def main(arguments: Sequence[str] = None) -> int:
+	argparser = argparse.ArgumentParser(prog="python -m nyr.batch", description="Parse many .nyr files in parallel")
+	argparser.add_argument("paths", nargs="+", help=f"Files, and directories to search for {SUFFIX} files")
+	argparser.add_argument("-j", "--jobs", default=None, type=int, help="Number of worker processes (default: one per CPU)")
+	argparser.add_argument("-q", "--quiet", action="store_true", help="Only print files with errors and the summary")
+	argparser.add_argument("--iterative", action="store_true", help="Parse without recursion")
+	argparser.add_argument("--no-cache", action="store_false", help=f"Do not load from / store in {cache.CACHE_DIRECTORY}", dest="cache")
+	argparser.add_argument("--cache-dir", default=None, type=str, help="Directory to cache ASTs in", dest="cacheDir")
+	argparser.add_argument("--max-bytes", default=None, type=int, help="Reject files larger than this", dest="maxBytes")
+	argparser.add_argument("--max-tokens", default=None, type=int, help="Reject files with more tokens", dest="maxTokens")
+	argparser.add_argument("--max-nodes", default=None, type=int, help="Reject files with more AST nodes", dest="maxNodes")
+	argparser.add_argument("--max-depth", default=None, type=int, help="Reject files nesting brackets deeper", dest="maxDepth")
+	argparser.add_argument("--timeout", default=None, type=float, help="Reject files taking longer to parse (in seconds)")
+	args = argparser.parse_args(arguments)
+
+	files = collectFiles(args.paths)
+	limits = ParserLimits(args.maxBytes, args.maxTokens, args.maxNodes, args.maxDepth, args.timeout)
+
+	start = time.perf_counter()
+	errors = size = 0
+	busy = 0.0
+	for result in parseFiles(files, args.jobs, args.iterative, args.cache, args.cacheDir, limits=limits):
+		errors += not result.ok
+		size += result.size
+		busy += result.readTime + result.parseTime
+		if not args.quiet or not result.ok:
+			print(_status(result))
+	elapsed = time.perf_counter() - start
+
+	print(
+		f"{len(files)} files, {errors} with errors, {size / 2 ** 20:.1f} MiB in {elapsed:.2f} s "
+		f"({size / 2 ** 20 / elapsed if elapsed else 0:.1f} MiB/s, {busy / elapsed if elapsed else 0:.1f} files parsed in parallel on average)",
+	)
+
+	return 1 if errors else 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
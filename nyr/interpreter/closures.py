@@ -0,0 +1,563 @@
+""" Executing programs by compiling them to closures first
+
+`ClosureInterpreter` turns every node of a program into a Python closure with the closures of its children
+bound to it, once, and then runs those. It does what `Interpreter` does, to the same results and errors, without
+dispatching on the node classes or checking whether to log at every step of the execution; operators are
+looked up in `nyr.interpreter.operators` when compiling, and operands that are literals or variables are
+read directly instead of through closures of their own.
+
+A closure is called with the variables of the scope it runs in (the `members` of the `ActivationRecord` the
+`Interpreter` would have on top of its stack). Function bodies are compiled on their first call.
+"""
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Any
+from typing import Optional
+
+from nyr.interpreter.interpreter import MAXITERATIONS
+from nyr.interpreter.interpreter import MAXRECURSIONDEPTH
+from nyr.interpreter.interpreter import NodeVisitor
+from nyr.interpreter.operators import binaryOperators
+from nyr.interpreter.operators import operandError
+from nyr.interpreter.operators import unaryOperators
+from nyr.parser import node as Node
+from nyr.parser.lazy import LazyBlockStatement
+
+Closure = Callable[[dict], Any]
+
+# how an operand of a ComplexExpression is read: a variable of the name (if there is one, else the name itself),
+# a value or the value of a closure (looked up as a variable if it is a string)
+_NAME = 0
+_CONSTANT = 1
+_CLOSURE = 2
+
+# the statements that can result in a value, which blocks collect
+_valueStatements = (Node.IfStatement, Node.ReturnStatement, Node.BlockStatement)
+
+
+def _nothing(frame: dict):
+	return None
+
+
+def _constant(value) -> Closure:
+	def constant(frame: dict):
+		return value
+	return constant
+
+
+def _lookup(value, frame: dict):
+	""" The variable `value` names, if it is a string that does, else `value` """
+	if type(value) is str:
+		return frame.get(value, value)
+	return value
+
+
+class ClosureInterpreter(NodeVisitor):
+	""" Runs programs like `Interpreter`, but compiles them to closures first, see the module documentation
+
+		`compile` and `run` can be used to compile a program once and run it many times.
+	"""
+	fns: set[str]
+
+	def __init__(self):
+		self.fns = set()
+		self.depth = 1
+		# FIXME: as hacky as in the Interpreter, and likewise not reset between programs
+		self.breakLoop = False
+		# ids of the expressions compiled by the current `compile` that assign to variables
+		self._assigning: set[int] = set()
+		# id of a function body -> the body and its closure
+		self._bodies: dict[int, tuple[Node.Node, Closure]] = {}
+
+	def _reset(self):
+		self.fns.clear()
+		self.depth = 1
+
+	def compile(self, node: Node.Node) -> Closure:
+		""" The closure executing `node`, call it with the variables of the scope to run it in """
+		self._assigning = set()
+		try:
+			return self._compile(node)
+		finally:
+			self._assigning = set()
+
+	def run(self, program: Closure) -> dict:
+		""" Runs the closure of a compiled program and returns its variables, as `Interpreter.interpret` does """
+		self._reset()
+		frame: dict = {}
+		program(frame)
+		return frame
+
+	def interpret(self, ast: Node.Program) -> dict:
+		return self.run(self.compile(ast))
+
+	def interpretStatements(self, statements: Iterable[Node.Node]) -> dict:
+		""" Like `interpret`, but compiles and executes the top-level statements one by one as `statements` yields them """
+		self._reset()
+		frame: dict = {}
+		for statement in statements:
+			self.compile(statement)(frame)
+		return frame
+
+	def _compile(self, node: Optional[Node.Node]) -> Closure:
+		if node is None:
+			return _nothing
+		return self.visit(node)
+
+	def genericVisit(self, node: Node.Node) -> Closure:
+		def unsupported(frame: dict):
+			raise Exception(f"visit{type(node).__name__} not found")
+		return unsupported
+
+	def _constantOf(self, node: Node.Node) -> tuple[bool, Any]:
+		""" Whether `node` always evaluates to the same value, and that value """
+		if type(node) is Node.Literal:
+			return True, node.value
+		if type(node) is Node.UnaryExpression:
+			isConstant, value = self._constantOf(node.argument)
+			if isConstant and value is not None:
+				try:
+					return True, unaryOperators[node.operator](value)
+				except TypeError:
+					# raised when the expression is run
+					pass
+		return False, None
+
+	def _operand(self, node: Node.Node) -> tuple[int, Any]:
+		""" How to read `node` as an operand of a ComplexExpression, see `_NAME` """
+		if type(node) is Node.Identifier:
+			return _NAME, node.name
+		isConstant, value = self._constantOf(node)
+		if isConstant:
+			return (_NAME if type(value) is str else _CONSTANT), value
+		return _CLOSURE, self._compile(node)
+
+	def _operandClosure(self, kind: int, operand) -> Closure:
+		""" The closure of the value of an operand of a ComplexExpression, read as `kind` says """
+		if kind == _NAME:
+			def name(frame: dict):
+				return frame.get(operand, operand)
+			return name
+		if kind == _CONSTANT:
+			return _constant(operand)
+
+		def value(frame: dict):
+			value = operand(frame)
+			if type(value) is str:
+				return frame.get(value, value)
+			return value
+		return value
+
+	def _sideClosure(self, kind: int, operand) -> Closure:
+		""" The closure of an operand of a ComplexExpression as the `Interpreter` visits it: identifiers are their names """
+		if kind == _CLOSURE:
+			return operand
+		return _constant(operand)
+
+	# PROGRAM AND STATEMENTS
+
+	def visitProgram(self, node: Node.Program) -> Closure:
+		return self._statements([self._compile(statement) for statement in node.body])
+
+	def _statements(self, statements: list[Closure]) -> Closure:
+		def statementList(frame: dict):
+			for statement in statements:
+				statement(frame)
+		return statementList
+
+	def visitExpressionStatement(self, node: Node.ExpressionStatement) -> Closure:
+		expression = self._compile(node.expression)
+		if type(node.expression) is Node.ComplexExpression and node.expression.type == "AssignmentExpression":
+			# results in None, which is not "break"
+			return expression
+
+		def expressionStatement(frame: dict):
+			if expression(frame) == "break":
+				self.breakLoop = True
+		return expressionStatement
+
+	def visitEmptyStatement(self, _: Node.EmptyStatement) -> Closure:
+		return _nothing
+
+	def visitBlockStatement(self, node: Node.BlockStatement) -> Closure:
+		statements = [self._compile(statement) for statement in node.body]
+		if len(statements) == 1:
+			# a single result is the result of the block
+			return statements[0]
+		if not any(isinstance(statement, _valueStatements) for statement in node.body):
+			return self._statements(statements)
+
+		def block(frame: dict):
+			returns = []
+			for statement in statements:
+				r = statement(frame)
+				if r is not None:
+					returns.append(r)
+			if len(returns) == 0:
+				return None
+			elif len(returns) == 1:
+				return returns[0]
+			return returns
+		return block
+
+	def visitIfStatement(self, node: Node.IfStatement) -> Closure:
+		test = self._compile(node.test)
+		consequent = self._compile(node.consequent)
+		alternative = self._compile(node.alternative)
+
+		def ifStatement(frame: dict):
+			value = test(frame)
+			assert isinstance(value, bool), f"Expected bool, got {type(value).__name__} instead"
+			if value:
+				return consequent(frame)
+			return alternative(frame)
+		return ifStatement
+
+	def visitVariableStatement(self, node: Node.VariableStatement) -> Closure:
+		declarations = [self._compile(declaration) for declaration in node.declarations]
+		if len(declarations) == 1:
+			return declarations[0]
+		return self._statements(declarations)
+
+	def visitWhileStatement(self, node: Node.WhileStatement) -> Closure:
+		test = self._compile(node.test)
+		body = self._compile(node.body)
+
+		def whileStatement(frame: dict):
+			value = test(frame)
+			assert isinstance(value, bool), f"Interpreter::Node.WhileStatement: Expected bool, got {type(value)} instead"
+
+			iterations = 0
+			while value is True:
+				body(frame)
+				value = test(frame)
+				assert isinstance(value, bool), f"Interpreter::Node.WhileStatement: Expected bool, got {type(value)} instead"
+
+				iterations += 1
+				if iterations > MAXITERATIONS:
+					raise RecursionError(f"Exceeded {MAXITERATIONS} iterations in while statement")
+
+				if self.breakLoop is True:
+					self.breakLoop = False
+					break
+		return whileStatement
+
+	def visitDoWhileStatement(self, node: Node.DoWhileStatement) -> Closure:
+		test = self._compile(node.test)
+		body = self._compile(node.body)
+
+		def doWhileStatement(frame: dict):
+			body(frame)
+			value = test(frame)
+			assert isinstance(value, bool), f"Interpreter::Node.DoWhileStatement: Expected bool, got {type(value)} instead"
+
+			iterations = 0
+			while value is True:
+				body(frame)
+				value = test(frame)
+				assert isinstance(value, bool), f"Interpreter::Node.DoWhileStatement: Expected bool, got {type(value)} instead"
+
+				iterations += 1
+				if iterations > MAXITERATIONS:
+					raise RecursionError(f"Exceeded {MAXITERATIONS} iterations in do-while statement")
+
+				if self.breakLoop is True:
+					self.breakLoop = False
+					break
+		return doWhileStatement
+
+	def visitForStatement(self, node: Node.ForStatement) -> Closure:
+		init = self._compile(node.init)
+		# the variables declared by init only exist in the loop
+		tempDecls = [decl.id.name for decl in node.init.declarations] if isinstance(node.init, Node.VariableStatement) else []
+		test = None if node.test is None else self._compile(node.test)
+		update = self._compile(node.update)
+		body = self._compile(node.body)
+
+		def forStatement(frame: dict):
+			init(frame)
+			value = True
+			if test is not None:
+				value = test(frame)
+				assert isinstance(value, bool), f"Interpreter::Node.ForStatement: Expected bool, got {type(value)} instead"
+
+			iterations = 0
+			while value is True:
+				body(frame)
+				update(frame)
+
+				if test is not None:
+					value = test(frame)
+					assert isinstance(value, bool), f"Interpreter::Node.ForStatement: Expected bool, got {type(value)} instead"
+				iterations += 1
+				if iterations > MAXITERATIONS:
+					raise RecursionError(f"Exceeded {MAXITERATIONS} iterations in for statement")
+
+				if self.breakLoop is True:
+					self.breakLoop = False
+					break
+
+			for decl in tempDecls:
+				del frame[decl]
+		return forStatement
+
+	def visitReturnStatement(self, node: Node.ReturnStatement) -> Closure:
+		return self._compile(node.argument)
+
+	# EXPRESSIONS
+
+	def visitComplexExpression(self, node: Node.ComplexExpression) -> Closure:
+		left = self._operand(node.left)
+		right = self._operand(node.right)
+		rightAssigns = id(node.right) in self._assigning
+
+		if node.type == "AssignmentExpression":
+			closure = self._assignment(node, left, right)
+		elif node.type not in ("BinaryExpression", "LogicalExpression", "BitwiseExpression"):  # pragma: no cover
+			def closure(frame: dict):
+				raise Exception(f"Unknown ComplexExpression: {node}")
+		elif rightAssigns:
+			closure = self._assigningOperation(node.operator, left, right)
+		else:
+			closure = self._operation(node.operator, left, right)
+
+		if node.type == "AssignmentExpression" or rightAssigns or id(node.left) in self._assigning:
+			self._assigning.add(id(node))
+		return closure
+
+	def _operation(self, op: str, left: tuple[int, Any], right: tuple[int, Any]) -> Closure:
+		""" The closure of an operator on two operands (see `_operand`), where the right one does not assign to variables
+
+			So the left one can be looked up before the right one is evaluated.
+		"""
+		function = binaryOperators[op]
+		(leftKind, leftOperand), (rightKind, rightOperand) = left, right
+
+		if leftKind == _NAME and rightKind == _CONSTANT:
+			def operation(frame: dict):
+				lVal = frame.get(leftOperand, leftOperand)
+				try:
+					return function(lVal, rightOperand)
+				except TypeError:
+					raise operandError(op, lVal, rightOperand) from None
+		elif leftKind == _NAME and rightKind == _NAME:
+			def operation(frame: dict):
+				lVal = frame.get(leftOperand, leftOperand)
+				rVal = frame.get(rightOperand, rightOperand)
+				try:
+					return function(lVal, rVal)
+				except TypeError:
+					raise operandError(op, lVal, rVal) from None
+		elif leftKind == _CONSTANT and rightKind == _NAME:
+			def operation(frame: dict):
+				rVal = frame.get(rightOperand, rightOperand)
+				try:
+					return function(leftOperand, rVal)
+				except TypeError:
+					raise operandError(op, leftOperand, rVal) from None
+		else:
+			leftValue = self._operandClosure(*left)
+			rightValue = self._operandClosure(*right)
+
+			def operation(frame: dict):
+				lVal = leftValue(frame)
+				rVal = rightValue(frame)
+				try:
+					return function(lVal, rVal)
+				except TypeError:
+					raise operandError(op, lVal, rVal) from None
+		return operation
+
+	def _assigningOperation(self, op: str, left: tuple[int, Any], right: tuple[int, Any]) -> Closure:
+		""" The closure of an operator whose right operand assigns to variables, which can change what the left one is """
+		function = binaryOperators[op]
+		leftSide = self._sideClosure(*left)
+		rightSide = self._sideClosure(*right)
+
+		def operation(frame: dict):
+			lVal = leftSide(frame)
+			rVal = rightSide(frame)
+			lVal = _lookup(lVal, frame)
+			rVal = _lookup(rVal, frame)
+			try:
+				return function(lVal, rVal)
+			except TypeError:
+				raise operandError(op, lVal, rVal) from None
+		return operation
+
+	def _assignment(self, node: Node.ComplexExpression, left: tuple[int, Any], right: tuple[int, Any]) -> Closure:
+		op = node.operator
+		function = None if op == "=" else binaryOperators[op[0]]
+
+		if type(node.left) is not Node.Identifier:
+			leftSide = self._sideClosure(*left)
+			rightSide = self._sideClosure(*right)
+
+			def assignment(frame: dict):
+				target = leftSide(frame)
+				rVal = _lookup(rightSide(frame), frame)
+				lVal = _lookup(target, frame)
+				if target not in frame:
+					raise NameError(f'Variable "{target}" does not exist in available scope')
+				if function is not None:
+					try:
+						rVal = function(lVal, rVal)
+					except TypeError:
+						raise operandError(op[0], lVal, rVal) from None
+				frame[target] = rVal
+			return assignment
+
+		name = node.left.name
+		rightKind, rightOperand = right
+		if rightKind == _CONSTANT and function is not None:
+			def assignment(frame: dict):
+				if name not in frame:
+					raise NameError(f'Variable "{name}" does not exist in available scope')
+				lVal = frame[name]
+				try:
+					frame[name] = function(lVal, rightOperand)
+				except TypeError:
+					raise operandError(op[0], lVal, rightOperand) from None
+			return assignment
+
+		rightValue = self._operandClosure(*right)
+		if function is None:
+			def assignment(frame: dict):
+				rVal = rightValue(frame)
+				if name not in frame:
+					raise NameError(f'Variable "{name}" does not exist in available scope')
+				frame[name] = rVal
+			return assignment
+
+		def assignment(frame: dict):
+			rVal = rightValue(frame)
+			if name not in frame:
+				raise NameError(f'Variable "{name}" does not exist in available scope')
+			lVal = frame[name]
+			try:
+				frame[name] = function(lVal, rVal)
+			except TypeError:
+				raise operandError(op[0], lVal, rVal) from None
+		return assignment
+
+	def visitUnaryExpression(self, node: Node.UnaryExpression) -> Closure:
+		isConstant, value = self._constantOf(node)
+		if isConstant:
+			return _constant(value)
+
+		op = node.operator
+		function = unaryOperators[op]
+		argument = self._compile(node.argument)
+		if id(node.argument) in self._assigning:
+			self._assigning.add(id(node))
+
+		def unary(frame: dict):
+			val = argument(frame)
+			if val is None:
+				raise SyntaxError(f'Cannot use {op} on "null"')
+			try:
+				return function(val)
+			except TypeError:
+				raise operandError(op, val) from None
+		return unary
+
+	def visitCallExpression(self, node: Node.CallExpression) -> Closure:
+		if type(node.callee) is not Node.Identifier:
+			def call(frame: dict):
+				# raises like in the Interpreter
+				return node.callee.name
+			return call
+
+		name = node.callee.name
+		fn = node.fn
+		arguments = [self._compile(argument) for argument in node.arguments]
+		count = len(arguments)
+		fns = self.fns
+		if any(id(argument) in self._assigning for argument in node.arguments):
+			self._assigning.add(id(node))
+		# the parameter names and the closure of the body, as of the last call
+		params: Optional[list] = None
+		names: list[str] = []
+		body: Optional[Node.Node] = None
+		run: Closure = _nothing
+
+		def call(frame: dict):
+			nonlocal params, names, body, run
+			if name not in fns:
+				raise NameError(f'Function "{name}" does not exist in available scope')
+			if fn is None:  # pragma: no cover
+				raise Exception(f'Failed to aquire function for "{name}"')
+			if len(fn.get("args")) != count:
+				raise Exception(f"Incorrect amount of arguments given. Expected {len(fn.get('args'))}, got {count}")
+
+			level = self.depth + 1
+			if level > MAXRECURSIONDEPTH:
+				raise RecursionError(f'Exceeded recursion depth of {MAXRECURSIONDEPTH} in function "{name}"')
+			if fn.get("args") is not params:
+				params = fn.get("args")
+				names = [param.name if isinstance(param, Node.Identifier) else param for param in params]
+
+			callee = {}
+			for param, argument in zip(names, arguments):
+				callee[param] = argument(frame)
+
+			if body is None or fn.get("body", None) is not body:
+				run = self._functionBody(fn, name)
+				body = fn["body"]
+
+			self.depth = level
+			ret = run(callee)
+			self.depth = level - 1
+			return ret
+		return call
+
+	def _functionBody(self, fn: dict, name: str) -> Closure:
+		""" The closure of the body of `fn`, compiled (and parsed, if it is lazy) once for all its calls """
+		body = fn.get("body", None)
+		assert body is not None, f'Failed to aquire function body for "{name}"'
+		if isinstance(body, LazyBlockStatement):
+			body = fn["body"] = body.parse()
+
+		compiled = self._bodies.get(id(body))
+		if compiled is None or compiled[0] is not body:
+			compiled = self._bodies[id(body)] = (body, self.compile(body))
+		return compiled[1]
+
+	# DECLARATIONS
+
+	def visitVariableDeclaration(self, node: Node.VariableDeclaration) -> Closure:
+		identifier = self._compile(node.id)
+		init = self._compile(node.init)
+
+		def variableDeclaration(frame: dict):
+			varName = identifier(frame)
+			varValue = init(frame)
+			if varName in frame:
+				# FIXME: Does not happen for some reason (the identifier is the value of the variable then)
+				raise NameError(f'Variable "{varName}" already exists in available scope')
+			elif type(varName) != str:
+				raise NameError(f'Unknown variable "{varName}"')
+			frame[varName] = varValue
+		return variableDeclaration
+
+	def visitFunctionDeclaration(self, node: Node.FunctionDeclaration) -> Closure:
+		name = node.name.name
+		fns = self.fns
+
+		def functionDeclaration(frame: dict):
+			if name in fns:
+				raise NameError(f'Function "{name}" already exists in available scope')
+			fns.add(name)
+		return functionDeclaration
+
+	# OTHER
+
+	def visitIdentifier(self, node: Node.Identifier) -> Closure:
+		name = node.name
+
+		def identifier(frame: dict):
+			return frame.get(name, name)
+		return identifier
+
+	def visitLiteral(self, node: Node.Literal) -> Closure:
+		return _constant(node.value)
@@ -1,24 +1,37 @@
 import logging
-import math
 import sys
 from collections.abc import Callable
+from collections.abc import Iterable
 
+from nyr.interpreter.operators import binaryOperators
+from nyr.interpreter.operators import operandError
+from nyr.interpreter.operators import unaryOperators
 from nyr.interpreter.stack import ActivationRecord
 from nyr.interpreter.stack import ARType
 from nyr.interpreter.stack import Stack
 from nyr.parser import node as Node
+from nyr.parser.lazy import LazyBlockStatement
 
 MAXITERATIONS = 2 ** 16
 MAXRECURSIONDEPTH = 128
 
 
 class NodeVisitor:
+	""" `visit(node)` calls `visit<class name>(node)`, or `genericVisit` if there is none
+
+		The methods are looked up once per subclass, when it is created, into a table indexed by `Node.kind`;
+		its last entry is `genericVisit`, for the node classes outside `Node.nodeClasses` (kind -1).
+	"""
+	_visitors: tuple[Callable, ...] = ()
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls._visitors = (*(getattr(cls, f"visit{nodeClass.__name__}", cls.genericVisit) for nodeClass in Node.nodeClasses), cls.genericVisit)
+
 	def visit(self, node: Node.Node):
 		if node is None:
 			return None
-		vName = f"visit{type(node).__name__}"
-		visitor: Callable = getattr(self, vName, self.genericVisit)
-		return visitor(node)
+		return self._visitors[node.kind](self, node)
 
 	def genericVisit(self, node):  # pragma: no cover
 		raise Exception(f"visit{type(node).__name__} not found")
@@ -63,23 +76,37 @@ class Interpreter(NodeVisitor):
 		self._reset()
 		return self.visit(ast)
 
+	def interpretStatements(self, statements: Iterable[Node.Node]):
+		""" Like `interpret`, but executes the top-level statements one by one as `statements` yields them
+
+			Meant for `Parser.iterStatements`: execution starts with the first statement parsed,
+			and statements are dropped once executed (unless something, like a call, refers to them).
+		"""
+		self._reset()
+		return self._program("Program", statements)
+
 	def visitProgram(self, node: Node.Program):
+		return self._program(node.type, node.body)
+
+	def _program(self, name: str, statements: Iterable[Node.Node]):
 		self.logVisit("ENTER: Node.Program")
 
 		ar = ActivationRecord(
-			node.type,
+			name,
 			ARType.PROGRAM,
 			1,
 		)
 		self.stack.push(ar)
 
-		self.logStack(str(ar))
+		if self._logStack:  # pragma: no cover
+			self.logStack(str(ar))
 
-		for n in node.body:
+		for n in statements:
 			self.visit(n)
 
 		self.logVisit("LEAVE: Node.Program")
-		self.logStack(str(self.stack))
+		if self._logStack:  # pragma: no cover
+			self.logStack(str(self.stack))
 		self.logFinal()
 		return self.stack.pop().members
 
@@ -219,78 +246,30 @@ class Interpreter(NodeVisitor):
 
 	# EXPRESSIONS
 
-	def _binaryExpression(self, **kwargs):
-		lVal = kwargs.get("lVal")
-		rVal = kwargs.get("rVal")
-		op = kwargs.get("op")
-
-		assert lVal is not None, "Expected value, got None instead"
-		assert rVal is not None, "Expected value, got None instead"
-
-		if op == "/":
-			try:
-				res = eval(f"{lVal} / {rVal}")
-			except ZeroDivisionError:
-				raise ZeroDivisionError("Cannot divide by 0")
-
-			if math.floor(res) == math.ceil(res):
-				_res = int(res)
-			else:
-				_res = float(res)
-		else:
-			if type(lVal) == str:
-				lVal = f'"{lVal}"'
-			if type(rVal) == str:
-				rVal = f'"{rVal}"'
-
-			_res = eval(f"{lVal} {op} {rVal}")
-
-		return _res
-
-	def _assignmentExpression(self, **kwargs):
-		left = kwargs.get("left")
-		lVal = kwargs.get("lVal")
-		rVal = kwargs.get("rVal")
-		op = kwargs.get("op")
+	def _operatorExpression(self, op: str, left, lVal, rVal):
+		try:
+			return binaryOperators[op](lVal, rVal)
+		except TypeError:
+			raise operandError(op, lVal, rVal) from None
 
+	def _assignmentExpression(self, op: str, left, lVal, rVal):
 		ar = self.stack.peek()
 		if not ar.varExists(left):
 			raise NameError(f'Variable "{left}" does not exist in available scope')
 
 		if op != "=":
-			op = op[0]
-			assert lVal is not None, "Expected value, got None instead"
-			assert rVal is not None, "Expected value, got None instead"
-
-			if type(lVal) == str:
-				lVal = f'"{lVal}"'
-			if type(rVal) == str:
-				rVal = f'"{rVal}"'
-
-			rVal = eval(f"{lVal} {op} {rVal}")
+			rVal = self._operatorExpression(op[0], left, lVal, rVal)
 
 		ar[left] = rVal
 
-	def _logicalExpression(self, **kwargs):
-		lVal = kwargs.get("lVal")
-		rVal = kwargs.get("rVal")
-		op = kwargs.get("op")
-
-		try:
-			operator = {"&&": "and", "||": "or"}[op]
-		except KeyError:  # pragma: no cover
-			# **should** not happen
-			raise SyntaxError(f"Unknown operator in Logical Expression: {op}")
-		return eval(f"{lVal} {operator} {rVal}")
-
-	def _bitwiseExpression(self, **kwargs):
-		lVal = kwargs.get("lVal")
-		rVal = kwargs.get("rVal")
-		op = kwargs.get("op")
-
-		assert lVal is not None, "Expected value, got None instead"
-		assert rVal is not None, "Expected value, got None instead"
-		return eval(f"{lVal} {op} {rVal}")
+	# ComplexExpression type -> handler, called with the operator, the left-hand side (a name for identifiers)
+	# and the values of both sides
+	_complexExpressions: dict[str, Callable] = {
+		"BinaryExpression": _operatorExpression,
+		"AssignmentExpression": _assignmentExpression,
+		"LogicalExpression": _operatorExpression,
+		"BitwiseExpression": _operatorExpression,
+	}
 
 	def visitComplexExpression(self, node: Node.ComplexExpression):
 		self.logVisit("ENTER: Node.ComplexExpression")
@@ -323,27 +302,10 @@ class Interpreter(NodeVisitor):
 		else:
 			rVal = right
 
-		if left is None:  # pragma: no cover
-			raise Exception(f"Unknown left-hand side of ComplexExpression: {node.left}")
-		if right is None:  # pragma: no cover
-			raise Exception(f"Unknown right-hand side of ComplexExpression: {node.right}")
-
-		_res = None
-
-		try:
-			_res = {
-				"BinaryExpression": self._binaryExpression,
-				"AssignmentExpression": self._assignmentExpression,
-				"LogicalExpression": self._logicalExpression,
-				"BitwiseExpression": self._bitwiseExpression,
-			}[node.type](
-				op=node.operator,
-				left=left,
-				lVal=lVal,
-				rVal=rVal,
-			)
-		except KeyError:  # pragma: no cover
+		handler = self._complexExpressions.get(node.type)
+		if handler is None:  # pragma: no cover
 			raise Exception(f"Unknown ComplexExpression: {node}")
+		_res = handler(self, node.operator, left, lVal, rVal)
 
 		self.logVisit("LEAVE: Node.ComplexExpression")
 		return _res
@@ -353,11 +315,10 @@ class Interpreter(NodeVisitor):
 		val = self.visit(node.argument)
 		if val is None:
 			raise SyntaxError(f'Cannot use {node.operator} on "null"')
-		else:
-			if node.operator == "!":
-				val = eval(f"not {val}", self.stack.peek().members)
-			else:
-				val = eval(f"{node.operator}{val}", self.stack.peek().members)
+		try:
+			val = unaryOperators[node.operator](val)
+		except TypeError:
+			raise operandError(node.operator, val) from None
 		self.logVisit("LEAVE: Node.UnaryExpression")
 		return val
 
@@ -383,16 +344,22 @@ class Interpreter(NodeVisitor):
 				ar[argName] = self.visit(argValue)
 
 		self.stack.push(ar)
-		self.logVisit(f"ENTER: Node.CallExpression({node.callee.name}, {ar.members})")
-		self.logStack(str(self.stack))
+		if self._logVisit:  # pragma: no cover
+			self.logVisit(f"ENTER: Node.CallExpression({node.callee.name}, {ar.members})")
+		if self._logStack:  # pragma: no cover
+			self.logStack(str(self.stack))
 
 		f = node.fn.get("body", None)
 		assert f is not None, f'Failed to aquire function body for "{node.callee.name}"'
+		if isinstance(f, LazyBlockStatement):
+			f = node.fn["body"] = f.parse()
 
 		ret = self.visit(f)
 
-		self.logVisit(f"LEAVE: Node.CallExpression({node.callee.name})")
-		self.logStack(str(self.stack))
+		if self._logVisit:  # pragma: no cover
+			self.logVisit(f"LEAVE: Node.CallExpression({node.callee.name})")
+		if self._logStack:  # pragma: no cover
+			self.logStack(str(self.stack))
 		self.stack.pop()
 		return ret
 
@@ -413,8 +380,9 @@ class Interpreter(NodeVisitor):
 	def visitVariableDeclaration(self, node: Node.VariableDeclaration):
 		varName = self.visit(node.id)
 		varValue = self.visit(node.init)
-		_vv = f'"{varValue}"' if type(varValue) == str else varValue
-		self.logVisit(f"ENTER: Node.VariableDeclaration({varName}, {_vv})")
+		if self._logVisit:  # pragma: no cover
+			_vv = f'"{varValue}"' if type(varValue) == str else varValue
+			self.logVisit(f"ENTER: Node.VariableDeclaration({varName}, {_vv})")
 		ar = self.stack.peek()
 		if ar.varExists(varName):
 			# FIXME: Does not happen for some reason
@@ -422,8 +390,8 @@ class Interpreter(NodeVisitor):
 		elif type(varName) != str:
 			raise NameError(f'Unknown variable "{varName}"')
 		ar[varName] = varValue
-		self.logVisit(f"LEAVE: Node.VariableDeclaration({varName}, {_vv})")
-		del _vv
+		if self._logVisit:  # pragma: no cover
+			self.logVisit(f"LEAVE: Node.VariableDeclaration({varName}, {_vv})")
 
 	def visitFunctionDeclaration(self, node: Node.FunctionDeclaration):
 		nodeName = node.name.name
@@ -0,0 +1,78 @@
+""" What nyr's operators do, on the Python values of nyr's types
+
+The values of nyr are `int`, `float`, `str`, `bool` and `None` (null). Operators act as Python's do on them, except that:
+
+- `/` keeps integers: a quotient without a fractional part is an `int` (`6 / 3` and `6.0 / 2` are `3`,
+`7 / 2` is `3.5`), and the quotient of two ints that divide evenly is exact, however large they are.
+Dividing by 0 raises a `ZeroDivisionError`, a quotient that is neither exact nor fits in a float an `OverflowError`
+- `&&` and `||` evaluate to one of their operands, like Python's `and` and `or`; null is false
+- null can only be compared with `==` and `!=`; other operators on it raise a `TypeError` (see `operandError`)
+
+Compound assignments (`x += y`, ...) use the operator of their first character.
+"""
+import operator
+from collections.abc import Callable
+from typing import Any
+
+
+def divide(left, right):
+	if not isinstance(left, (int, float)) or not isinstance(right, (int, float)):
+		raise TypeError("unsupported operand type(s) for /")
+	if right == 0:
+		raise ZeroDivisionError("Cannot divide by 0")
+	if isinstance(left, int) and isinstance(right, int) and left % right == 0:
+		return left // right
+	try:
+		quotient = left / right
+	except OverflowError:
+		# of integers too large for a float, which do not divide evenly
+		raise OverflowError("Cannot divide: the quotient is too large for a float") from None
+	if type(quotient) is float and quotient.is_integer():
+		return int(quotient)
+	return quotient
+
+
+def logicalAnd(left, right):
+	return left and right
+
+
+def logicalOr(left, right):
+	return left or right
+
+
+binaryOperators: dict[str, Callable[[Any, Any], Any]] = {
+	"+": operator.add,
+	"-": operator.sub,
+	"*": operator.mul,
+	"/": divide,
+	"%": operator.mod,
+	"==": operator.eq,
+	"!=": operator.ne,
+	"<": operator.lt,
+	"<=": operator.le,
+	">": operator.gt,
+	">=": operator.ge,
+	"&&": logicalAnd,
+	"||": logicalOr,
+	"&": operator.and_,
+	"|": operator.or_,
+	"^": operator.xor,
+}
+
+unaryOperators: dict[str, Callable[[Any], Any]] = {
+	"-": operator.neg,
+	"+": operator.pos,
+	"!": operator.not_,
+}
+
+_typeNames = {int: "int", float: "float", str: "str", bool: "bool", type(None): "null"}
+
+
+def typeName(value) -> str:
+	""" The name of the nyr type of `value` """
+	return _typeNames.get(type(value), type(value).__name__)
+
+
+def operandError(op: str, *values) -> TypeError:
+	""" The error for applying `op` to `values` of types it is not defined for """
+	return TypeError(f"Cannot use {op} on {' and '.join(typeName(value) for value in values)}")
@@ -0,0 +1,336 @@
+""" Writing ASTs as JSON, straight to a file, and reading them back
+
+`dump` writes exactly what `json.dump(ast, fp, cls=ComplexEncoder, indent=indent)` would, but walks the tree
+itself instead of asking every node for a `toJSON()` dict: it knows the fields of the node classes, does not
+recurse (so trees of any depth can be written) and writes the text in large pieces as it goes, so neither
+the whole text nor the dicts of the nodes ever exist at once.
+
+`load` builds the nodes while `json` decodes the objects, and links the `CallExpression`s as parsing does.
+JSON has no spans, so the loaded nodes span `[0, 0)`; `nyr.parser.serialize` keeps them.
+"""
+import io
+import json
+import re
+from json.decoder import scanstring
+from json.encoder import encode_basestring_ascii
+from operator import itemgetter
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import TextIO
+from typing import Union
+
+from nyr.parser import node as Node
+
+# Pieces of text collected before they are written
+BUFFER_PIECES = 4096
+
+# Most levels skipped before trying to encode a too deep value in C again
+MAX_BACKOFF = 256
+
+_INFINITY = float("inf")
+
+# field name -> its JSON key, per node class ("type" first, as in `toJSON()`)
+_keys: dict[type, tuple[tuple[str, str], ...]] = {
+	cls: tuple((name, encode_basestring_ascii(name)) for name in ("type", *(field for field in cls._fields if field != "type")))
+	for cls in Node.nodeClasses
+}
+
+
+def _builder(cls: type[Node.Node]) -> Callable[[dict[str, Any]], Node.Node]:
+	""" Builds a `cls` from its `toJSON()`, raises `KeyError` for missing fields """
+	if not cls._fields:
+		return lambda value: cls()
+	get = itemgetter(*cls._fields)
+	if len(cls._fields) == 1:
+		return lambda value: cls(get(value))
+	return lambda value: cls(*get(value))
+
+
+# "type" -> builder of its class, for the classes with a single type
+_builders: dict[str, Callable[[dict[str, Any]], Node.Node]] = {
+	cls.type: _builder(cls) for cls in Node.nodeClasses if isinstance(getattr(cls, "type", None), str)
+}
+# the keys of the classes with several types -> builder of the class
+_buildersByKeys: dict[frozenset[str], Callable[[dict[str, Any]], Node.Node]] = {
+	frozenset(cls._fields): _builder(cls) for cls in (Node.ComplexExpression, Node.Literal)
+}
+
+# what the events `loads` links the calls with are
+_CALL = 0
+_FUNCTION_START = 1
+_FUNCTION_END = 2
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+_number = re.compile(r"(-?(?:0|[1-9]\d*))(\.\d+)?([eE][-+]?\d+)?")
+_constants = {"null": None, "true": True, "false": False, "NaN": float("nan"), "Infinity": float("inf"), "-Infinity": float("-inf")}
+_constant = re.compile("|".join(re.escape(name) for name in _constants))
+
+
+def _scalar(value: Any) -> str:
+	if isinstance(value, str):
+		return encode_basestring_ascii(value)
+	if value is None:
+		return "null"
+	if value is True:
+		return "true"
+	if value is False:
+		return "false"
+	if isinstance(value, int):
+		return int.__repr__(value)
+	if isinstance(value, float):
+		if value != value:
+			return "NaN"
+		if value == _INFINITY:
+			return "Infinity"
+		if value == -_INFINITY:
+			return "-Infinity"
+		return float.__repr__(value)
+	raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump(ast: Node.Node, fp: TextIO, indent: Optional[int] = 2) -> None:
+	""" Writes `ast` to `fp` as JSON, indented by `indent` spaces per level or, for `None`, without any whitespace
+
+		Nodes of other classes than `Node.nodeClasses` (e.g. unparsed function bodies) are written as their `toJSON()`.
+	"""
+	if indent is None:
+		step, keySeparator, newline = "", ":", ""
+		# without indentation `json` encodes in C, which is faster, but recursively: it is given the children
+		# of the top-level nodes and lists one by one, the walk below only takes over those too deep for it
+		encode = Node.ComplexEncoder(separators=(",", ":")).encode
+	else:
+		encode = None
+		step, keySeparator, newline = " " * indent, ": ", "\n"
+	# the line break and indentation in front of the items of each depth
+	prefixes = [newline]
+
+	out: list[str] = []
+	write = fp.write
+	# text to write as it is, or (value, depth, retryDepth, backoff) to encode, the next one on top: below a value
+	# too deep for `encode`, it is only tried again from `retryDepth` on, twice as far down each time it fails
+	stack: list[Any] = [(ast, 0, 0, 1)]
+
+	while stack:
+		item = stack.pop()
+		if type(item) is str:
+			out.append(item)
+			continue
+
+		value, depth, retryDepth, backoff = item
+		if encode is not None and depth > 1 and depth >= retryDepth:
+			try:
+				out.append(encode(value))
+			except RecursionError:
+				retryDepth, backoff = depth + backoff, min(backoff * 2, MAX_BACKOFF)
+			else:
+				# these are whole statements or expressions, written right away to keep at most one in memory
+				write("".join(out))
+				out.clear()
+				continue
+
+		if isinstance(value, (Node.Node, dict, list)):
+			if len(prefixes) <= depth + 1:
+				prefixes.append(prefixes[-1] + step)
+			inner = prefixes[depth + 1]
+
+			if isinstance(value, list):
+				if not value:
+					out.append("[]")
+					continue
+				opening, closing = "[", "]"
+				entries = [("", element) for element in value]
+			else:
+				opening, closing = "{", "}"
+				if isinstance(value, dict):
+					entries = [(encode_basestring_ascii(key) + keySeparator, element) for key, element in value.items()]
+				elif type(value) in _keys:
+					entries = [(key + keySeparator, getattr(value, name)) for name, key in _keys[type(value)]]
+				else:
+					entries = [(encode_basestring_ascii(key) + keySeparator, element) for key, element in value.toJSON().items()]
+
+			# the text of the container, with the nodes and lists in it left to encode
+			parts: list[Any] = []
+			text = opening
+			separator = inner
+			for key, element in entries:
+				text += separator + key
+				separator = "," + inner
+				if isinstance(element, (Node.Node, dict, list)):
+					parts.append(text)
+					parts.append((element, depth + 1, retryDepth, backoff))
+					text = ""
+				else:
+					text += _scalar(element)
+			parts.append(text + prefixes[depth] + closing)
+			parts.reverse()
+			stack.extend(parts)
+
+			if len(out) >= BUFFER_PIECES:
+				write("".join(out))
+				out.clear()
+		else:
+			out.append(_scalar(value))
+
+	write("".join(out))
+
+
+def dumps(ast: Node.Node, indent: Optional[int] = 2) -> str:
+	""" `dump` into a string """
+	out = io.StringIO()
+	dump(ast, out, indent)
+	return out.getvalue()
+
+
+def _decodeDeep(text: str, hook: Callable[[dict[str, Any]], Any]) -> Any:
+	""" `json.loads(text, object_hook=hook)` without recursing, for trees too deep for the decoder of `json` """
+
+	def skip(position: int) -> int:
+		return _whitespace.match(text, position).end()
+
+	def key(position: int) -> tuple[str, int]:
+		if not text.startswith('"', position):
+			raise ValueError(f"Expecting property name enclosed in double quotes at {position}")
+		name, position = scanstring(text, position + 1)
+		position = skip(position)
+		if not text.startswith(":", position):
+			raise ValueError(f"Expecting ':' delimiter at {position}")
+		return name, skip(position + 1)
+
+	# the open lists and objects, with the key of the value being read for objects (`None` for lists)
+	stack: list[list[Any]] = []
+	position = skip(0)
+
+	while True:
+		char = text[position:position + 1]
+		if char == "{":
+			position = skip(position + 1)
+			if not text.startswith("}", position):
+				name, position = key(position)
+				stack.append([{}, name])
+				continue
+			value = hook({})
+			position += 1
+		elif char == "[":
+			position = skip(position + 1)
+			if not text.startswith("]", position):
+				stack.append([[], None])
+				continue
+			value = []
+			position += 1
+		elif char == '"':
+			value, position = scanstring(text, position + 1)
+		elif match := _number.match(text, position):
+			integer, fraction, exponent = match.groups()
+			value = float(integer + (fraction or "") + (exponent or "")) if fraction or exponent else int(integer)
+			position = match.end()
+		elif match := _constant.match(text, position):
+			value = _constants[match.group()]
+			position = match.end()
+		else:
+			raise ValueError(f"Expecting value at {position}")
+
+		# put the value into its list or object, and close those ending after it
+		while True:
+			position = skip(position)
+			if not stack:
+				if position != len(text):
+					raise ValueError(f"Extra data at {position}")
+				return value
+
+			frame = stack[-1]
+			container, name = frame
+			if name is None:
+				container.append(value)
+			else:
+				container[name] = value
+
+			char = text[position:position + 1]
+			if char == ",":
+				position = skip(position + 1)
+				if name is not None:
+					frame[1], position = key(position)
+				break
+			if char != ("]" if name is None else "}"):
+				raise ValueError(f"Expecting ',' delimiter at {position}")
+			position += 1
+			stack.pop()
+			value = container if name is None else hook(container)
+
+
+def loads(text: Union[str, bytes], fns: Optional[dict[str, dict[str, Any]]] = None) -> Node.Program:
+	""" Builds the nodes of the program `text` is the JSON of, with its `CallExpression`s linked as by parsing it
+
+		Pass the `fns` of the code in front of the tree to link its calls to the functions declared there
+		(see `linkFunctions`), it is updated with the functions the tree declares.
+		Raises `ValueError` for anything that is not the JSON of a program.
+	"""
+	builders = dict(_builders)
+	# Objects are decoded innermost first, so the nodes are built after their children, but the
+	# `Identifier`s, which have none, are built in source order: numbered, they tell where the calls
+	# (by their callee) and function declarations (by their name) are, and the calls are linked by
+	# going through only those in that order, instead of walking the whole tree again.
+	identifiers: dict[Node.Identifier, int] = {}
+	# (position in source order, event, node), where the position of a call or the start of a function
+	# is twice the number of its `Identifier` and the end of a function is right before the next one
+	events: list[tuple[int, int, Node.Node]] = []
+
+	def hook(value: dict[str, Any]) -> Node.Node:
+		kind = value.get("type")
+		build = builders.get(kind)
+		if build is None:
+			build = builders[kind] = _buildersByKeys.get(frozenset(value))
+			if build is None:
+				raise ValueError(f"Not a node: {value!r:.80}")
+		try:
+			node = build(value)
+		except KeyError as e:
+			raise ValueError(f"{kind} without {e}") from None
+
+		cls = type(node)
+		if cls is Node.Identifier:
+			identifiers[node] = len(identifiers)
+		elif cls is Node.CallExpression:
+			if type(node.callee) is Node.Identifier:
+				events.append((2 * identifiers[node.callee], _CALL, node))
+		elif cls is Node.FunctionDeclaration:
+			if type(node.name) is not Node.Identifier:
+				raise ValueError("FunctionDeclaration without an Identifier as name")
+			events.append((2 * identifiers[node.name], _FUNCTION_START, node))
+			events.append((2 * len(identifiers) - 1, _FUNCTION_END, node))
+		return node
+
+	try:
+		if isinstance(text, bytes):
+			text = text.decode()
+		try:
+			program = json.loads(text, object_hook=hook)
+		except RecursionError:
+			identifiers.clear()
+			events.clear()
+			program = _decodeDeep(text, hook)
+		if not isinstance(program, Node.Program):
+			raise ValueError("Not a program")
+	except ValueError as e:
+		raise ValueError(f"Invalid AST JSON: {e}") from None
+	except TypeError as e:
+		raise ValueError(f"Invalid AST JSON: {e!r}") from None
+
+	if fns is None:
+		fns = {}
+	# stable, so functions ending together end innermost first
+	events.sort(key=itemgetter(0))
+	for _, event, node in events:
+		if event == _CALL:
+			node.fn = fns.get(node.callee.name, None)
+		elif event == _FUNCTION_START:
+			fns.update({node.name.name: {"args": node.params}})
+		else:
+			fns[node.name.name].update({"body": node.body})
+
+	return program
+
+
+def load(fp: TextIO, fns: Optional[dict[str, dict[str, Any]]] = None) -> Node.Program:
+	""" `loads` of what is in `fp` """
+	return loads(fp.read(), fns)
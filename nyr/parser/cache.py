@@ -0,0 +1,134 @@
+""" On-disk cache of parsed programs, much like `__pycache__`
+
+The entry of `dir/script.nyr` is `dir/__nyrcache__/script.nyr.nyrc` (or `script.nyr-<path hash>.nyrc` in a
+given cache directory, so equally named scripts do not evict each other). An entry is
+
+	MAGIC | key (32 bytes) | CRC32 of the payload (4 bytes, little endian) | payload
+
+where the key is a SHA-256 of the nyr version, the grammar version, the serialization format and the
+source, and the payload is the `serialize.dumps` of the program. Anything that does not match exactly is
+treated as a miss and overwritten, and entries are written atomically, so readers never see partial ones.
+"""
+import hashlib
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Optional
+from typing import Union
+
+from nyr.parser import node as Node
+from nyr.parser import serialize
+from nyr.parser.parser import GRAMMAR_VERSION
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import Source
+from nyr.version import __version__
+
+CACHE_DIRECTORY = "__nyrcache__"
+SUFFIX = ".nyrc"
+MAGIC = b"NYRC"
+
+_KEY_LENGTH = hashlib.sha256().digest_size
+_HEADER_LENGTH = len(MAGIC) + _KEY_LENGTH + 4
+
+
+def cacheKey(source: Source) -> bytes:
+	""" Hash identifying the program parsed from `source` by this version of nyr """
+	key = hashlib.sha256(f"nyr {__version__} grammar {GRAMMAR_VERSION} format {serialize.FORMAT_VERSION}\0".encode())
+	key.update(source.encode() if isinstance(source, str) else source)
+	return key.digest()
+
+
+def entryPath(sourcePath: Union[str, os.PathLike], cacheDirectory: Union[None, str, os.PathLike] = None) -> Path:
+	""" Where the entry of the script at `sourcePath` is stored, `__nyrcache__` next to it by default """
+	sourcePath = Path(sourcePath)
+	if cacheDirectory is None:
+		return sourcePath.parent / CACHE_DIRECTORY / (sourcePath.name + SUFFIX)
+
+	pathHash = hashlib.sha256(os.fsencode(sourcePath.resolve())).hexdigest()[:16]
+	return Path(cacheDirectory) / f"{sourcePath.name}-{pathHash}{SUFFIX}"
+
+
+def loadPayload(entry: Path, key: bytes) -> Optional[memoryview]:
+	""" Returns the intact payload cached in `entry` for `key` without deserializing it, or None if there is none """
+	try:
+		with open(entry, "rb") as f:
+			data = f.read()
+	except OSError:
+		return None
+
+	if len(data) < _HEADER_LENGTH or not data.startswith(MAGIC) or data[len(MAGIC):len(MAGIC) + _KEY_LENGTH] != key:
+		return None
+	payload = memoryview(data)[_HEADER_LENGTH:]
+	if zlib.crc32(payload) != int.from_bytes(data[_HEADER_LENGTH - 4:_HEADER_LENGTH], "little"):
+		return None
+
+	return payload
+
+
+def load(entry: Path, key: bytes) -> Optional[Node.Program]:
+	""" Returns the program cached in `entry` for `key`, or None if there is no valid one """
+	payload = loadPayload(entry, key)
+	if payload is None:
+		return None
+
+	try:
+		return serialize.loads(payload)
+	except ValueError:
+		return None
+
+
+def store(entry: Path, key: bytes, program: Node.Program) -> bool:
+	""" Atomically (over)writes `entry` with `program`, returns whether that worked
+
+		Failing to write (e.g. to a read-only directory) is not an error, the cache is just not used.
+	"""
+	return storePayload(entry, key, serialize.dumps(program))
+
+
+def storePayload(entry: Path, key: bytes, payload: bytes) -> bool:
+	""" `store` for a program that is already serialized """
+	data = MAGIC + key + zlib.crc32(payload).to_bytes(4, "little") + payload
+
+	try:
+		entry.parent.mkdir(parents=True, exist_ok=True)
+		fd, temporary = tempfile.mkstemp(prefix=entry.name + ".", suffix=".tmp", dir=entry.parent)
+	except OSError:
+		return False
+
+	try:
+		# `mkstemp` creates files only their owner can read
+		if hasattr(os, "fchmod"):
+			os.fchmod(fd, 0o644)
+		with os.fdopen(fd, "wb") as f:
+			f.write(data)
+		os.replace(temporary, entry)
+	except OSError:
+		try:
+			os.unlink(temporary)
+		except OSError:
+			pass
+		return False
+
+	return True
+
+
+def parse(
+	source: Source,
+	sourcePath: Union[str, os.PathLike],
+	cacheDirectory: Union[None, str, os.PathLike] = None,
+	parser: Optional[Parser] = None,
+) -> Node.Program:
+	""" Returns the cached program of `source` (the contents of `sourcePath`), parsing and caching it on a miss
+
+		`parser` defaults to a new `Parser`. Syntax errors propagate and are never cached.
+	"""
+	key = cacheKey(source)
+	entry = entryPath(sourcePath, cacheDirectory)
+
+	program = load(entry, key)
+	if program is None:
+		program = (parser or Parser()).parse(source)
+		store(entry, key, program)
+
+	return program
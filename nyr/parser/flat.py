@@ -0,0 +1,240 @@
+""" Flat, array-backed representation of `Node.Program` trees
+
+Instead of one object per node, a `FlatAst` numbers the nodes in pre-order (the program is node 0 and
+every node comes before its children) and keeps them in parallel `array` columns:
+
+- `kinds[i]`: the index of the class of node `i` in `Node.nodeClasses`
+- `starts[i]`, `ends[i]`: its span
+- `firstField[i]`: where its fields start in `fields`, one entry per name in `_fields` of its class
+- `fields[j]`: an unsigned int holding a tag in its low 2 bits and an argument in the others:
+`CONST i` is `pool[i]` (names, operators, node types, literal values and `None`), `NODE i` is node `i`
+and `LIST k` is the list of the nodes `listItems[listStarts[k]:listStarts[k + 1]]`
+
+`toBytes` is little more than the raw bytes of the columns and `fromBytes` copies them back into arrays,
+so writing a tree to disk or sending it to another process (`FlatAst`s pickle that way too) is about
+as cheap as copying memory. `CallExpression.fn` is not stored, `toProgram` links the calls again.
+"""
+from __future__ import annotations
+
+import marshal
+import sys
+from array import array
+from collections.abc import Callable
+from collections.abc import Iterator
+from typing import Any
+from typing import Optional
+
+from nyr.parser import node as Node
+from nyr.parser.lazy import LazyBlockStatement
+from nyr.parser.parser import linkFunctions
+
+# Bump whenever the layout of `toBytes` changes
+FORMAT_VERSION = 1
+
+CONST = 0
+NODE = 1
+LIST = 2
+
+_classIndex: dict[type, int] = {cls: i for i, cls in enumerate(Node.nodeClasses)}
+# field name -> position in the fields of a node, per class
+_fieldOffsets: list[dict[str, int]] = [{name: i for i, name in enumerate(cls._fields)} for cls in Node.nodeClasses]
+
+_columns = ("kinds", "starts", "ends", "firstField", "fields", "listStarts", "listItems")
+_typecodes = ("B", "I", "I", "I", "I", "I", "I")
+
+
+def _toBytes(values: array) -> bytes:
+	if sys.byteorder == "big":  # pragma: no cover
+		values = array(values.typecode, values)
+		values.byteswap()
+	return values.tobytes()
+
+
+def _fromBytes(typecode: str, data: bytes) -> array:
+	values = array(typecode)
+	values.frombytes(data)
+	if sys.byteorder == "big":  # pragma: no cover
+		values.byteswap()
+	return values
+
+
+class FlatAst:
+	""" A `Node.Program` as parallel arrays of its nodes, see the module documentation """
+
+	def __init__(self):
+		self.kinds = array("B")
+		self.starts = array("I")
+		self.ends = array("I")
+		self.firstField = array("I")
+		self.fields = array("I")
+		self.listStarts = array("I", (0,))
+		self.listItems = array("I")
+		self.pool: list[Any] = []
+
+	def __len__(self) -> int:
+		return len(self.kinds)
+
+	def __reduce__(self) -> tuple[Callable[[bytes], FlatAst], tuple[bytes]]:
+		return FlatAst.fromBytes, (self.toBytes(),)
+
+	@classmethod
+	def fromProgram(cls, program: Node.Program) -> FlatAst:
+		""" Flattens `program`, without recursing, so trees of any depth can be flattened """
+		ast = cls()
+		kinds, starts, ends, firstField, fields, listStarts, listItems = (getattr(ast, column) for column in _columns)
+		pool = ast.pool
+		# keyed by type as well, so 1, 1.0 and True stay different constants
+		poolIndex: dict[tuple[type, Any], int] = {}
+
+		# nodes still to be numbered, with the column and position their index goes to (none for the program)
+		stack: list[tuple[Node.Node, Optional[array], int]] = [(program, None, 0)]
+		while stack:
+			node, target, position = stack.pop()
+			if type(node) is LazyBlockStatement:
+				# flattened as the body it stands for, like its `toJSON`
+				node = node.parse()
+			index = len(kinds)
+			if target is fields:
+				fields[position] = index << 2 | NODE
+			elif target is not None:
+				target[position] = index
+
+			names = node._fields
+			kinds.append(_classIndex[type(node)])
+			starts.append(node.start)
+			ends.append(node.end)
+			first = len(fields)
+			firstField.append(first)
+			fields.extend([0] * len(names))
+
+			pending: list[tuple[Node.Node, array, int]] = []
+			for offset, name in enumerate(names):
+				value = getattr(node, name)
+				if isinstance(value, Node.Node):
+					pending.append((value, fields, first + offset))
+				elif isinstance(value, list):
+					fields[first + offset] = (len(listStarts) - 1) << 2 | LIST
+					itemsStart = len(listItems)
+					listItems.extend([0] * len(value))
+					listStarts.append(len(listItems))
+					pending.extend((item, listItems, itemsStart + i) for i, item in enumerate(value))
+				else:
+					key = (type(value), value)
+					constant = poolIndex.get(key)
+					if constant is None:
+						constant = poolIndex[key] = len(pool)
+						pool.append(value)
+					fields[first + offset] = constant << 2 | CONST
+			# reversed, so the children are numbered in the order of their fields
+			stack.extend(reversed(pending))
+
+		return ast
+
+	def toProgram(self, fns: Optional[dict[str, dict[str, Any]]] = None) -> Node.Program:
+		""" Builds the node objects back, with their `CallExpression`s linked as by parsing them
+
+			Pass the `fns` of the code in front of the tree to link its calls to the functions declared there
+			(see `linkFunctions`), it is updated with the functions the tree declares.
+		"""
+		classes = Node.nodeClasses
+		kinds, starts, ends, firstField, fields, listStarts, listItems = (getattr(self, column) for column in _columns)
+		pool = self.pool
+		nodes: list[Any] = [None] * len(kinds)
+
+		# children come after their parents, so building from the back finds them all built
+		for index in reversed(range(len(kinds))):
+			cls = classes[kinds[index]]
+			first = firstField[index]
+			arguments = []
+			for code in fields[first:first + len(cls._fields)]:
+				tag = code & 3
+				if tag == CONST:
+					arguments.append(pool[code >> 2])
+				elif tag == NODE:
+					arguments.append(nodes[code >> 2])
+				else:
+					arguments.append([nodes[item] for item in listItems[listStarts[code >> 2]:listStarts[(code >> 2) + 1]]])
+			node = cls(*arguments)
+			node.start = starts[index]
+			node.end = ends[index]
+			nodes[index] = node
+
+		program = nodes[0]
+		linkFunctions(program, fns)
+		return program
+
+	def toBytes(self) -> bytes:
+		""" The columns and the pool, which `fromBytes` turns back into an identical `FlatAst` """
+		return marshal.dumps((FORMAT_VERSION, *(_toBytes(getattr(self, column)) for column in _columns), tuple(self.pool)))
+
+	@classmethod
+	def fromBytes(cls, data: bytes) -> FlatAst:
+		""" Loads what `toBytes` returned, raises `ValueError` for anything else
+
+			Only the format is checked, not the tree the columns describe.
+		"""
+		try:
+			version, *columns, pool = marshal.loads(data)
+			if version != FORMAT_VERSION:
+				raise ValueError(f"Unsupported flat AST format version: {version}")
+			if len(columns) != len(_columns):
+				raise ValueError(f"Expected {len(_columns)} columns, got {len(columns)}")
+
+			ast = cls()
+			for column, typecode, columnData in zip(_columns, _typecodes, columns):
+				setattr(ast, column, _fromBytes(typecode, columnData))
+			ast.pool = list(pool)
+		except ValueError as e:
+			raise ValueError(f"Invalid flat AST: {e}") from None
+		except (EOFError, TypeError) as e:
+			raise ValueError(f"Invalid flat AST: {e!r}") from None
+
+		return ast
+
+	def nodeClass(self, index: int) -> type[Node.Node]:
+		return Node.nodeClasses[self.kinds[index]]
+
+	def nodeType(self, index: int) -> str:
+		""" The `type` of node `index`, as the node object would have it """
+		kind = self.kinds[index]
+		offset = _fieldOffsets[kind].get("type")
+		if offset is None:
+			return Node.nodeClasses[kind].type
+		return self.pool[self.fields[self.firstField[index] + offset] >> 2]
+
+	def field(self, index: int, name: str) -> Any:
+		""" The field `name` of node `index`: the index of a child node, a list of those, or a constant """
+		code = self.fields[self.firstField[index] + _fieldOffsets[self.kinds[index]][name]]
+		tag = code & 3
+		if tag == CONST:
+			return self.pool[code >> 2]
+		if tag == NODE:
+			return code >> 2
+		return self.listItems[self.listStarts[code >> 2]:self.listStarts[(code >> 2) + 1]].tolist()
+
+	def children(self, index: int) -> Iterator[int]:
+		""" The indices of the child nodes of node `index`, in the order of its fields """
+		first = self.firstField[index]
+		for code in self.fields[first:first + len(_fieldOffsets[self.kinds[index]])]:
+			tag = code & 3
+			if tag == NODE:
+				yield code >> 2
+			elif tag == LIST:
+				yield from self.listItems[self.listStarts[code >> 2]:self.listStarts[(code >> 2) + 1]]
+
+
+class FlatVisitor:
+	""" Walks a `FlatAst` by node index: `visit(i)` calls `visit<class name>(i)`, as `NodeVisitor` does for nodes """
+
+	def __init__(self, ast: FlatAst):
+		self.ast = ast
+		# one visitor per entry of `Node.nodeClasses`, so dispatching is a list lookup
+		self._visitors: list[Callable[[int], Any]] = [getattr(self, f"visit{cls.__name__}", self.genericVisit) for cls in Node.nodeClasses]
+
+	def visit(self, index: Optional[int]) -> Any:
+		if index is None:
+			return None
+		return self._visitors[self.ast.kinds[index]](index)
+
+	def genericVisit(self, index: int):  # pragma: no cover
+		raise Exception(f"visit{self.ast.nodeClass(index).__name__} not found")
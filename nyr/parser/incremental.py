@@ -0,0 +1,201 @@
+from typing import Any
+from typing import Optional
+
+from nyr.parser import node as Node
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parser import linkFunctions
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import LineIndex
+from nyr.parser.tokenizer import Source
+from nyr.parser.tokenizer import TokenBuffer
+from nyr.parser.tokenizer import TokenStream
+
+# The functions a top-level statement declares, as (name, `fns` entry) in the order they are declared
+Declarations = list[tuple[str, dict[str, Any]]]
+
+
+class _FunctionTable(dict):
+	""" `Parser.fns` that remembers every function declared into it, in order """
+
+	def __init__(self):
+		super().__init__()
+		self.declared: Declarations = []
+
+	def update(self, entries: dict[str, dict[str, Any]]) -> None:  # type: ignore[override]
+		self.declared.extend(entries.items())
+		super().update(entries)
+
+
+def _shiftSpans(node: Node.Node, delta: int) -> None:
+	stack: list[Any] = [node]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, Node.Node):
+			value.start += delta
+			value.end += delta
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+
+
+class IncrementalParser(Parser):
+	""" `Parser` that can reparse its last input after an edit, reusing what the edit did not touch
+
+		`reparse` only retokenizes the edited region (see `Tokenizer.retokenize`) and only parses the top-level
+		statements it touched: those in front of it are reused as they are, those behind it by identity too,
+		with their spans shifted and their calls linked again if the functions declared in front of them changed.
+		`fns` always ends up as if the whole edited source had been parsed.
+	"""
+
+	def __init__(self, limits: Optional[ParserLimits] = None):
+		super().__init__(limits)
+		self.fns: _FunctionTable = _FunctionTable()
+		self.program: Optional[Node.Program] = None
+		self.tokenBuffer: Optional[TokenBuffer] = None
+		# what each top-level statement of `program` declares
+		self.declarations: list[Declarations] = []
+
+	def _reset(self):
+		super()._reset()
+		self.fns = _FunctionTable()
+
+	def parse(self, string: Source) -> Node.Program:
+		""" Parses `string` and keeps its tokens for `reparse` """
+		self.limits.checkSource(string)
+		self.tokenizer.init(string)
+		return self.parseTokens(self.tokenizer.getTokenBuffer())
+
+	def parseTokens(self, tokens: Any) -> Node.Program:
+		self.program = None
+		self.tokenBuffer = tokens if isinstance(tokens, TokenBuffer) else None
+		self.declarations = []
+
+		self.program = super().parseTokens(tokens)
+		return self.program
+
+	def Program(self) -> Node.Program:
+		start = self.lookahead.start
+		body: list[Node.Node] = []
+
+		while self.lookahead.type != "EOF":
+			body.append(self._declaringStatement())
+
+		return self._finish(Node.Program(body), start)
+
+	def _declaringStatement(self) -> Node.Node:
+		""" Statement, recording the functions it declares """
+		declared = len(self.fns.declared)
+		statement = self.Statement()
+		self.declarations.append(self.fns.declared[declared:])
+		return statement
+
+	def reparse(self, previous: Node.Program, offset: int, deletedLength: int, insertedText: Source) -> Node.Program:
+		""" Returns the program of the last parsed source after replacing `deletedLength` characters at `offset` with `insertedText`
+
+			`previous` has to be the last program returned by this parser, the result shares its untouched statements
+			and `previous` must not be used anymore. If the edited source does not parse, the `SyntaxError` propagates,
+			`previous` stays intact and the next parse has to be a full one.
+		"""
+		if previous is not self.program or self.tokenBuffer is None:
+			raise ValueError("Only the last program parsed from a source or a TokenBuffer by this parser can be reparsed")
+
+		old = self.tokenBuffer
+		oldDeclarations = self.declarations
+		statements = previous.body
+		self.program = None
+
+		tokens = self.tokenizer.retokenize(old, offset, deletedLength, insertedText)
+		delta = len(insertedText) - deletedLength
+
+		# statements in front of the edit are kept if neither their tokens nor the one behind them changed
+		headEnd = old.end(tokens.unchangedHead - 1) if tokens.unchangedHead else 0
+		head = 0
+		while head < len(statements) and statements[head].end < headEnd:
+			head += 1
+
+		# statements behind it are kept if they start in the unchanged tail of tokens and parsing gets there
+		tailStart = old.start(len(old) - tokens.unchangedTail) if tokens.unchangedTail > 1 else None
+		tail = head
+		while tailStart is not None and tail < len(statements) and statements[tail].start < tailStart:
+			tail += 1
+
+		self._reset()
+		self.lines = LineIndex(tokens.source)
+		self.declarations = oldDeclarations[:head]
+		for declarations in self.declarations:
+			if declarations:
+				self.fns.update(dict(declarations))
+
+		first = old.tokensUpTo(statements[head - 1].end) if head else 0
+		self.tokens = TokenStream(tokens[index] for index in range(first, len(tokens)))
+		body = statements[:head]
+
+		try:
+			self.lookahead = self.getNextToken()
+
+			while self.lookahead.type != "EOF":
+				while tail < len(statements) and statements[tail].start + delta < self.lookahead.start:
+					tail += 1
+				if tailStart is not None and tail < len(statements) and statements[tail].start + delta == self.lookahead.start:
+					break
+				body.append(self._declaringStatement())
+			else:
+				tail = len(statements)
+		finally:
+			self._release()
+
+		reused = statements[tail:]
+		oldDeclared = [declaration for declarations in oldDeclarations[head:tail] for declaration in declarations]
+		newDeclared = [declaration for declarations in self.declarations[head:] for declaration in declarations]
+
+		# if the edited statements declare the same functions as before, the old entries are refilled and kept,
+		# so the calls behind them stay linked; otherwise those calls are all linked again
+		relink = [name for name, _ in oldDeclared] != [name for name, _ in newDeclared]
+		if not relink and newDeclared:
+			self._keepEntries(body[head:], head, {id(new): old for (_, new), (_, old) in zip(newDeclared, oldDeclared)})
+
+		for statement, declarations in zip(reused, oldDeclarations[tail:]):
+			if delta:
+				_shiftSpans(statement, delta)
+			if relink:
+				declared = len(self.fns.declared)
+				linkFunctions(statement, self.fns)
+				declarations = self.fns.declared[declared:]
+			elif declarations:
+				self.fns.update(dict(declarations))
+			self.declarations.append(declarations)
+
+		body.extend(reused)
+		program = Node.Program(body)
+		if body:
+			# the first statement can start behind the first token, e.g. at the expression in `(1);`
+			program.start = tokens.start(0)
+			program.end = body[-1].end
+
+		self.program = program
+		self.tokenBuffer = tokens
+		return program
+
+	def _keepEntries(self, statements: list[Node.Node], first: int, oldEntries: dict[int, dict[str, Any]]) -> None:
+		""" Swaps the `fns` entries declared by the parsed `statements` (top-level from `first` on) for the old ones
+
+			`oldEntries` maps the `id`s of the new entries to the old ones.
+		"""
+		for index in range(first, len(self.declarations)):
+			for _, new in self.declarations[index]:
+				oldEntries[id(new)].clear()
+				oldEntries[id(new)].update(new)
+			self.declarations[index] = [(name, oldEntries[id(new)]) for name, new in self.declarations[index]]
+
+		for name, entry in self.fns.items():
+			self.fns[name] = oldEntries.get(id(entry), entry)
+
+		stack: list[Any] = list(statements)
+		while stack:
+			value = stack.pop()
+			if isinstance(value, Node.Node):
+				if isinstance(value, Node.CallExpression) and value.fn is not None:
+					value.fn = oldEntries.get(id(value.fn), value.fn)
+				stack.extend(getattr(value, field) for field in value._fields)
+			elif isinstance(value, list):
+				stack.extend(value)
@@ -0,0 +1,170 @@
+""" Sharing identical nodes (hash-consing)
+
+Generated code repeats the same names and values over and over, and with them the same small expressions.
+An `InternTable` keeps one node per distinct leaf (`Identifier`, `Literal`, `ThisExpression` and
+`SuperExpression`) and, if asked to, per distinct pure expression (binary and logical expressions,
+unary expressions and member accesses of those), and `intern` replaces every other copy in a tree by it.
+
+Interned nodes are compared by their fields and the identity of their (interned) children, so two interned
+subtrees are equal exactly when they are the same object, whatever their size.
+A shared node keeps the span of the first copy it was interned for, and must not be changed afterwards:
+trees that are edited in place (as by `IncrementalParser`) must not be interned.
+"""
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import TypeVar
+
+from nyr.parser import node as Node
+
+NodeT = TypeVar("NodeT", bound=Node.Node)
+Key = tuple[Any, ...]
+
+
+def _identifierKey(node: Node.Identifier, canonical: set[int]) -> Optional[Key]:
+	return (Node.Identifier, node.name)
+
+
+def _literalKey(node: Node.Literal, canonical: set[int]) -> Optional[Key]:
+	# keyed by the type of the value as well, so 1, 1.0 and True stay different
+	return (Node.Literal, node.type, type(node.value), node.value)
+
+
+def _emptyKey(node: Node.Node, canonical: set[int]) -> Optional[Key]:
+	return (type(node),)
+
+
+def _complexKey(node: Node.ComplexExpression, canonical: set[int]) -> Optional[Key]:
+	if node.type == "AssignmentExpression" or id(node.left) not in canonical or id(node.right) not in canonical:
+		return None
+	return (Node.ComplexExpression, node.type, node.operator, id(node.left), id(node.right))
+
+
+def _unaryKey(node: Node.UnaryExpression, canonical: set[int]) -> Optional[Key]:
+	if id(node.argument) not in canonical:
+		return None
+	return (Node.UnaryExpression, node.operator, id(node.argument))
+
+
+def _memberKey(node: Node.MemberExpression, canonical: set[int]) -> Optional[Key]:
+	if id(node.object) not in canonical or id(node.property) not in canonical:
+		return None
+	return (Node.MemberExpression, node.computed, id(node.object), id(node.property))
+
+
+_scalarFields: dict[type, tuple[str, ...]] = {
+	Node.Identifier: ("name",),
+	Node.Literal: ("type", "value"),
+	Node.ComplexExpression: ("type", "operator"),
+	Node.UnaryExpression: ("operator",),
+	Node.MemberExpression: ("computed",),
+}
+# the fields of each node class that can hold nodes
+_childFields: dict[type, tuple[str, ...]] = {
+	cls: tuple(name for name in cls._fields if name not in _scalarFields.get(cls, ())) for cls in Node.nodeClasses
+}
+
+_leafKeys: dict[type, Callable[[Any, set[int]], Optional[Key]]] = {
+	Node.Identifier: _identifierKey,
+	Node.Literal: _literalKey,
+	Node.ThisExpression: _emptyKey,
+	Node.SuperExpression: _emptyKey,
+}
+_expressionKeys: dict[type, Callable[[Any, set[int]], Optional[Key]]] = {
+	Node.ComplexExpression: _complexKey,
+	Node.UnaryExpression: _unaryKey,
+	Node.MemberExpression: _memberKey,
+}
+
+
+class InternTable:
+	""" One node per distinct leaf, and with `expressions` per distinct pure expression, see the module documentation
+
+		A table can be used for many trees, which then share their nodes too; it keeps every node it has
+		interned alive (their `id`s are part of the keys of the expressions around them).
+	"""
+
+	def __init__(self, expressions: bool = False):
+		self.expressions = expressions
+		self._keys = {**_leafKeys, **(_expressionKeys if expressions else {})}
+		self._nodes: dict[Key, Node.Node] = {}
+		# ids of the nodes in `_nodes`
+		self._canonical: set[int] = set()
+
+	def __len__(self) -> int:
+		return len(self._nodes)
+
+	def __contains__(self, node: Node.Node) -> bool:
+		""" Whether `node` is the shared copy of its kind """
+		return id(node) in self._canonical
+
+	def intern(self, tree: NodeT) -> NodeT:
+		""" Replaces the nodes in `tree` by their shared copies, in place, and returns it (or its shared copy)
+
+			Does not recurse, so trees of any depth can be interned.
+		"""
+		keys = self._keys
+		nodes = self._nodes
+		canonical = self._canonical
+		Identifier = Node.Identifier
+		Literal = Node.Literal
+		# the result of `tree`, if it is interned itself
+		root: list[Node.Node] = [tree]
+
+		# (node, where it is referenced: a node or list, the field name or index there, whether its
+		# children are done), children are done before their parents so those can be keyed by them
+		stack: list[tuple[Node.Node, Any, Any, bool]] = [(tree, root, 0, False)]
+		while stack:
+			node, container, position, done = stack.pop()
+
+			if not done:
+				if id(node) in canonical:
+					continue
+				stack.append((node, container, position, True))
+				for name in _childFields[type(node)]:
+					value = getattr(node, name)
+					if type(value) is list:
+						target, children = value, enumerate(value)
+					else:
+						target, children = node, ((name, value),)
+
+					for place, child in children:
+						# the leaves are interned right away, the other nodes once their children are
+						cls = type(child)
+						if cls is Identifier:
+							key = (Identifier, child.name)
+						elif cls is Literal:
+							key = (Literal, child.type, type(child.value), child.value)
+						else:
+							if child is not None:
+								stack.append((child, target, place, False))
+							continue
+
+						shared = nodes.get(key)
+						if shared is None:
+							nodes[key] = child
+							canonical.add(id(child))
+						elif shared is not child:
+							if target is node:
+								setattr(node, place, shared)
+							else:
+								target[place] = shared
+				continue
+
+			keyOf = keys.get(type(node))
+			if keyOf is None:
+				continue
+			key = keyOf(node, canonical)
+			if key is None:
+				continue
+
+			shared = nodes.get(key)
+			if shared is None:
+				nodes[key] = node
+				canonical.add(id(node))
+			elif type(container) is list:
+				container[position] = shared
+			else:
+				setattr(container, position, shared)
+
+		return root[0]
@@ -0,0 +1,345 @@
+from collections.abc import Generator
+from typing import Any
+from typing import Optional
+
+from nyr.parser import node as Node
+from nyr.parser.parser import binaryOperators
+from nyr.parser.parser import Parser
+
+# A production that yields the productions it needs the results of and returns its own result
+Production = Generator["Production", Any, Any]
+
+
+class IterativeParser(Parser):
+	""" `Parser` that does not recurse, so nesting depth is only bounded by memory
+
+		Every production that can nest is a generator: instead of calling a sub-production it yields
+		that one's generator and gets its result sent back. `_run` keeps the pending productions on
+		an explicit stack, so parse time stays linear however deep the input nests.
+		Productions that cannot nest (literals, identifiers, parameter lists, ...) are shared with `Parser`,
+		and the resulting `Node.Program` is identical to the one `Parser` builds.
+	"""
+
+	def Program(self) -> Node.Program:
+		return self._run(self._Program())
+
+	def Statement(self) -> Node.Node:
+		return self._run(self._Statement())
+
+	@staticmethod
+	def _run(production: Production) -> Any:
+		stack = [production]
+		push = stack.append
+		pop = stack.pop
+		value = None
+
+		while True:
+			try:
+				subProduction = stack[-1].send(value)
+			except StopIteration as result:
+				pop()
+				if not stack:
+					return result.value
+				value = result.value
+			else:
+				push(subProduction)
+				value = None
+
+	def _Program(self) -> Production:
+		start = self.lookahead.start
+		return self._finish(Node.Program((yield from self._StatementList())), start)
+
+	def _StatementList(self, stopLookahead: Any = None) -> Production:
+		statementList: list[Node.Node] = [(yield self._Statement())]
+
+		while self.lookahead.type not in [stopLookahead, "EOF"]:
+			statementList.append((yield self._Statement()))
+
+		return statementList
+
+	def _Statement(self) -> Production:
+		tokenType = self.lookahead.type
+
+		if tokenType == ";":
+			return self.EmptyStatement()
+		if tokenType == "{":
+			return (yield from self._BlockStatement())
+		if tokenType == "let":
+			return (yield from self._VariableStatement())
+		if tokenType == "if":
+			return (yield from self._IfStatement())
+		if tokenType == "while":
+			return (yield from self._WhileStatement())
+		if tokenType == "do":
+			return (yield from self._DoWhileStatement())
+		if tokenType == "for":
+			return (yield from self._ForStatement())
+		if tokenType == "def":
+			return (yield from self._FunctionDeclaration())
+		if tokenType == "return":
+			return (yield from self._ReturnStatement())
+		if tokenType == "class":
+			return (yield from self._ClassDeclaration())
+
+		return (yield from self._ExpressionStatement())
+
+	def _ClassDeclaration(self) -> Production:
+		start = self._eat("class").start
+		id_ = self.Identifier()
+
+		superClass = self.ClassExtends() if self.lookahead.type == ":" else None
+
+		body = yield from self._BlockStatement()
+
+		return self._finish(Node.ClassDeclaration(id_, superClass, body), start)
+
+	def _FunctionDeclaration(self) -> Production:
+		start = self._eat("def").start
+		name = self.Identifier()
+		self.fns.update({name.name: {}})
+
+		self._eat("(")
+		params: list[Node.Node] = self.FormalParameterList() if self.lookahead.type != ")" else []
+		self._eat(")")
+		self.fns[name.name].update({"args": params})
+
+		body = yield from self._BlockStatement()
+		self.fns[name.name].update({"body": body})
+
+		return self._finish(Node.FunctionDeclaration(name, params, body), start)
+
+	def _ReturnStatement(self) -> Production:
+		start = self._eat("return").start
+
+		argument = (yield self._Expression()) if self.lookahead.type != ";" else None
+
+		self._eat(";")
+
+		return self._finish(Node.ReturnStatement(argument), start)
+
+	def _WhileStatement(self) -> Production:
+		start = self._eat("while").start
+
+		self._eat("(")
+		test = yield self._Expression()
+		self._eat(")")
+
+		body = yield self._Statement()
+
+		return self._finish(Node.WhileStatement(test=test, body=body), start)
+
+	def _DoWhileStatement(self) -> Production:
+		start = self._eat("do").start
+
+		body = yield self._Statement()
+
+		self._eat("while")
+		self._eat("(")
+		test = yield self._Expression()
+		self._eat(")")
+		self._eat(";")
+
+		return self._finish(Node.DoWhileStatement(body=body, test=test), start)
+
+	def _ForStatement(self) -> Production:
+		start = self._eat("for").start
+		self._eat("(")
+
+		init = None
+		if self.lookahead.type != ";":
+			init = yield (self._VariableStatementInit() if self.lookahead.type == "let" else self._Expression())
+		self._eat(";")
+
+		test = (yield self._Expression()) if self.lookahead.type != ";" else None
+		self._eat(";")
+
+		update = (yield self._Expression()) if self.lookahead.type != ")" else None
+		self._eat(")")
+
+		body = yield self._Statement()
+
+		return self._finish(Node.ForStatement(init, test, update, body), start)
+
+	def _IfStatement(self) -> Production:
+		start = self._eat("if").start
+		self._eat("(")
+
+		test = yield self._Expression()
+
+		self._eat(")")
+
+		consequent = yield self._Statement()
+
+		if self.lookahead and self.lookahead.type == "else":
+			self._eat("else")
+			alternative = yield self._Statement()
+		else:
+			alternative = None
+
+		return self._finish(Node.IfStatement(test, consequent, alternative), start)
+
+	def _VariableStatementInit(self) -> Production:
+		start = self._eat("let").start
+		declarations: list[Node.Node] = [(yield from self._VariableDeclaration())]
+
+		while self.lookahead.type == ",":
+			self._eat(",")
+			declarations.append((yield from self._VariableDeclaration()))
+
+		return self._finish(Node.VariableStatement(declarations), start)
+
+	def _VariableStatement(self) -> Production:
+		variableStatement = yield from self._VariableStatementInit()
+		self._eat(";")
+		variableStatement.end = self.lastEnd
+		return variableStatement
+
+	def _VariableDeclaration(self) -> Production:
+		id_ = self.Identifier()
+
+		if self.lookahead.type not in (";", ","):
+			self._eat("SIMPLE_ASSIGN")
+			init = yield self._Expression()
+		else:
+			init = None
+
+		return self._finish(Node.VariableDeclaration(id_, init), id_.start)
+
+	def _BlockStatement(self) -> Production:
+		start = self._eat("{").start
+
+		body: list[Node.Node] = (yield from self._StatementList("}")) if self.lookahead.type != "}" else []
+
+		self._eat("}")
+
+		return self._finish(Node.BlockStatement(body), start)
+
+	def _ExpressionStatement(self) -> Production:
+		expression = yield self._Expression()
+		self._eat(";")
+
+		return self._finish(Node.ExpressionStatement(expression), expression.start)
+
+	def _Expression(self) -> Production:
+		""" AssignmentExpression """
+		left = yield self._BinaryExpression()
+
+		if not self._isAssignmentOperator(self.lookahead.type):
+			return left
+
+		operator = self.AssignmentOperator().value
+		target = self._checkValidAssignmentTarget(left)
+
+		return self._finish(
+			Node.ComplexExpression(
+				"AssignmentExpression",
+				operator,
+				target,
+				(yield self._Expression()),
+			),
+			left.start,
+		)
+
+	def _BinaryExpression(self, minPrecedence: int = 1) -> Production:
+		left = yield self._UnaryExpression()
+		start = left.start
+
+		while True:
+			operator = binaryOperators.get(self.lookahead.type)
+			if operator is None or operator[0] < minPrecedence:
+				return left
+
+			precedence, nodeType = operator
+			value = self._eat(self.lookahead.type).value
+			right = yield self._BinaryExpression(precedence + 1)
+
+			left = self._finish(
+				Node.ComplexExpression(
+					nodeType,
+					value,
+					left,
+					right,
+				),
+				start,
+			)
+
+	def _UnaryExpression(self) -> Production:
+		""" UnaryExpression, LeftHandSideExpression and CallMemberExpression """
+		start = self.lookahead.start
+		if self.lookahead.type in ("ADDITIVE_OPERATOR", "LOGICAL_NOT"):
+			operator = self._eat(self.lookahead.type).value
+			return self._finish(Node.UnaryExpression(operator, (yield self._UnaryExpression())), start)
+
+		if self.lookahead.type == "super":
+			return (yield from self._CallExpression(self.SuperExpression()))
+
+		member = yield from self._MemberExpression()
+
+		if self.lookahead.type == "(":
+			return (yield from self._CallExpression(member))
+
+		return member
+
+	def _CallExpression(self, callee: Node.Node) -> Production:
+		while True:
+			fn: Optional[dict] = None
+			if isinstance(callee, Node.Identifier):
+				fn = self.fns.get(callee.name, None)
+			callee = self._finish(Node.CallExpression(callee, (yield from self._Arguments()), fn), callee.start)
+
+			if self.lookahead.type != "(":
+				return callee
+
+	def _Arguments(self) -> Production:
+		self._eat("(")
+
+		argumentList: list[Node.Node] = []
+		if self.lookahead.type != ")":
+			argumentList.append((yield self._Expression()))
+
+			while self.lookahead.type == ",":
+				self._eat(",")
+				argumentList.append((yield self._Expression()))
+
+		self._eat(")")
+
+		return argumentList
+
+	def _MemberExpression(self) -> Production:
+		object_ = yield from self._PrimaryExpression()
+		start = object_.start
+
+		while self.lookahead.type in [".", "["]:
+			# MemberExpression '.' Identifier
+			if self.lookahead.type == ".":
+				self._eat(".")
+				property_ = self.Identifier()
+
+				object_ = self._finish(Node.MemberExpression(False, object_, property_), start)
+
+			# MemberExpression '[' Expression ']'
+			if self.lookahead.type == "[":
+				self._eat("[")
+				property_ = yield self._Expression()
+				self._eat("]")
+
+				object_ = self._finish(Node.MemberExpression(True, object_, property_), start)
+
+		return object_
+
+	def _PrimaryExpression(self) -> Production:
+		tokenType = self.lookahead.type
+
+		if tokenType == "IDENTIFIER":
+			return self.Identifier()
+		if self._isLiteral(tokenType):
+			return self.Literal()
+		if tokenType == "(":
+			self._eat("(")
+			expression = yield self._Expression()
+			self._eat(")")
+			return expression
+		if tokenType == "this":
+			return self.ThisExpression()
+
+		raise self._expectedExpression()
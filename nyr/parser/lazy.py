@@ -0,0 +1,221 @@
+import bisect
+import re
+from collections.abc import Iterable
+from typing import Any
+from typing import Optional
+
+from nyr.parser import node as Node
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import LineIndex
+from nyr.parser.tokenizer import Source
+from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import TokenBuffer
+from nyr.parser.tokenizer import tokenKinds
+from nyr.parser.tokenizer import TokenStream
+
+_openingKind = tokenKinds["{"]
+_braces = re.compile(b"[" + re.escape(bytes([_openingKind, tokenKinds["}"]])) + b"]")
+# bodies declaring functions change `fns` while they are parsed, see `LazyParser`
+_declarations = re.compile(b"[" + re.escape(bytes([tokenKinds["def"], tokenKinds["class"]])) + b"]")
+
+
+class _FunctionHistory(dict):
+	""" `Parser.fns` that remembers every entry each name had, to look them up as of an earlier point of the parse """
+
+	def __init__(self):
+		super().__init__()
+		# number of functions declared so far
+		self.declared = 0
+		# name -> (values of `declared` when it was declared, its entries)
+		self.entries: dict[str, tuple[list[int], list[dict[str, Any]]]] = {}
+
+	def update(self, entries: dict[str, dict[str, Any]]) -> None:  # type: ignore[override]
+		for name, entry in entries.items():
+			self.declared += 1
+			declared, history = self.entries.setdefault(name, ([], []))
+			declared.append(self.declared)
+			history.append(entry)
+		super().update(entries)
+
+	def scope(self, names: Iterable[str], declared: int) -> dict[str, dict[str, Any]]:
+		""" The entries `names` had once `declared` functions were declared """
+		scope = {}
+		for name in names:
+			if name in self.entries:
+				declarations, history = self.entries[name]
+				index = bisect.bisect_right(declarations, declared)
+				if index:
+					scope[name] = history[index - 1]
+		return scope
+
+
+def _closingBraces(kinds: bytes) -> dict[int, int]:
+	""" Maps the index of every `{` token that is closed to the index of its `}` """
+	closing = {}
+	opened = []
+	for brace in _braces.finditer(kinds):
+		index = brace.start()
+		if kinds[index] == _openingKind:
+			opened.append(index)
+		elif opened:
+			closing[opened.pop()] = index
+	return closing
+
+
+class _BufferCursor:
+	""" Iterator over the tokens of a `TokenBuffer` that can be moved ahead """
+
+	def __init__(self, tokens: TokenBuffer):
+		self.tokens = tokens
+		self.index = 0
+
+	def __iter__(self):
+		return self
+
+	def __next__(self) -> Token:
+		index = self.index
+		if index >= len(self.tokens):
+			raise StopIteration
+		self.index = index + 1
+		return self.tokens[index]
+
+
+class LazyBlockStatement(Node.Node):
+	""" Function body that has only been brace-matched, its `BlockStatement` is built by the first `parse`
+
+		Refers to the range of its tokens in the `TokenBuffer` of the program and to the `fns` of the
+		parse as of its declaration, so its calls are linked exactly as if it had been parsed in place.
+		It builds its nodes from the limit on nodes the parse and its other bodies left, so the whole
+		program is held to it just the same.
+	"""
+	type = "BlockStatement"
+	__slots__ = ("tokens", "first", "last", "fns", "declared", "lines", "limits", "nodesLeft", "block")
+
+	def __init__(
+		self, tokens: TokenBuffer, first: int, last: int, fns: _FunctionHistory, lines: Optional[LineIndex],
+		limits: Optional[ParserLimits] = None, nodesLeft: Optional[list[int]] = None,
+	):
+		super().__init__()
+		self.tokens: Optional[TokenBuffer] = tokens
+		self.first = first
+		self.last = last
+		self.fns: Optional[_FunctionHistory] = fns
+		self.declared = fns.declared
+		self.lines = lines
+		# of the parse the body was skipped in, only `nodes` applies (the others prevent skipping)
+		self.limits = limits
+		# the nodes that parse left to build (see `Parser._nodesLeft`), shared with its other bodies
+		self.nodesLeft = nodesLeft
+		self.block: Optional[Node.BlockStatement] = None
+
+	def __repr__(self):  # pragma: no cover
+		state = "parsed" if self.block is not None else f"tokens {self.first} to {self.last}"
+		return f"{self.__module__}.{self.__class__.__name__}({state})"
+
+	def parse(self) -> Node.BlockStatement:
+		""" Returns the `BlockStatement` of this body, parsing it on the first call
+
+			Syntax errors inside the body only surface here.
+		"""
+		if self.block is None:
+			tokens = [self.tokens[index] for index in range(self.first, self.last + 1)]
+
+			parser = Parser(self.limits)
+			parser._reset()
+			if self.nodesLeft is not None:
+				parser._nodesLeft = self.nodesLeft[0]
+			parser.fns = self.fns.scope({token.value for token in tokens if token.type == "IDENTIFIER"}, self.declared)
+			parser.lines = self.lines
+			parser.tokens = TokenStream(tokens)
+			parser.lookahead = parser.getNextToken()
+
+			self.block = parser.BlockStatement()
+			if self.nodesLeft is not None:
+				self.nodesLeft[0] = parser._nodesLeft
+			self.tokens = self.fns = self.lines = self.limits = self.nodesLeft = None
+
+		return self.block
+
+	def toJSON(self):
+		return self.parse().toJSON()
+
+
+class LazyParser(Parser):
+	""" `Parser` that defers building function bodies until they are first called
+
+		When parsing from a `TokenBuffer` (as `parse` does), a body is only brace-matched on the kinds of
+		its tokens, skipped and kept as a `LazyBlockStatement`, which the interpreter parses the first time
+		it calls the function. For scripts that declare many functions but call few of them this skips
+		most of the parsing, at the price of syntax errors in function bodies only being raised when they
+		are called and of keeping the tokens (and the source) while a body is not parsed.
+		Bodies that declare functions or classes themselves change `fns` while they are parsed,
+		so those are still parsed in place, as are all bodies when parsing from other token iterables
+		and when a limit on the tokens (`tokens`, `depth` or `seconds` of `ParserLimits`) is set, which
+		skipped tokens would escape.
+	"""
+
+	def __init__(self, limits: Optional[ParserLimits] = None):
+		super().__init__(limits)
+		self.fns: _FunctionHistory = _FunctionHistory()
+		self._cursor: Optional[_BufferCursor] = None
+		self._kinds = b""
+		self._closing: Optional[dict[int, int]] = None
+		self._nodesShared = [-1]
+
+	def _reset(self):
+		super()._reset()
+		self.fns = _FunctionHistory()
+		# a new cell per parse, the bodies of earlier parses keep theirs
+		self._nodesShared = [-1]
+
+	def parse(self, string: Source) -> Node.Program:
+		""" Parses `string` through a `TokenBuffer`, which the unparsed function bodies keep referring to
+
+			Buffers other than `bytes` (e.g. an `mmap.mmap`, which may be closed later) are copied.
+		"""
+		if not isinstance(string, (str, bytes)):
+			string = bytes(string)
+		self.limits.checkSource(string)
+		self.tokenizer.init(string)
+		return self.parseTokens(self.tokenizer.getTokenBuffer())
+
+	def _parse(self, tokens: Iterable[Token]) -> Node.Program:
+		if not isinstance(tokens, TokenBuffer):
+			return super()._parse(tokens)
+
+		self._cursor = _BufferCursor(tokens)
+		try:
+			program = super()._parse(self._cursor)
+		finally:
+			self._cursor = None
+			self._kinds = b""
+			self._closing = None
+
+		# the skipped bodies build their nodes from what the program left
+		self._nodesShared[0] = self._nodesLeft
+		return program
+
+	def FunctionBody(self) -> Node.Node:
+		cursor = self._cursor
+		if cursor is None or self.lookahead.type != "{" or self.limits.limitsTokens:
+			return super().FunctionBody()
+
+		if self._closing is None:
+			self._kinds = cursor.tokens.kinds.tobytes()
+			self._closing = _closingBraces(self._kinds)
+
+		# the lookahead is the last token taken from the cursor
+		first = cursor.index - 1
+		last = self._closing.get(first)
+		if last is None or _declarations.search(self._kinds, first, last) is not None:
+			return super().FunctionBody()
+
+		body = LazyBlockStatement(cursor.tokens, first, last, self.fns, self.lines, self.limits, self._nodesShared)
+		body.start = cursor.tokens.start(first)
+		body.end = self.lastEnd = cursor.tokens.end(last)
+
+		cursor.index = last + 1
+		self.lookahead = self.getNextToken()
+
+		return body
@@ -0,0 +1,106 @@
+import sys
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Callable
+from typing import NamedTuple
+from typing import Optional
+from typing import Union
+
+from nyr.parser.tokenizer import Source
+from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import Tokenizer
+
+# The wall time is only looked at every this many tokens
+TIME_CHECK_INTERVAL = 1024
+
+# how much a token changes the nesting depth
+_nesting = {"(": 1, "[": 1, "{": 1, ")": -1, "]": -1, "}": -1}
+
+
+class ParserLimitError(Exception):
+	""" Raised when parsing an input would exceed one of the `ParserLimits` of the parser """
+
+	def __init__(self, limit: str, maximum: Union[int, float], position: str = ""):
+		super().__init__(f"Parser limit exceeded: more than {maximum} {limit}{position}")
+		# the name of the `ParserLimits` field that was exceeded
+		self.limit = limit
+		self.maximum = maximum
+
+
+class ParserLimits(NamedTuple):
+	""" Upper bounds on what parsing a single input may use, `None` means unbounded
+
+		`depth` is the nesting of parentheses, brackets and braces. Nesting without them (e.g. `- - x`
+		or `else if` chains) is bounded by `tokens`, and `Parser` raises `RecursionError` for nesting
+		deeper than the Python stack allows anyway (see `IterativeParser`).
+	"""
+	sourceBytes: Optional[int] = None
+	tokens: Optional[int] = None
+	nodes: Optional[int] = None
+	depth: Optional[int] = None
+	seconds: Optional[float] = None
+
+	@property
+	def limitsTokens(self) -> bool:
+		""" Whether any of the limits `checkTokens` checks is set """
+		return self.tokens is not None or self.depth is not None or self.seconds is not None
+
+	def checkSource(self, string: Source) -> None:
+		""" Raises if `string` is longer than `sourceBytes` when encoded as UTF-8 """
+		if self.sourceBytes is None:
+			return
+		size = len(string)
+		# a character takes one to four bytes, only encode if that does not decide it
+		if isinstance(string, str) and self.sourceBytes // 4 < size <= self.sourceBytes:
+			size = len(string.encode("utf-8", "surrogatepass"))
+		if size > self.sourceBytes:
+			raise ParserLimitError("sourceBytes", self.sourceBytes)
+
+	def checkChunks(self, chunks: Iterable[str]) -> Iterator[str]:
+		""" Yields `chunks`, raising as soon as they add up to more than `sourceBytes` """
+		size = 0
+		for chunk in chunks:
+			size += len(chunk.encode("utf-8", "surrogatepass"))
+			if size > self.sourceBytes:
+				raise ParserLimitError("sourceBytes", self.sourceBytes)
+			yield chunk
+
+	def checkTokens(self, tokens: Union[Tokenizer, Iterable[Token]], position: Callable[[Token], str]) -> Iterator[Token]:
+		""" Yields the tokens of a `Tokenizer` (initialized with the input) or of an iterable up to `EOF`,
+			raising as soon as they exceed `tokens`, `depth` or `seconds`
+
+			This runs for every token, so it pulls them from a `Tokenizer` directly instead of through
+			`Tokenizer.tokenize`, only tracks the depth if it is limited and looks at the clock only once in a while.
+		"""
+		nextToken = tokens._getNextToken if isinstance(tokens, Tokenizer) else iter(tokens).__next__
+		maxTokens = sys.maxsize if self.tokens is None else self.tokens
+		maxDepth = self.depth
+		deadline = None if self.seconds is None else time.monotonic() + self.seconds
+		count = depth = 0
+		# the next count to look at the limit on tokens and the time at, one compare per token for both
+		checkpoint = maxTokens if deadline is None else min(maxTokens, TIME_CHECK_INTERVAL)
+
+		while True:
+			try:
+				token = nextToken()
+			except StopIteration:
+				return
+			kind = token.type
+			count += 1
+
+			if count > checkpoint:
+				if count > maxTokens and kind != "EOF":
+					raise ParserLimitError("tokens", maxTokens, position(token))
+				if deadline is not None:
+					if time.monotonic() > deadline:
+						raise ParserLimitError("seconds", self.seconds, position(token))
+					checkpoint = min(maxTokens, count + TIME_CHECK_INTERVAL)
+			if maxDepth is not None and kind in _nesting:
+				depth += _nesting[kind]
+				if depth > maxDepth:
+					raise ParserLimitError("depth", maxDepth, position(token))
+
+			yield token
+			if kind == "EOF":
+				return
@@ -18,11 +18,26 @@ NodeValue = Union[None, int, float, bool, str]
 
 
 class Node:
+	""" Base of all nodes
+
+		Nodes only have the attributes in their `__slots__`, which keeps large trees small. The `type` of most
+		node classes is a class attribute; `ComplexExpression` and `Literal`, which have several types, have
+		it in a slot.
+	"""
+	__slots__ = ("start", "end")
 	type: str
+	# position of the class in `nodeClasses` (set there), -1 for other classes; visitors dispatch on it
+	kind: int = -1
 	value: NodeValue = None
+	# attributes passed to the constructor, in order (and in source order of their nodes)
+	_fields: tuple[str, ...] = ()
+	# span `[start, end)` of the source this node was parsed from, see `tokenizer.LineIndex` for line / column
+	start: int
+	end: int
 
-	def __init__(self, type_: str):
-		self.type = type_
+	def __init__(self):
+		self.start = 0
+		self.end = 0
 
 	def __repr__(self):  # pragma: no cover
 		return f"{self.__module__}.{self.__class__.__name__}('{self.type}')"
@@ -32,8 +47,12 @@ class Node:
 
 
 class Program(Node):
+	type = "Program"
+	__slots__ = ("body",)
+	_fields = ("body",)
+
 	def __init__(self, body: list[Node]):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.body = body
 
 	def __repr__(self):  # pragma: no cover
@@ -44,8 +63,12 @@ class Program(Node):
 
 
 class VariableDeclaration(Node):
+	type = "VariableDeclaration"
+	__slots__ = ("id", "init")
+	_fields = ("id", "init")
+
 	def __init__(self, id_: Identifier, init: Union[None, Identifier, Literal]):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.id = id_
 		self.init = init
 
@@ -57,8 +80,12 @@ class VariableDeclaration(Node):
 
 
 class Identifier(Node):
+	type = "Identifier"
+	__slots__ = ("name",)
+	_fields = ("name",)
+
 	def __init__(self, name: str):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.name = name
 
 	def __repr__(self):  # pragma: no cover
@@ -70,8 +97,12 @@ class Identifier(Node):
 
 # Statements
 class ExpressionStatement(Node):
+	type = "ExpressionStatement"
+	__slots__ = ("expression",)
+	_fields = ("expression",)
+
 	def __init__(self, expression: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.expression = expression
 
 	def __repr__(self):  # pragma: no cover
@@ -82,16 +113,24 @@ class ExpressionStatement(Node):
 
 
 class EmptyStatement(Node):
+	type = "EmptyStatement"
+	__slots__ = ()
+	_fields = ()
+
 	def __init__(self):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 
 	def toJSON(self):
 		return {"type": self.type}
 
 
 class BlockStatement(Node):
+	type = "BlockStatement"
+	__slots__ = ("body",)
+	_fields = ("body",)
+
 	def __init__(self, body: list[Node]):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.body = body
 
 	def __repr__(self):  # pragma: no cover
@@ -102,8 +141,12 @@ class BlockStatement(Node):
 
 
 class IfStatement(Node):
+	type = "IfStatement"
+	__slots__ = ("test", "consequent", "alternative")
+	_fields = ("test", "consequent", "alternative")
+
 	def __init__(self, test: Node, consequent: Node, alternative: Optional[Node]):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.test = test
 		self.consequent = consequent
 		self.alternative = alternative
@@ -116,8 +159,12 @@ class IfStatement(Node):
 
 
 class VariableStatement(Node):
+	type = "VariableStatement"
+	__slots__ = ("declarations",)
+	_fields = ("declarations",)
+
 	def __init__(self, declarations: list[VariableDeclaration]):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.declarations: list[VariableDeclaration] = declarations
 
 	def __repr__(self):  # pragma: no cover
@@ -128,8 +175,12 @@ class VariableStatement(Node):
 
 
 class WhileStatement(Node):
+	type = "WhileStatement"
+	__slots__ = ("test", "body")
+	_fields = ("test", "body")
+
 	def __init__(self, test: Node, body: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.test = test
 		self.body = body
 
@@ -141,8 +192,12 @@ class WhileStatement(Node):
 
 
 class DoWhileStatement(Node):
+	type = "DoWhileStatement"
+	__slots__ = ("body", "test")
+	_fields = ("body", "test")
+
 	def __init__(self, body: Node, test: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.test = test
 		self.body = body
 
@@ -154,8 +209,12 @@ class DoWhileStatement(Node):
 
 
 class ForStatement(Node):
+	type = "ForStatement"
+	__slots__ = ("init", "test", "update", "body")
+	_fields = ("init", "test", "update", "body")
+
 	def __init__(self, init: Union[None, VariableStatement, ComplexExpression], test: Optional[Node], update: Optional[Node], body: BlockStatement):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.init: Union[None, VariableStatement, ComplexExpression] = init
 		self.test: Optional[Node] = test
 		self.update: Optional[Node] = update
@@ -170,13 +229,16 @@ class ForStatement(Node):
 
 # Expressions
 class ComplexExpression(Node):
+	__slots__ = ("type", "operator", "left", "right")
 	type: str
 	operator: str
 	left: Node
 	right: Node
+	_fields = ("type", "operator", "left", "right")
 
 	def __init__(self, type_: str, operator: str, left: Node, right: Node):
-		super().__init__(type_)
+		super().__init__()
+		self.type = type_
 		self.operator = operator
 		self.left = left
 		self.right = right
@@ -189,8 +251,12 @@ class ComplexExpression(Node):
 
 
 class UnaryExpression(Node):
+	type = "UnaryExpression"
+	__slots__ = ("operator", "argument")
+	_fields = ("operator", "argument")
+
 	def __init__(self, operator: str, argument: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.operator = operator
 		self.argument = argument
 
@@ -202,12 +268,15 @@ class UnaryExpression(Node):
 
 
 class MemberExpression(Node):
+	type = "MemberExpression"
+	__slots__ = ("computed", "object", "property")
 	computed: bool
 	object: Node
 	property: Node
+	_fields = ("computed", "object", "property")
 
 	def __init__(self, computed: bool, object_: Node, property_: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.computed = computed
 		self.object = object_
 		self.property = property_
@@ -221,12 +290,15 @@ class MemberExpression(Node):
 
 # Functions
 class FunctionDeclaration(Node):
+	type = "FunctionDeclaration"
+	__slots__ = ("name", "params", "body")
 	name: Identifier
 	params: list[Node]
 	body: Node
+	_fields = ("name", "params", "body")
 
 	def __init__(self, name: Identifier, parameters: list[Node], body: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.name = name
 		self.params = parameters
 		self.body = body
@@ -239,8 +311,12 @@ class FunctionDeclaration(Node):
 
 
 class ReturnStatement(Node):
+	type = "ReturnStatement"
+	__slots__ = ("argument",)
+	_fields = ("argument",)
+
 	def __init__(self, argument: Optional[Node]):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.argument = argument
 
 	def __repr__(self):  # pragma: no cover
@@ -251,11 +327,14 @@ class ReturnStatement(Node):
 
 
 class CallExpression(Node):
+	type = "CallExpression"
+	__slots__ = ("callee", "arguments", "fn")
 	callee: Identifier
 	arguments: list[Node]
+	_fields = ("callee", "arguments")
 
 	def __init__(self, callee: Identifier, arguments: list[Node], fn: Optional[dict[str, Any]] = None):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.callee = callee
 		self.arguments = arguments
 		self.fn = fn
@@ -269,12 +348,15 @@ class CallExpression(Node):
 
 # Classes
 class ClassDeclaration(Node):
+	type = "ClassDeclaration"
+	__slots__ = ("id", "superClass", "body")
 	id: Identifier
 	superClass: Optional[Identifier]
 	body: Node
+	_fields = ("id", "superClass", "body")
 
 	def __init__(self, id_: Identifier, superClass: Optional[Identifier], body: Node):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 		self.id = id_
 		self.superClass = superClass
 		self.body = body
@@ -287,16 +369,24 @@ class ClassDeclaration(Node):
 
 
 class SuperExpression(Node):
+	type = "SuperExpression"
+	__slots__ = ()
+	_fields = ()
+
 	def __init__(self):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 
 	def toJSON(self):
 		return {"type": self.type}
 
 
 class ThisExpression(Node):
+	type = "ThisExpression"
+	__slots__ = ()
+	_fields = ()
+
 	def __init__(self):
-		super().__init__(self.__class__.__name__)
+		super().__init__()
 
 	def toJSON(self):
 		return {"type": self.type}
@@ -304,10 +394,13 @@ class ThisExpression(Node):
 
 # Literals
 class Literal(Node):
+	__slots__ = ("type", "value")
 	value: NodeValue
+	_fields = ("type", "value")
 
 	def __init__(self, type_: str, value: NodeValue):
-		super().__init__(type_)
+		super().__init__()
+		self.type = type_
 		self.value = value
 
 	def __repr__(self):  # pragma: no cover
@@ -315,3 +408,33 @@ class Literal(Node):
 
 	def toJSON(self):
 		return {"type": self.type, "value": self.value}
+
+
+# Every concrete node class; their position in this tuple identifies them in serialized ASTs
+nodeClasses: tuple[type[Node], ...] = (
+	Program,
+	VariableDeclaration,
+	Identifier,
+	ExpressionStatement,
+	EmptyStatement,
+	BlockStatement,
+	IfStatement,
+	VariableStatement,
+	WhileStatement,
+	DoWhileStatement,
+	ForStatement,
+	ComplexExpression,
+	UnaryExpression,
+	MemberExpression,
+	FunctionDeclaration,
+	ReturnStatement,
+	CallExpression,
+	ClassDeclaration,
+	SuperExpression,
+	ThisExpression,
+	Literal,
+)
+
+for kind, cls in enumerate(nodeClasses):
+	cls.kind = kind
+del kind, cls
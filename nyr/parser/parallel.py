@@ -0,0 +1,142 @@
+import gc
+import os
+import re
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+from nyr.parser import node as Node
+from nyr.parser import serialize
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import LineIndex
+from nyr.parser.tokenizer import Source
+from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import Tokenizer
+
+# Inputs shorter than this are parsed in this process, starting workers would take longer
+MIN_PARALLEL_LENGTH = 1 << 20
+# Number of chunks per worker, so workers that get simpler chunks do not idle
+CHUNKS_PER_JOB = 4
+
+# where the input may be split: declarations at the start of a line, as generated code has them
+_splitPoint = re.compile(r"^(?:def|class)\b", re.MULTILINE)
+_splitPointBytes = re.compile(_splitPoint.pattern.encode(), re.MULTILINE)
+
+
+class _SplitError(Exception):
+	""" A chunk does not end where a token starts, so it was not split at a statement boundary """
+
+
+def _chunkTokens(tokens: Iterable[Token], stop: int) -> Iterator[Token]:
+	""" The tokens in front of `stop`, which has to be the end of the input or where a token starts, then `EOF` """
+	for token in tokens:
+		if token.end > stop or token.type == "EOF":
+			if token.start != stop:
+				raise _SplitError(f"No token starts at {stop}")
+			yield Token("EOF", None, stop, stop)
+			return
+		yield token
+
+
+@contextmanager
+def _gcPaused() -> Iterator[None]:
+	""" Suspends the cyclic garbage collector, which would otherwise scan the growing tree again and again while it is built """
+	enabled = gc.isenabled()
+	gc.disable()
+	try:
+		yield
+	finally:
+		if enabled:
+			gc.enable()
+
+
+# the input of the worker processes, see `_initWorker`
+_source: Source = ""
+_lines: Optional[LineIndex] = None
+
+
+def _initWorker(source: Source) -> None:
+	global _source, _lines
+	_source = source
+	_lines = LineIndex(source)
+
+
+def _parseChunk(start: int, stop: int) -> bytes:
+	""" Parses the statements from `start` to `stop` of the input, returns them serialized as a program
+
+		The program is parsed on its own, so its calls of functions declared in front of it are linked
+		by `serialize.loads` in the parent.
+	"""
+	tokenizer = Tokenizer()
+	tokenizer.init(_source)
+	tokenizer.cursor = start
+
+	parser = Parser()
+	parser.lines = _lines
+	with _gcPaused():
+		return serialize.dumps(parser._parse(_chunkTokens(tokenizer.tokenize(), stop)))
+
+
+class ParallelParser(Parser):
+	""" `Parser` that splits large inputs into chunks of top-level statements and parses those in worker processes
+
+		Chunks start at function or class declarations at the start of a line, which generated modules consist of.
+		Each worker checks that its chunk ends exactly where a token starts (and not, say, in a string), and parses
+		it as a program of its own. The parent decodes the serialized chunks in source order (see `serialize.loads`),
+		linking their calls as if the whole input had been parsed at once, so the program and `fns` are identical
+		to what `Parser` builds. If a chunk is not split at a statement boundary or does not parse, the whole
+		input is parsed again in this process, to raise the right error.
+		Limits other than `sourceBytes` apply to the input as a whole, so with any of them set it is parsed in this process.
+	"""
+
+	def __init__(self, limits: Optional[ParserLimits] = None, jobs: Optional[int] = None):
+		super().__init__(limits)
+		# number of worker processes, one per CPU by default
+		self.jobs = jobs or os.cpu_count() or 1
+
+	def parse(self, string: Source) -> Node.Program:
+		if not isinstance(string, (str, bytes)):
+			string = bytes(string)
+		self.limits.checkSource(string)
+
+		chunks = self._chunks(string) if self._parallel() and len(string) >= MIN_PARALLEL_LENGTH else []
+		if len(chunks) < 2:
+			return super().parse(string)
+
+		self._reset()
+		programs: list[Node.Program] = []
+		try:
+			with _gcPaused(), ProcessPoolExecutor(min(self.jobs, len(chunks)), initializer=_initWorker, initargs=(string,)) as executor:
+				for payload in executor.map(_parseChunk, *zip(*chunks)):
+					programs.append(serialize.loads(payload, self.fns))
+		except (SyntaxError, _SplitError):
+			return super().parse(string)
+
+		program = Node.Program([statement for chunk in programs for statement in chunk.body])
+		program.start = programs[0].start
+		program.end = programs[-1].end
+		return program
+
+	def _parallel(self) -> bool:
+		""" Whether inputs may be parsed in worker processes at all """
+		return self.jobs > 1 and not self.limits.limitsTokens and self.limits.nodes is None
+
+	def _chunks(self, string: Source) -> list[tuple[int, int]]:
+		""" Splits `string` into about `CHUNKS_PER_JOB` ranges per job, at declarations at the start of a line """
+		splitPoint = _splitPoint if isinstance(string, str) else _splitPointBytes
+		size = len(string) // (self.jobs * CHUNKS_PER_JOB) + 1
+
+		chunks = []
+		start = 0
+		while True:
+			point = splitPoint.search(string, start + size)
+			if point is None:
+				break
+			chunks.append((start, point.start()))
+			start = point.start()
+		chunks.append((start, len(string)))
+
+		return chunks
@@ -1,26 +1,104 @@
+from collections.abc import Iterable
+from collections.abc import Iterator
 from typing import Any
+from typing import get_args
+from typing import Optional
+from typing import TypeVar
+from typing import Union
 
 from nyr.parser import node as Node
+from nyr.parser.interning import InternTable
+from nyr.parser.limits import ParserLimitError
+from nyr.parser.limits import ParserLimits
+from nyr.parser.tokenizer import Buffer
+from nyr.parser.tokenizer import LineIndex
+from nyr.parser.tokenizer import Source
 from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import TokenBuffer
 from nyr.parser.tokenizer import Tokenizer
+from nyr.parser.tokenizer import TokenStream
+
+
+NodeT = TypeVar("NodeT", bound=Node.Node)
+
+# Bump whenever the grammar or the nodes it builds change, this invalidates cached ASTs (see `nyr.parser.cache`)
+GRAMMAR_VERSION = 1
+
+# Binary operator token -> (precedence, node type), higher binds tighter
+binaryOperators: dict[str, tuple[int, str]] = {
+	"LOGICAL_OR": (1, "LogicalExpression"),
+	"LOGICAL_AND": (2, "LogicalExpression"),
+	"BITWISE_OR": (3, "BitwiseExpression"),
+	"BITWISE_XOR": (4, "BitwiseExpression"),
+	"BITWISE_AND": (5, "BitwiseExpression"),
+	"EQUALITY_OPERATOR": (6, "BinaryExpression"),
+	"RELATIONAL_OPERATOR": (7, "BinaryExpression"),
+	"ADDITIVE_OPERATOR": (8, "BinaryExpression"),
+	"MULTIPLICATIVE_OPERATOR": (9, "BinaryExpression"),
+}
+
+
+def linkFunctions(node: Node.Node, fns: Optional[dict[str, dict[str, Any]]] = None) -> dict[str, dict[str, Any]]:
+	""" Links the `CallExpression`s in `node` to their functions the way parsing it does
+
+		For trees that were not built by a `Parser` (e.g. deserialized ones), returns what `Parser.fns`
+		would have been after parsing them. Pass the `fns` of the code in front of `node` to continue from there.
+	"""
+	if fns is None:
+		fns = {}
+	# a 1-tuple marks the end of a function declaration
+	stack: list[Any] = [node]
+
+	while stack:
+		value = stack.pop()
+		if isinstance(value, Node.Node):
+			if isinstance(value, Node.FunctionDeclaration):
+				fns.update({value.name.name: {"args": value.params}})
+				stack.append((value,))
+			elif isinstance(value, Node.CallExpression):
+				value.fn = fns.get(value.callee.name, None) if isinstance(value.callee, Node.Identifier) else None
+			stack.extend(getattr(value, field) for field in reversed(value._fields))
+		elif isinstance(value, list):
+			stack.extend(reversed(value))
+		elif isinstance(value, tuple):
+			fns[value[0].name.name].update({"body": value[0].body})
+
+	return fns
 
 
 class Parser:
-	def __init__(self):
+	def __init__(self, limits: Optional[ParserLimits] = None, internTable: Optional[InternTable] = None):
+		# what a single parse may use, see `ParserLimits`
+		self.limits = limits or ParserLimits()
+		# shares identical nodes between (and within) the trees parsed, see `InternTable`
+		self.internTable = internTable
 		self.tokenizer = Tokenizer()
 		self.string = ""
 		self.lookahead = None
-		self.tokens = tuple()
-		self.tkIndex = 0
+		self.tokens = TokenStream()
 		self.fns = {}
 		self.lastPos = (1, 1)
+		self.lastEnd = 0
+		self.lines: Optional[LineIndex] = None
+		self._nodesLeft = -1
 
 	def _reset(self):
 		self.string = ""
 		self.lookahead = None
-		self.tokens = tuple()
-		self.tkIndex = 0
+		self.tokens = TokenStream()
 		self.fns = {}
+		self.lastEnd = 0
+		self.lines = None
+		# counts down to 0 with every node built, negative for no limit
+		self._nodesLeft = -1 if self.limits.nodes is None else self.limits.nodes
+
+	def _release(self):
+		""" Drops everything but the results (`fns`) of the last parse """
+		self.string = ""
+		self.lookahead = None
+		self.tokens = TokenStream()
+		self.lines = None
+		self.tokenizer.init("")
 
 	@staticmethod
 	def _isLiteral(tokenType) -> bool:
@@ -38,40 +116,121 @@ class Parser:
 			raise SyntaxError(f"Invalid left-hand side in assignment expression: {node}; expected: Identifier, MemberExpression")
 
 	def getNextToken(self) -> Token:
-		tk = self.tokens[self.tkIndex]
-		self.tkIndex += 1
-		return tk
+		return self.tokens.next()
 
 	def hasMoreTokens(self) -> bool:
-		return self.tkIndex == len(self.tokens) and self.tokens[self.tkIndex - 1].type == "EOF"
+		return self.lookahead is not None and self.lookahead.type == "EOF"
+
+	def parse(self, string: Source) -> Node.Program:
+		""" Parses `string`, which can also be a buffer of UTF-8 (see `Tokenizer`)
+
+			Tokens are pulled from the tokenizer as the grammar needs them,
+			so they never all exist at once.
+		"""
+		self._reset()
+		self.limits.checkSource(string)
+		self.string = string
+		self.lines = LineIndex(string)
+		self.tokenizer.init(string)
+
+		return self._parse(self.tokenizer)
+
+	def parseTokens(self, tokens: Iterable[Token]) -> Node.Program:
+		""" Parses already tokenized input, e.g. a `TokenBuffer` from `Tokenizer.getTokenBuffer` """
+		self._reset()
+		if isinstance(tokens, TokenBuffer):
+			self.limits.checkSource(tokens.source)
+			self.lines = LineIndex(tokens.source)
+
+		return self._parse(tokens)
+
+	def iterStatements(self, string: Union[Source, Iterable[str]]) -> Iterator[Node.Node]:
+		""" Yields the top-level statements of `string` one by one, each as soon as it is parsed
 
-	def parse(self, string: str) -> Node.Program:
+			`string` can also be an iterable of `str` chunks (e.g. a text file or `sys.stdin`), those are only
+			read as far as the statements need them (see `Tokenizer.tokenizeChunks`).
+			No statement is kept after it has been yielded, only `fns` refers to the declared functions.
+		"""
 		self._reset()
-		self.string = string.strip()
-		self.tokenizer.init(self.string)
+		if isinstance(string, (str, *get_args(Buffer))):
+			self.limits.checkSource(string)
+			self.string = string
+			self.lines = LineIndex(string)
+			self.tokenizer.init(string)
+			tokens = self.tokenizer
+		else:
+			if self.limits.sourceBytes is not None:
+				string = self.limits.checkChunks(string)
+			tokens = self.tokenizer.tokenizeChunks(string)
+			self.lines = self.tokenizer.lines
+		self.tokens = TokenStream(self._limitTokens(tokens))
 
-		self.tokens = self.tokenizer.getTokens()
-		self.lookahead = self.getNextToken()
+		try:
+			self.lookahead = self.getNextToken()
 
-		if self.lookahead.type == "EOF":
-			return Node.Program([])
+			while self.lookahead.type != "EOF":
+				statement = self.Statement()
+				yield statement if self.internTable is None else self.internTable.intern(statement)
+		finally:
+			self._release()
 
-		return self.Program()
+	def _limitTokens(self, tokens: Union[Tokenizer, Iterable[Token]]) -> Iterable[Token]:
+		""" The tokens of an initialized `Tokenizer` or an iterable, checked against the limits on them if there are any """
+		if not self.limits.limitsTokens:
+			return tokens.tokenize() if isinstance(tokens, Tokenizer) else tokens
+		return self.limits.checkTokens(tokens, self._position)
+
+	def _parse(self, tokens: Union[Tokenizer, Iterable[Token]]) -> Node.Program:
+		self.tokens = TokenStream(self._limitTokens(tokens))
+
+		try:
+			self.lookahead = self.getNextToken()
+
+			if self.lookahead.type == "EOF":
+				return Node.Program([])
+
+			program = self.Program()
+			return program if self.internTable is None else self.internTable.intern(program)
+		finally:
+			self._release()
 
 	def Program(self) -> Node.Program:
-		return Node.Program(self.StatementList())
+		start = self.lookahead.start
+		return self._finish(Node.Program(self.StatementList()), start)
+
+	def _finish(self, node: NodeT, start: int) -> NodeT:
+		""" Sets the span of `node`, from `start` to the end of the last eaten token """
+		node.start = start
+		node.end = self.lastEnd
+		if self._nodesLeft >= 0:
+			if not self._nodesLeft:
+				raise ParserLimitError("nodes", self.limits.nodes, self._position(self.lookahead))
+			self._nodesLeft -= 1
+		return node
+
+	def _position(self, token: Token) -> str:
+		return f" ({self.lines.position(token.start)})" if self.lines is not None else ""
+
+	def _expectedExpression(self) -> SyntaxError:
+		token = self.lookahead
+
+		if token.type == "EOF":
+			return SyntaxError(f"Unexpected end of input, expected an expression{self._position(token)}")
+
+		return SyntaxError(f'Unexpected token: "{token.value}", expected an expression{self._position(token)}')
 
 	def _eat(self, tokenType: str) -> Token:
 		token = self.lookahead
 
 		if token.type == tokenType:
+			self.lastEnd = token.end
 			self.lookahead = self.getNextToken()
 			return token
 
 		if self.hasMoreTokens() is False or token.type == "EOF":
-			raise SyntaxError(f'Unexpected end of input, expected "{tokenType}"')
+			raise SyntaxError(f'Unexpected end of input, expected "{tokenType}"{self._position(token)}')
 
-		raise SyntaxError(f'Unexpected token: "{token}", expected: "{tokenType}"')  # pragma: no cover
+		raise SyntaxError(f'Unexpected token: "{token}", expected: "{tokenType}"{self._position(token)}')  # pragma: no cover
 
 	def StatementList(self, stopLookahead: Any = None) -> list[Node.Node]:
 		statementList: list[Node.Node] = [self.Statement()]
@@ -118,9 +277,9 @@ class Parser:
 			;
 		"""
 
-		self._eat("super")
+		start = self._eat("super").start
 
-		return Node.SuperExpression()
+		return self._finish(Node.SuperExpression(), start)
 
 	def ThisExpression(self) -> Node.ThisExpression:
 		""" ThisExpression
@@ -128,23 +287,23 @@ class Parser:
 			;
 		"""
 
-		self._eat("this")
+		start = self._eat("this").start
 
-		return Node.ThisExpression()
+		return self._finish(Node.ThisExpression(), start)
 
 	def ClassDeclaration(self) -> Node.ClassDeclaration:
 		""" ClassDeclaration
 			: 'class' Identifier OptClassExtends BlockStatement
 		"""
 
-		self._eat("class")
+		start = self._eat("class").start
 		id_ = self.Identifier()
 
 		superClass = self.ClassExtends() if self.lookahead.type == ":" else None
 
 		body = self.BlockStatement()
 
-		return Node.ClassDeclaration(id_, superClass, body)
+		return self._finish(Node.ClassDeclaration(id_, superClass, body), start)
 
 	def ClassExtends(self) -> Node.Identifier:
 		""" ClassExtends
@@ -164,7 +323,7 @@ class Parser:
 			;
 		"""
 
-		self._eat("def")
+		start = self._eat("def").start
 		name = self.Identifier()
 		self.fns.update({name.name: {}})
 
@@ -173,10 +332,18 @@ class Parser:
 		self._eat(")")
 		self.fns[name.name].update({"args": params})
 
-		body = self.BlockStatement()
+		body = self.FunctionBody()
 		self.fns[name.name].update({"body": body})
 
-		return Node.FunctionDeclaration(name, params, body)
+		return self._finish(Node.FunctionDeclaration(name, params, body), start)
+
+	def FunctionBody(self) -> Node.Node:
+		""" FunctionBody
+			: BlockStatement
+			;
+		"""
+
+		return self.BlockStatement()
 
 	def FormalParameterList(self) -> list[Node.Node]:
 		""" FormalParameterList
@@ -201,13 +368,13 @@ class Parser:
 			;
 		"""
 
-		self._eat("return")
+		start = self._eat("return").start
 
 		argument = self.Expression() if self.lookahead.type != ";" else None
 
 		self._eat(";")
 
-		return Node.ReturnStatement(argument)
+		return self._finish(Node.ReturnStatement(argument), start)
 
 	def IterationStatement(self) -> Node.Node:
 		try:
@@ -222,7 +389,7 @@ class Parser:
 			raise
 
 	def WhileStatement(self) -> Node.WhileStatement:
-		self._eat("while")
+		start = self._eat("while").start
 
 		self._eat("(")
 		test = self.Expression()
@@ -230,10 +397,10 @@ class Parser:
 
 		body = self.Statement()
 
-		return Node.WhileStatement(test=test, body=body)
+		return self._finish(Node.WhileStatement(test=test, body=body), start)
 
 	def DoWhileStatement(self) -> Node.DoWhileStatement:
-		self._eat("do")
+		start = self._eat("do").start
 
 		body = self.Statement()
 
@@ -243,10 +410,10 @@ class Parser:
 		self._eat(")")
 		self._eat(";")
 
-		return Node.DoWhileStatement(body=body, test=test)
+		return self._finish(Node.DoWhileStatement(body=body, test=test), start)
 
 	def ForStatement(self) -> Node.ForStatement:
-		self._eat("for")
+		start = self._eat("for").start
 		self._eat("(")
 
 		init = self.ForStatementInit() if self.lookahead.type != ";" else None
@@ -260,7 +427,7 @@ class Parser:
 
 		body = self.Statement()
 
-		return Node.ForStatement(init, test, update, body)
+		return self._finish(Node.ForStatement(init, test, update, body), start)
 
 	def ForStatementInit(self) -> Node.Node:
 		if self.lookahead.type == "let":
@@ -268,7 +435,7 @@ class Parser:
 		return self.Expression()
 
 	def IfStatement(self) -> Node.IfStatement:
-		self._eat("if")
+		start = self._eat("if").start
 		self._eat("(")
 
 		test = self.Expression()
@@ -283,17 +450,18 @@ class Parser:
 		else:
 			alternative = None
 
-		return Node.IfStatement(test, consequent, alternative)
+		return self._finish(Node.IfStatement(test, consequent, alternative), start)
 
 	def VariableStatementInit(self) -> Node.VariableStatement:
-		self._eat("let")
+		start = self._eat("let").start
 		declarations = self.VariableDeclarationList()
 
-		return Node.VariableStatement(declarations)
+		return self._finish(Node.VariableStatement(declarations), start)
 
 	def VariableStatement(self) -> Node.VariableStatement:
 		variableStatement = self.VariableStatementInit()
 		self._eat(";")
+		variableStatement.end = self.lastEnd
 		return variableStatement
 
 	def VariableDeclarationList(self) -> list[Node.Node]:
@@ -315,45 +483,48 @@ class Parser:
 		else:
 			init = None
 
-		return Node.VariableDeclaration(id_, init)
+		return self._finish(Node.VariableDeclaration(id_, init), id_.start)
 
 	def VariableInitializer(self) -> Node.Node:
 		self._eat("SIMPLE_ASSIGN")
 		return self.AssignmentExpression()
 
 	def EmptyStatement(self) -> Node.EmptyStatement:
-		self._eat(";")
-		return Node.EmptyStatement()
+		start = self._eat(";").start
+		return self._finish(Node.EmptyStatement(), start)
 
 	def BlockStatement(self) -> Node.BlockStatement:
-		self._eat("{")
+		start = self._eat("{").start
 
 		body: list[Node.Node] = self.StatementList("}") if self.lookahead.type != "}" else []
 
 		self._eat("}")
 
-		return Node.BlockStatement(body)
+		return self._finish(Node.BlockStatement(body), start)
 
 	def ExpressionStatement(self) -> Node.ExpressionStatement:
 		expression = self.Expression()
 		self._eat(";")
 
-		return Node.ExpressionStatement(expression)
+		return self._finish(Node.ExpressionStatement(expression), expression.start)
 
 	def Expression(self) -> Node.Node:
 		return self.AssignmentExpression()
 
 	def AssignmentExpression(self) -> Node.Node:
-		left = self.LogicalORExpression()
+		left = self.BinaryExpression()
 
 		if not self._isAssignmentOperator(self.lookahead.type):
 			return left
 
-		return Node.ComplexExpression(
-			"AssignmentExpression",
-			self.AssignmentOperator().value,
-			self._checkValidAssignmentTarget(left),
-			self.AssignmentExpression(),
+		return self._finish(
+			Node.ComplexExpression(
+				"AssignmentExpression",
+				self.AssignmentOperator().value,
+				self._checkValidAssignmentTarget(left),
+				self.AssignmentExpression(),
+			),
+			left.start,
 		)
 
 	def AssignmentOperator(self) -> Token:
@@ -366,59 +537,38 @@ class Parser:
 			return self._eat("SIMPLE_ASSIGN")
 		return self._eat("COMPLEX_ASSIGN")
 
-	def LogicalExpression(self, builderName: str, operatorToken: str) -> Node.Node:
-		builder = getattr(self, builderName)
-
-		left = builder()
-
-		while self.lookahead.type == operatorToken:
-			operator = self._eat(operatorToken).value
-
-			right = builder()
-
-			left = Node.ComplexExpression(
-				"LogicalExpression",
-				operator,
-				left,
-				right,
-			)
-
-		return left
-
-	def LogicalORExpression(self) -> Node.Node:
-		return self.LogicalExpression("LogicalANDExpression", "LOGICAL_OR")
-
-	def LogicalANDExpression(self) -> Node.Node:
-		return self.LogicalExpression("BitwiseORExpression", "LOGICAL_AND")
-
-	def BitwiseExpression(self, builderName: str, operatorToken: str) -> Node.Node:
-		builder = getattr(self, builderName)
-
-		left = builder()
-
-		while self.lookahead.type == operatorToken:
-			operator = self._eat(operatorToken).value
-
-			right = builder()
+	def BinaryExpression(self, minPrecedence: int = 1) -> Node.Node:
+		""" BinaryExpression
+			: UnaryExpression
+			| BinaryExpression BINARY_OPERATOR BinaryExpression
+			;
 
-			left = Node.ComplexExpression(
-				"BitwiseExpression",
-				operator,
-				left,
-				right,
+			Precedence climbing over `binaryOperators`: operators binding at least as tight as
+			`minPrecedence` are folded into the left operand, their right operand only takes
+			operators binding tighter, so all of them are left associative.
+		"""
+		left = self.UnaryExpression()
+		start = left.start
+
+		while True:
+			operator = binaryOperators.get(self.lookahead.type)
+			if operator is None or operator[0] < minPrecedence:
+				return left
+
+			precedence, nodeType = operator
+			value = self._eat(self.lookahead.type).value
+			right = self.BinaryExpression(precedence + 1)
+
+			left = self._finish(
+				Node.ComplexExpression(
+					nodeType,
+					value,
+					left,
+					right,
+				),
+				start,
 			)
 
-		return left
-
-	def BitwiseORExpression(self) -> Node.Node:
-		return self.BitwiseExpression("BitwiseXORExpression", "BITWISE_OR")
-
-	def BitwiseXORExpression(self) -> Node.Node:
-		return self.BitwiseExpression("BitwiseANDExpression", "BITWISE_XOR")
-
-	def BitwiseANDExpression(self) -> Node.Node:
-		return self.BitwiseExpression("EqualityExpression", "BITWISE_AND")
-
 	def LeftHandSideExpression(self) -> Node.Node:
 		""" LeftHandSideExpression
 			: CallMemberExpression
@@ -457,7 +607,7 @@ class Parser:
 		fn = None
 		if isinstance(callee, Node.Identifier):
 			fn = self.fns.get(callee.name, None)
-		callExpression = Node.CallExpression(callee, self.Arguments(), fn)
+		callExpression = self._finish(Node.CallExpression(callee, self.Arguments(), fn), callee.start)
 
 		if self.lookahead.type == "(":
 			callExpression = self.CallExpression(callExpression)
@@ -500,6 +650,7 @@ class Parser:
 			;
 		"""
 		object_ = self.PrimaryExpression()
+		start = object_.start
 
 		while self.lookahead.type in [".", "["]:
 			# MemberExpression '.' Identifier
@@ -507,7 +658,7 @@ class Parser:
 				self._eat(".")
 				property_ = self.Identifier()
 
-				object_ = Node.MemberExpression(False, object_, property_)
+				object_ = self._finish(Node.MemberExpression(False, object_, property_), start)
 
 			# MemberExpression '[' Expression ']'
 			if self.lookahead.type == "[":
@@ -515,54 +666,24 @@ class Parser:
 				property_ = self.Expression()
 				self._eat("]")
 
-				object_ = Node.MemberExpression(True, object_, property_)
+				object_ = self._finish(Node.MemberExpression(True, object_, property_), start)
 
 		return object_
 
 	def Identifier(self) -> Node.Identifier:
-		name = self._eat("IDENTIFIER").value
-
-		return Node.Identifier(name)
-
-	def EqualityExpression(self) -> Node.Node:
-		return self.BinaryExpression("RelationalExpression", "EQUALITY_OPERATOR")
-
-	def RelationalExpression(self) -> Node.Node:
-		return self.BinaryExpression("AdditiveExpression", "RELATIONAL_OPERATOR")
-
-	def AdditiveExpression(self) -> Node.Node:
-		return self.BinaryExpression("MultiplicativeExpression", "ADDITIVE_OPERATOR")
-
-	def MultiplicativeExpression(self) -> Node.Node:
-		return self.BinaryExpression("UnaryExpression", "MULTIPLICATIVE_OPERATOR")
-
-	def BinaryExpression(self, builderName: str, operatorToken: str) -> Node.Node:
-		builder = getattr(self, builderName)
-
-		left = builder()
+		token = self._eat("IDENTIFIER")
 
-		while self.lookahead.type == operatorToken:
-			operator = self._eat(operatorToken).value
-
-			right = builder()
-
-			left = Node.ComplexExpression(
-				"BinaryExpression",
-				operator,
-				left,
-				right,
-			)
-
-		return left
+		return self._finish(Node.Identifier(token.value), token.start)
 
 	def UnaryExpression(self) -> Node.Node:
+		start = self.lookahead.start
 		if self.lookahead.type in ("ADDITIVE_OPERATOR", "LOGICAL_NOT"):
 			operator = self._eat(self.lookahead.type).value
 		else:
 			operator = None
 
 		if operator is not None:
-			return Node.UnaryExpression(operator, self.UnaryExpression())
+			return self._finish(Node.UnaryExpression(operator, self.UnaryExpression()), start)
 
 		return self.LeftHandSideExpression()
 
@@ -574,17 +695,18 @@ class Parser:
 			| ThisExpression
 			;
 		"""
-		if self._isLiteral(self.lookahead.type):
+		tokenType = self.lookahead.type
+
+		if tokenType == "IDENTIFIER":
+			return self.Identifier()
+		if self._isLiteral(tokenType):
 			return self.Literal()
-		else:
-			try:
-				return {
-					"(": self.ParenthesizedExpression,
-					"IDENTIFIER": self.Identifier,
-					"this": self.ThisExpression,
-				}[self.lookahead.type]()
-			except KeyError:
-				return self.LeftHandSideExpression()
+		if tokenType == "(":
+			return self.ParenthesizedExpression()
+		if tokenType == "this":
+			return self.ThisExpression()
+
+		raise self._expectedExpression()
 
 	def ParenthesizedExpression(self) -> Node.Node:
 		self._eat("(")
@@ -594,6 +716,7 @@ class Parser:
 		return expression
 
 	def Literal(self) -> Node.Literal:
+		start = self.lookahead.start
 		if self.lookahead.type == "INTEGER":
 			token = self._eat("INTEGER")
 			node = Node.Literal("IntegerLiteral", int(token.value))
@@ -615,4 +738,4 @@ class Parser:
 		else:  # pragma: no cover
 			raise SyntaxError("Literal: unexpected literal production")
 
-		return node
+		return self._finish(node, start)
@@ -0,0 +1,178 @@
+""" Compact binary serialization of `Node.Program` trees
+
+The tree is flattened into a postfix program for a stack machine: every instruction is one
+unsigned int holding an opcode in its low 2 bits and an argument in the others.
+
+- `CONST i` pushes `constants[i]` (names, operators, literal values, ...)
+- `LIST n` pops the top `n` values and pushes them as a list
+- `NODE i` pops one value per field of `Node.nodeClasses[i]` and pushes the node built from them
+- `FUNCTION i` marks the start of a function declaration named `constants[i]`, so `CallExpression.fn`
+can be linked while decoding instead of in another pass over the tree (see `linkFunctions`)
+
+The spans of the nodes are stored in two parallel arrays, in the order their `NODE` instructions run.
+Neither encoding nor decoding recurses, so trees of any depth round-trip.
+"""
+import marshal
+import sys
+import zlib
+from array import array
+from typing import Any
+from typing import Optional
+
+from nyr.parser import node as Node
+from nyr.parser.lazy import LazyBlockStatement
+
+# Bump whenever the layout below changes
+FORMAT_VERSION = 1
+
+CONST = 0
+LIST = 1
+NODE = 2
+FUNCTION = 3
+
+_classIndex: dict[type, int] = {cls: i for i, cls in enumerate(Node.nodeClasses)}
+_classFields: list[tuple[type, int]] = [(cls, len(cls._fields)) for cls in Node.nodeClasses]
+
+
+def _toBytes(values: array) -> bytes:
+	if sys.byteorder == "big":  # pragma: no cover
+		values = array(values.typecode, values)
+		values.byteswap()
+	return values.tobytes()
+
+
+def _fromBytes(data: bytes) -> array:
+	values = array("I")
+	values.frombytes(data)
+	if sys.byteorder == "big":  # pragma: no cover
+		values.byteswap()
+	return values
+
+
+def dumps(program: Node.Program) -> bytes:
+	""" Serializes `program` into bytes that `loads` turns back into an identical tree """
+	codes = array("I")
+	starts = array("I")
+	ends = array("I")
+	constants: list[Any] = []
+	# keyed by type as well, so 1, 1.0 and True stay different constants
+	constantIndex: dict[tuple[type, Any], int] = {}
+
+	def _constant(value: Any) -> int:
+		key = (type(value), value)
+		index = constantIndex.get(key)
+		if index is None:
+			index = constantIndex[key] = len(constants)
+			constants.append(value)
+		return index
+
+	# a 1-tuple on the stack holds an instruction to emit once everything above it has been emitted
+	stack: list[Any] = [program]
+	while stack:
+		value = stack.pop()
+		if type(value) is LazyBlockStatement:
+			# serialized as the body it stands for, like its `toJSON`
+			value = value.parse()
+
+		if isinstance(value, tuple):
+			instruction = value[0]
+			if isinstance(instruction, Node.Node):
+				codes.append(_classIndex[type(instruction)] << 2 | NODE)
+				starts.append(instruction.start)
+				ends.append(instruction.end)
+			else:
+				codes.append(instruction << 2 | LIST)
+		elif isinstance(value, Node.Node):
+			if isinstance(value, Node.FunctionDeclaration):
+				codes.append(_constant(value.name.name) << 2 | FUNCTION)
+			stack.append((value,))
+			stack.extend(getattr(value, field) for field in reversed(value._fields))
+		elif isinstance(value, list):
+			stack.append((len(value),))
+			stack.extend(reversed(value))
+		else:
+			codes.append(_constant(value) << 2 | CONST)
+
+	return zlib.compress(marshal.dumps((FORMAT_VERSION, _toBytes(codes), _toBytes(starts), _toBytes(ends), tuple(constants))), 1)
+
+
+def loads(data: bytes, fns: Optional[dict[str, dict[str, Any]]] = None) -> Node.Program:
+	""" Rebuilds the tree serialized by `dumps`, with its `CallExpression`s linked as by parsing it
+
+		Pass the `fns` of the code in front of the tree to link its calls to the functions declared there
+		(see `linkFunctions`), it is updated with the functions the tree declares.
+		Raises `ValueError` for anything that is not such a serialization.
+	"""
+	try:
+		version, codes, starts, ends, constants = marshal.loads(zlib.decompress(data))
+		if version != FORMAT_VERSION:
+			raise ValueError(f"Unsupported AST format version: {version}")
+		codes = _fromBytes(codes)
+		starts = _fromBytes(starts)
+		ends = _fromBytes(ends)
+
+		stack: list[Any] = []
+		push = stack.append
+		pop = stack.pop
+		nodes = 0
+		# `Parser.fns` while parsing, and the entries of the function declarations being decoded
+		if fns is None:
+			fns = {}
+		functions: list[dict[str, Any]] = []
+		classFields = _classFields
+		CallExpression = Node.CallExpression
+		FunctionDeclaration = Node.FunctionDeclaration
+		Identifier = Node.Identifier
+
+		for code in codes:
+			op = code & 3
+			argument = code >> 2
+
+			if op == 0:  # CONST
+				push(constants[argument])
+			elif op == 2:  # NODE
+				cls, fieldCount = classFields[argument]
+				# wrong numbers of fields end up as `TypeError`s
+				if fieldCount == 1:
+					node = cls(pop())
+				elif fieldCount == 2:
+					second = pop()
+					node = cls(pop(), second)
+				elif fieldCount:
+					node = cls(*stack[-fieldCount:])
+					del stack[-fieldCount:]
+				else:
+					node = cls()
+				node.start = starts[nodes]
+				node.end = ends[nodes]
+				nodes += 1
+				push(node)
+
+				# arguments cannot declare functions, so linking calls after them is the same as before
+				if cls is CallExpression:
+					if isinstance(node.callee, Identifier):
+						node.fn = fns.get(node.callee.name, None)
+				elif cls is FunctionDeclaration:
+					functions.pop().update({"args": node.params})
+					fns[node.name.name].update({"body": node.body})
+			elif op == 1:  # LIST
+				if argument > len(stack):
+					raise ValueError("Stack underflow")
+				if argument:
+					values = stack[-argument:]
+					del stack[-argument:]
+				else:
+					values = []
+				push(values)
+			else:  # FUNCTION
+				fns[constants[argument]] = {}
+				functions.append(fns[constants[argument]])
+
+		if len(stack) != 1 or not isinstance(stack[0], Node.Program) or nodes != len(starts) or functions:
+			raise ValueError("Data does not describe a single program")
+	except ValueError as e:
+		raise ValueError(f"Invalid serialized AST: {e}") from None
+	except (EOFError, TypeError, IndexError, KeyError, AttributeError, zlib.error) as e:
+		raise ValueError(f"Invalid serialized AST: {e!r}") from None
+
+	return stack[0]
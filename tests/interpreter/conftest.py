@@ -0,0 +1,18 @@
+import pytest
+
+from nyr.interpreter.closures import ClosureInterpreter
+from nyr.interpreter.interpreter import Interpreter
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc):
+	"""Runs the tests of the modules using `Interpreter` with each engine, except those marked `treeWalker`"""
+	if getattr(metafunc.module, "Interpreter", None) is Interpreter and metafunc.definition.get_closest_marker("treeWalker") is None:
+		metafunc.fixturenames.append("engine")
+		metafunc.parametrize("engine", (Interpreter, ClosureInterpreter), ids=("tree", "closure"), indirect=True)
+
+
+@pytest.fixture
+def engine(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> type:
+	"""The engine the test runs with, as the `Interpreter` of its module"""
+	monkeypatch.setattr(request.module, "Interpreter", request.param)
+	return request.param
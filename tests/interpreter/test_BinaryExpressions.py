@@ -1,3 +1,6 @@
+import math
+import re
+
 import pytest
 
 from nyr.interpreter.interpreter import Interpreter
@@ -137,3 +140,92 @@ def testStringConcatenation(string1: str, string2: str, expectedStr: str):
 	env = Interpreter().interpret(ast)
 
 	assert env == {"res": expectedStr}
+
+
+@pytest.mark.parametrize(
+	("code", "expectedRes"), (
+		pytest.param("let res = 6.0 / 2;", 3, id="integral float quotient"),
+		pytest.param("let res = 7 / 2;", 3.5, id="fractional quotient"),
+		pytest.param("let res = 6.0; res /= 2;", 3, id="compound assignment"),
+		pytest.param("let res = 10; res %= 4;", 2, id="compound modulo"),
+	),
+)
+def testIntegerDivision(code: str, expectedRes):
+	env = Interpreter().interpret(Parser().parse(code))
+
+	assert env == {"res": expectedRes}
+	assert type(env["res"]) is type(expectedRes)
+
+
+def testBigIntegers():
+	code = """
+		let res = 1;
+		for (let i = 2; i <= 2000; i += 1) {
+			res *= i;
+		}
+		let quotient = res / (res / 1999), sum = res + res, bigger = sum > res;
+	"""
+	env = Interpreter().interpret(Parser().parse(code))
+
+	assert env["res"] == math.factorial(2000)
+	assert env["quotient"] == 1999
+	assert env["sum"] == 2 * math.factorial(2000)
+	assert env["bigger"] is True
+
+
+# 10 to the 400th plus 1, too large for a float
+HUGE = "1" + "0" * 399 + "1"
+
+
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(f"let res = {HUGE} / 3;", id="int"),
+		pytest.param(f"let res = {HUGE} / 2.0;", id="float"),
+		pytest.param(f"let res = {HUGE}; res /= 7;", id="compound"),
+	),
+)
+def testQuotientTooLarge(code: str):
+	with pytest.raises(OverflowError, match="Cannot divide: the quotient is too large for a float"):
+		Interpreter().interpret(Parser().parse(code))
+
+
+def testStringsKeptAsIs():
+	code = r"""
+		let a = "it's \t", b = "\n";
+		let res = a + b, same = a == "it's \t", both = a && b, either = "" || b;
+	"""
+	env = Interpreter().interpret(Parser().parse(code))
+
+	# nyr has no escape sequences
+	assert env["res"] == "it's \\t\\n"
+	assert env["same"] is True
+	assert env["both"] == "\\n"
+	assert env["either"] == "\\n"
+
+
+@pytest.mark.parametrize(
+	("expr", "expectedRes"), (
+		pytest.param("null == null", True, id="null equals null"),
+		pytest.param("1 != null", True, id="int not null"),
+		pytest.param("null && 1", None, id="null is false"),
+		pytest.param("null || 1", 1, id="or"),
+	),
+)
+def testNull(expr: str, expectedRes):
+	env = Interpreter().interpret(Parser().parse(f"let res = {expr};"))
+
+	assert env == {"res": expectedRes}
+
+
+@pytest.mark.parametrize(
+	("expr", "message"), (
+		pytest.param("null + 1", "Cannot use + on null and int", id="null"),
+		pytest.param('"a" - 1', "Cannot use - on str and int", id="str"),
+		pytest.param("2.5 & 1", "Cannot use & on float and int", id="bitwise float"),
+		pytest.param('"a" / 0', "Cannot use / on str and int", id="divide str by 0"),
+		pytest.param("1 / null", "Cannot use / on int and null", id="divide by null"),
+	),
+)
+def testUnsupportedOperands(expr: str, message: str):
+	with pytest.raises(TypeError, match=re.escape(message)):
+		Interpreter().interpret(Parser().parse(f"let res = {expr};"))
@@ -0,0 +1,108 @@
+import io
+import os
+
+import pytest
+
+import nyr
+from nyr.interpreter import interpreter
+from nyr.interpreter.closures import ClosureInterpreter
+from nyr.parser.interning import InternTable
+from nyr.parser.lazy import LazyParser
+from nyr.parser.parser import Parser
+from tests.interpreter.test_Interpreter import STREAM_CODE
+
+
+def _outcome(engine: type, code: str, parser: type = Parser):
+	""" The variables `code` results in, or the type and message of the error it raises """
+	try:
+		return engine().interpret(parser().parse(code))
+	except Exception as e:
+		return type(e), str(e)
+
+
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(
+			"""
+				def fib(n) { if (n < 2) { return n; } else { return fib(n - 1) + fib(n - 2); } }
+				let a = fib(15), b = -a * 2 / 3, c = !(a > 3) || a % 7 == 0;
+			""",
+			id="recursion",
+		),
+		pytest.param('let a = 5, s = "a" + 1;', id="string names variable"),
+		pytest.param("let x = 0; let y = x || (x = 3);", id="assignment in right operand"),
+		pytest.param("let x = 2; let y = (x = 1) + 1;", id="assignment in left operand"),
+		pytest.param("def f() { return 1; return 2; } let r = f();", id="several returns"),
+		pytest.param("def f() { if (true) return 1; } let r = f();", id="return without block"),
+		pytest.param("let x = 1; let x = 2;", id="declared twice"),
+		pytest.param('let x = "y"; let x = 2;', id="declared twice, string"),
+		pytest.param("let x = 0; break; while (x < 5) { x += 1; }", id="break outside loop"),
+		pytest.param("let x = 0; for (let i = 0; i < 3; i += 1) { x += i; }", id="for variable removed"),
+		pytest.param("let x = 0; do x += 1; while (x < 3);", id="do-while without block"),
+		pytest.param("let x = 1; if (x) { x = 2; }", id="test not bool"),
+		pytest.param("x = 1;", id="assign undeclared"),
+		pytest.param("let x = 1; x /= 0;", id="divide by 0"),
+		pytest.param('let x = "a"; x -= 1;', id="unsupported compound"),
+		pytest.param("let x = -null;", id="unary null"),
+		pytest.param("def f(a) { return a; } let r = f(1, 2);", id="argument count"),
+		pytest.param("let r = f();", id="undeclared function"),
+		pytest.param("def f() { let y = x; return y; } let x = 1, r = f();", id="no outer scope"),
+		pytest.param("let a = 1; a.b = 2;", id="member expression"),
+		pytest.param("class A { }", id="class declaration"),
+		pytest.param("def f(n) { return f(n + 1); } f(0);", id="recursion overflow"),
+	),
+)
+def testSameAsInterpreter(code: str):
+	assert _outcome(ClosureInterpreter, code) == _outcome(interpreter.Interpreter, code)
+
+
+@pytest.mark.parametrize(
+	("parser"), (
+		pytest.param(LazyParser, id="lazy"),
+		pytest.param(lambda: Parser(internTable=InternTable(expressions=True)), id="interned"),
+	),
+)
+def testParsers(parser):
+	code = """
+		def square(n) { return n * n; }
+		def unused() { return ; }
+		let a = square(4) + square(4), b = square(a);
+	"""
+
+	assert _outcome(ClosureInterpreter, code, parser) == _outcome(interpreter.Interpreter, code, parser) == {"a": 32, "b": 1024}
+
+
+def testCompileOnce():
+	engine = ClosureInterpreter()
+	program = engine.compile(Parser().parse("def f(n) { return n + 1; } let x = f(1);"))
+
+	assert engine.run(program) == engine.run(program) == {"x": 2}
+
+
+def testInterpretStatements():
+	env = ClosureInterpreter().interpretStatements(Parser().iterStatements(io.StringIO(STREAM_CODE)))
+
+	assert env == {"x": 126, "y": 6}
+
+
+@pytest.mark.parametrize(
+	("flags", "expected"), (
+		pytest.param(["--engine", "closure"], "Env = {'x': 126, 'y': 6}\n", id="file"),
+		pytest.param(["--engine", "closure", "--stream"], "Env = {'x': 126, 'y': 6}\n", id="stream"),
+	),
+)
+def testCommandLine(tmp_path, capsys: pytest.CaptureFixture, flags: list[str], expected: str):
+	path = os.path.join(tmp_path, "script.nyr")
+	with open(path, "w") as f:
+		f.write(STREAM_CODE)
+
+	nyr.main(["-f", path, "--no-cache", *flags])
+
+	assert capsys.readouterr().out == expected
+
+
+def testCommandLineDebug(capsys: pytest.CaptureFixture):
+	with pytest.raises(SystemExit):
+		nyr.main(["--engine", "closure", "-d"])
+
+	assert "-d only works with --engine tree" in capsys.readouterr().err
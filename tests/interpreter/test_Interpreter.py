@@ -1,6 +1,20 @@
+import io
+
+import pytest
+
+import nyr
 from nyr.interpreter.interpreter import Interpreter
+from nyr.parser import node
+from nyr.parser.lazy import LazyParser
 from nyr.parser.parser import Parser
 
+STREAM_CODE = """def square(n) { return n * n; }
+let x = square(11) - 1;
+let y = 0;
+for (let i = 0; i < 4; i += 1) y += i;
+x = x + y;
+"""
+
 
 def testEmptyStatement():
 	ast = Parser().parse(";;")
@@ -18,3 +32,63 @@ def testInterpretMultiple():
 		env = interpreter.interpret(ast)
 
 		assert env == {"x": i}
+
+
+def testInterpretStatements():
+	env = Interpreter().interpretStatements(Parser().iterStatements(io.StringIO(STREAM_CODE)))
+
+	assert env == Interpreter().interpret(Parser().parse(STREAM_CODE)) == {"x": 126, "y": 6}
+
+
+@pytest.mark.treeWalker
+def testInterpretStatementsRunsWhileParsing():
+	interpreter = Interpreter()
+	executed = []
+
+	def lines():
+		for line in STREAM_CODE.splitlines(keepends=True):
+			executed.append(dict(interpreter.stack.peek().members) if interpreter.stack.peek() else None)
+			yield line
+
+	interpreter.interpretStatements(Parser().iterStatements(lines()))
+
+	# the first statements ran before the last line was read (the loop waits for the lookahead behind it)
+	assert executed[-1] == {"x": 120, "y": 0}
+
+
+@pytest.mark.parametrize(
+	("flags", "expected"), (
+		pytest.param([], "Env = {'x': 126, 'y': 6}\n", id="interpret"),
+		pytest.param(["-i", "-p"], '"type": "Program"', id="print"),
+	),
+)
+def testPipedStdin(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture, flags: list[str], expected: str):
+	monkeypatch.setattr("sys.stdin", io.StringIO(STREAM_CODE))
+
+	nyr.main(flags)
+
+	assert expected in capsys.readouterr().out
+
+
+@pytest.mark.treeWalker
+def testDispatchTable():
+	class Counter(Interpreter):
+		literals = 0
+
+		def visitLiteral(self, node: node.Literal):
+			Counter.literals += 1
+			return super().visitLiteral(node)
+
+	env = Counter().interpret(Parser().parse("let x = 1 + 2 * 3;"))
+
+	assert env == {"x": 7}
+	assert Counter.literals == 3
+	assert Interpreter._visitors[node.Literal.kind] is Interpreter.visitLiteral
+
+
+@pytest.mark.treeWalker
+def testDispatchUnknownNode():
+	body = LazyParser().parse("def f() { return 1; }").body[0].body
+
+	with pytest.raises(Exception, match="visitLazyBlockStatement not found"):
+		Interpreter().visit(body)
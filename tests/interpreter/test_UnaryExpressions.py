@@ -47,3 +47,21 @@ def testUnaryNotBool(boolValue: str):
 	env = Interpreter().interpret(ast)
 
 	assert env == {"x": boolValue != "true"}
+
+
+@pytest.mark.parametrize(
+	("code", "expected"), (
+		pytest.param('let x = !"";', True, id="not empty string"),
+		pytest.param('let s = "a", x = !s;', False, id="not string"),
+		pytest.param("let x = -2.5;", -2.5, id="negative float"),
+	),
+)
+def testUnaryValues(code: str, expected):
+	env = Interpreter().interpret(Parser().parse(code))
+
+	assert env["x"] == expected
+
+
+def testUnaryUnsupported():
+	with pytest.raises(TypeError, match='Cannot use - on str'):
+		Interpreter().interpret(Parser().parse('let x = -"a";'))
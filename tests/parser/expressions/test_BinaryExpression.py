@@ -1,5 +1,7 @@
 import json
 
+import pytest
+
 from nyr.parser import node
 from nyr.parser.parser import Parser
 
@@ -215,3 +217,27 @@ def testBinaryExpressionParenthesisPriority():
 	}
 
 	assert ast == expected
+
+
+def _parenthesize(expression: node.Node) -> str:
+	if isinstance(expression, node.ComplexExpression):
+		return f"({_parenthesize(expression.left)} {expression.operator} {_parenthesize(expression.right)})"
+	if isinstance(expression, node.UnaryExpression):
+		return f"{expression.operator}{_parenthesize(expression.argument)}"
+	return expression.name
+
+
+@pytest.mark.parametrize(
+	("code", "expected"), (
+		pytest.param("a || b && c | d ^ e & f == g < h + i * j;", "(a || (b && (c | (d ^ (e & (f == (g < (h + (i * j)))))))))", id="ascending"),
+		pytest.param("a * b + c < d == e & f ^ g | h && i || j;", "(((((((((a * b) + c) < d) == e) & f) ^ g) | h) && i) || j)", id="descending"),
+		pytest.param("a - b - c + d;", "(((a - b) - c) + d)", id="leftAssociative"),
+		pytest.param("a && b || c && d;", "((a && b) || (c && d))", id="logical"),
+		pytest.param("-a * !b == c - -d;", "((-a * !b) == (c - -d))", id="unary"),
+		pytest.param("a = b = c + d * e;", "(a = (b = (c + (d * e))))", id="assignment"),
+	),
+)
+def testBinaryExpressionPrecedence(code: str, expected: str):
+	ast = Parser().parse(code)
+
+	assert _parenthesize(ast.body[0].expression) == expected
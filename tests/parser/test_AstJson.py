@@ -0,0 +1,211 @@
+import io
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+import nyr
+from benchmarks.corpus import SHAPES
+from nyr.parser import astjson
+from nyr.parser import node
+from nyr.parser import serialize
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.lazy import LazyParser
+from nyr.parser.parser import Parser
+from tests.parser.test_Serialize import _dump
+from tests.parser.test_Serialize import CODE
+
+
+def _json(ast: node.Node, indent: Optional[int]) -> str:
+	return json.dumps(ast, cls=node.ComplexEncoder, indent=indent, separators=(",", ":") if indent is None else None)
+
+
+@pytest.mark.parametrize("indent", (2, 4, 0, None))
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(CODE, id="code"),
+		pytest.param("", id="empty"),
+		pytest.param('let s = "ä \\t 😀", f = 1.5 * 10;', id="escapes"),
+		*(pytest.param(generate(5_000), id=shape) for shape, generate in SHAPES.items()),
+	),
+)
+def testSameAsJson(code: str, indent: Optional[int]):
+	ast = Parser().parse(code)
+
+	assert astjson.dumps(ast, indent) == _json(ast, indent)
+
+
+def testWritesInPieces(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(astjson, "BUFFER_PIECES", 16)
+	ast = Parser().parse(SHAPES["mixed"](10_000))
+	writes = []
+
+	class File(io.StringIO):
+		def write(self, text: str) -> int:
+			writes.append(len(text))
+			return super().write(text)
+
+	out = File()
+	astjson.dump(ast, out)
+
+	assert out.getvalue() == _json(ast, 2)
+	assert len(writes) > 10 and max(writes) < len(out.getvalue()) / 10
+
+
+# indented, the text grows with the square of the depth
+@pytest.mark.parametrize(("indent", "depth"), ((2, 3_000), (None, 25_000)))
+def testDeepTree(indent: Optional[int], depth: int):
+	text = astjson.dumps(IterativeParser().parse("x = " + "-" * depth + "1;"), indent)
+
+	assert text.count('"UnaryExpression"') == depth
+	assert text.endswith("}")
+
+
+def testUnparsedBodies():
+	code = "def f(a) { return a * 2; } let x = f(1);"
+
+	assert astjson.dumps(LazyParser().parse(code)) == _json(Parser().parse(code), 2)
+
+
+@pytest.mark.parametrize(
+	("flags", "path", "load"), (
+		pytest.param(["-o"], "ast.json", lambda path: path.read_text(), id="default"),
+		pytest.param(["-o", "out/tree.json"], "out/tree.json", lambda path: path.read_text(), id="path"),
+		pytest.param(["-o", "--format", "compact"], "ast.json", lambda path: path.read_text(), id="compact"),
+		pytest.param(["-o", "--format", "binary"], "ast.bin", lambda path: serialize.loads(path.read_bytes()), id="binary"),
+		pytest.param(["-o", "--format", "binary", "--lazy"], "ast.bin", lambda path: serialize.loads(path.read_bytes()), id="binary lazy"),
+	),
+)
+def testCommandLine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, flags: list[str], path: str, load):
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / "out").mkdir()
+	(tmp_path / "script.nyr").write_text(CODE)
+
+	nyr.main(["-f", "script.nyr", "-i", "--no-cache", *flags])
+
+	ast = Parser().parse(CODE)
+	written = load(tmp_path / path)
+	if "binary" in flags:
+		assert _dump(written) == _dump(ast)
+	else:
+		assert written == _json(ast, None if "compact" in flags else 2) + "\n"
+
+
+def testPrintCompact(tmp_path: Path, capsys: pytest.CaptureFixture):
+	script = tmp_path / "script.nyr"
+	script.write_text(CODE)
+
+	nyr.main(["-f", str(script), "-i", "-p", "--format", "compact", "--no-cache"])
+
+	assert capsys.readouterr().out == _json(Parser().parse(CODE), None) + "\n"
+
+
+def _withoutCDecoder(monkeypatch: pytest.MonkeyPatch):
+	""" Makes `astjson.loads` decode everything as if it was too deep for `json` """
+	def loads(*args, **kwargs):
+		raise RecursionError
+
+	monkeypatch.setattr(astjson, "json", SimpleNamespace(loads=loads))
+
+
+def _withoutSpans(ast: node.Program) -> tuple[str, list[object]]:
+	text, _, fns = _dump(ast)
+	return text, fns
+
+
+@pytest.mark.parametrize("indent", (2, None))
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(CODE, id="code"),
+		pytest.param("", id="empty"),
+		pytest.param('let s = "ä \\t 😀", f = 1.5 * 10, n = null, t = true;', id="escapes"),
+		*(pytest.param(generate(5_000), id=shape) for shape, generate in SHAPES.items()),
+	),
+)
+def testLoadRoundTrip(monkeypatch: pytest.MonkeyPatch, code: str, indent: Optional[int]):
+	ast = Parser().parse(code)
+	text = astjson.dumps(ast, indent)
+
+	assert _withoutSpans(astjson.loads(text)) == _withoutSpans(ast)
+	assert _withoutSpans(astjson.loads(text.encode())) == _withoutSpans(ast)
+	_withoutCDecoder(monkeypatch)
+	assert _withoutSpans(astjson.loads(text)) == _withoutSpans(ast)
+
+
+def testLoadFunctionsLinked():
+	fns = {}
+	ast = astjson.load(io.StringIO(astjson.dumps(Parser().parse(CODE))), fns)
+
+	fib = ast.body[1]
+	calls = fib.body.body[1].argument
+	assert fns["fib"] == {"args": fib.params, "body": fib.body}
+	assert calls.left.fn is fns["fib"]
+	# forward references are not linked, as by parsing
+	assert calls.right.fn is None
+
+
+def testLoadAfterPreviousCode():
+	parser = Parser()
+	parser.parse("def f(a) { return a; }")
+
+	ast = astjson.loads(astjson.dumps(Parser().parse("let x = f(1);")), parser.fns)
+
+	assert ast.body[0].declarations[0].init.fn is parser.fns["f"]
+
+
+@pytest.mark.parametrize(("indent", "depth"), ((2, 3_000), (None, 25_000)))
+def testLoadDeepTree(indent: Optional[int], depth: int):
+	text = astjson.dumps(IterativeParser().parse("x = " + "-" * depth + "1;"), indent)
+
+	assert astjson.dumps(astjson.loads(text), indent) == text
+
+
+@pytest.mark.parametrize(
+	("text"), (
+		pytest.param("", id="empty"),
+		pytest.param("[]", id="list"),
+		pytest.param("{}", id="no type"),
+		pytest.param('{"type": "Nope"}', id="unknown type"),
+		pytest.param('{"type": "Identifier"}', id="missing field"),
+		pytest.param('{"type": "Identifier", "name": "x"}', id="not a program"),
+		pytest.param('{"type": "Program", "body": [1,]}', id="syntax"),
+		pytest.param('{"type": "Program", "body": []} {}', id="extra data"),
+		pytest.param(b"\xff", id="not utf-8"),
+	),
+)
+def testLoadInvalid(text: str):
+	with pytest.raises(ValueError, match="^Invalid AST JSON: "):
+		astjson.loads(text)
+
+
+@pytest.mark.parametrize(
+	("text"), (
+		pytest.param("", id="empty"),
+		pytest.param('{"type": "Program", "body": [1,]}', id="value"),
+		pytest.param('{"type": "Program" "body": []}', id="comma"),
+		pytest.param('{"type": "Program", body: []}', id="key"),
+		pytest.param('{"type" "Program"}', id="colon"),
+		pytest.param('{"type": "Program", "body": []}]', id="extra data"),
+		pytest.param('{"type": "Program", "body": [}', id="unclosed"),
+	),
+)
+def testDecodeDeepInvalid(monkeypatch: pytest.MonkeyPatch, text: str):
+	_withoutCDecoder(monkeypatch)
+
+	with pytest.raises(ValueError, match="^Invalid AST JSON: "):
+		astjson.loads(text)
+
+
+@pytest.mark.parametrize("flags", ([], ["--format", "compact"], ["--format", "binary"]), ids=("json", "compact", "binary"))
+def testRunWrittenAst(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture, flags: list[str]):
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / "script.nyr").write_text("def fib(n) { if (n < 2) { return n; } else { return fib(n - 1) + fib(n - 2); } } let x = fib(10);")
+	nyr.main(["-f", "script.nyr", "--no-cache", "-o", "out" + (".bin" if "binary" in flags else ".json"), *flags])
+	interpreted = capsys.readouterr().out
+
+	nyr.main(["-f", "out" + (".bin" if "binary" in flags else ".json")])
+
+	assert capsys.readouterr().out == interpreted
+	assert "'x': 55" in interpreted
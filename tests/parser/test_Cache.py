@@ -0,0 +1,127 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import nyr
+from nyr.parser import cache
+from nyr.parser import node
+from nyr.parser.parser import Parser
+
+CODE = "def f(a) { return a * 2; }\nlet x = f(21);\n"
+
+
+class _CountingParser(Parser):
+	def __init__(self):
+		super().__init__()
+		self.parses = 0
+
+	def parse(self, string):
+		self.parses += 1
+		return super().parse(string)
+
+
+def _json(ast: node.Program) -> str:
+	return json.dumps(ast, cls=node.ComplexEncoder)
+
+
+@pytest.fixture
+def script(tmp_path: Path) -> Path:
+	path = tmp_path / "script.nyr"
+	path.write_text(CODE)
+	return path
+
+
+def testMissThenHit(script: Path):
+	parser = _CountingParser()
+
+	first = cache.parse(CODE, script, parser=parser)
+	second = cache.parse(CODE, script, parser=parser)
+
+	assert parser.parses == 1
+	assert _json(second) == _json(first) == _json(Parser().parse(CODE))
+	assert second.body[1].declarations[0].init.fn["body"] is second.body[0].body
+	assert cache.entryPath(script) == script.parent / "__nyrcache__" / "script.nyr.nyrc"
+	assert cache.entryPath(script).is_file()
+
+
+def testSourceChanged(script: Path):
+	parser = _CountingParser()
+
+	cache.parse(CODE, script, parser=parser)
+	ast = cache.parse(CODE + "x;", script, parser=parser)
+
+	assert parser.parses == 2
+	assert _json(ast) == _json(Parser().parse(CODE + "x;"))
+
+
+def testVersionChanged(script: Path, monkeypatch: pytest.MonkeyPatch):
+	parser = _CountingParser()
+
+	cache.parse(CODE, script, parser=parser)
+	monkeypatch.setattr(cache, "GRAMMAR_VERSION", cache.GRAMMAR_VERSION + 1)
+	cache.parse(CODE, script, parser=parser)
+
+	assert parser.parses == 2
+
+
+@pytest.mark.parametrize(
+	("corrupt"), (
+		pytest.param(lambda data: b"", id="empty"),
+		pytest.param(lambda data: data[:len(data) // 2], id="truncated"),
+		pytest.param(lambda data: data[:-1] + bytes([data[-1] ^ 1]), id="payload"),
+		pytest.param(lambda data: b"XXXX" + data[4:], id="magic"),
+	),
+)
+def testCorruptEntry(script: Path, corrupt):
+	parser = _CountingParser()
+	cache.parse(CODE, script, parser=parser)
+
+	entry = cache.entryPath(script)
+	entry.write_bytes(corrupt(entry.read_bytes()))
+	ast = cache.parse(CODE, script, parser=parser)
+
+	assert parser.parses == 2
+	assert _json(ast) == _json(Parser().parse(CODE))
+	# the entry was rewritten
+	assert cache.load(entry, cache.cacheKey(CODE)) is not None
+
+
+def testCacheDirectory(script: Path, tmp_path: Path):
+	other = tmp_path / "other" / "script.nyr"
+	other.parent.mkdir()
+	other.write_text("let y;")
+
+	cache.parse(CODE, script, tmp_path / "cache")
+	cache.parse("let y;", other, tmp_path / "cache")
+
+	assert not (script.parent / "__nyrcache__").exists()
+	assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def testUnwritableDirectory(script: Path, tmp_path: Path):
+	blocker = tmp_path / "file"
+	blocker.write_text("")
+
+	ast = cache.parse(CODE, script, blocker / "cache")
+
+	assert _json(ast) == _json(Parser().parse(CODE))
+
+
+def testNoTemporaryFilesLeft(script: Path):
+	cache.parse(CODE, script)
+	cache.parse(CODE + ";", script)
+
+	assert [path.name for path in (script.parent / "__nyrcache__").iterdir()] == ["script.nyr.nyrc"]
+
+
+@pytest.mark.parametrize(
+	("flags", "cached"), (
+		pytest.param([], True, id="enabled"),
+		pytest.param(["--no-cache"], False, id="disabled"),
+	),
+)
+def testCommandLine(script: Path, flags: list[str], cached: bool):
+	nyr.main(["-f", str(script), "-i", *flags])
+
+	assert cache.entryPath(script).exists() == cached
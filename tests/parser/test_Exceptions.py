@@ -16,3 +16,10 @@ def testMissingSemicolon(code: str):
 	# FIXME: get a better exception message
 	with pytest.raises(Exception, match='Unexpected end of input, expected ";"'):
 		parser.parse(code)
+
+
+def testErrorPosition():
+	parser = Parser()
+
+	with pytest.raises(SyntaxError, match=r'expected "\)" \(2:10\)'):
+		parser.parse("let x = 1;\nlet y = (2;")
@@ -0,0 +1,122 @@
+import pickle
+
+import pytest
+
+from benchmarks.corpus import SHAPES
+from nyr.parser import node
+from nyr.parser.flat import FlatAst
+from nyr.parser.flat import FlatVisitor
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.lazy import LazyParser
+from nyr.parser.parser import Parser
+from tests.parser.test_Serialize import _dump
+from tests.parser.test_Serialize import CODE
+
+
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(CODE, id="code"),
+		pytest.param("", id="empty"),
+		*(pytest.param(generate(10_000), id=shape) for shape, generate in SHAPES.items()),
+	),
+)
+def testRoundTrip(code: str):
+	ast = Parser().parse(code)
+	flat = FlatAst.fromProgram(ast)
+
+	assert _dump(flat.toProgram()) == _dump(ast)
+	assert _dump(FlatAst.fromBytes(flat.toBytes()).toProgram()) == _dump(ast)
+	assert _dump(pickle.loads(pickle.dumps(flat)).toProgram()) == _dump(ast)
+
+
+def testPreOrder():
+	ast = Parser().parse("let a = f(1, b);")
+	flat = FlatAst.fromProgram(ast)
+
+	assert [flat.nodeType(i) for i in range(len(flat))] == [
+		"Program", "VariableStatement", "VariableDeclaration", "Identifier", "CallExpression", "Identifier", "IntegerLiteral", "Identifier",
+	]
+	assert (flat.starts[4], flat.ends[4]) == (8, 15)
+
+
+def testFields():
+	flat = FlatAst.fromProgram(Parser().parse("if (a) x = -1; f(2.5, true);"))
+	statement, call = flat.field(0, "body")
+
+	assert flat.nodeClass(statement) is node.IfStatement
+	assert flat.field(statement, "alternative") is None
+	assignment = flat.field(flat.field(statement, "consequent"), "expression")
+	assert (flat.nodeType(assignment), flat.field(assignment, "operator")) == ("AssignmentExpression", "=")
+	assert flat.field(flat.field(assignment, "left"), "name") == "x"
+	assert flat.field(flat.field(assignment, "right"), "operator") == "-"
+
+	arguments = flat.field(flat.field(call, "expression"), "arguments")
+	assert [flat.field(argument, "value") for argument in arguments] == [2.5, True]
+	assert list(flat.children(flat.field(call, "expression"))) == [flat.field(flat.field(call, "expression"), "callee"), *arguments]
+
+
+def testLazyBodies():
+	ast = FlatAst.fromProgram(LazyParser().parse(CODE)).toProgram()
+
+	assert _dump(ast) == _dump(Parser().parse(CODE))
+
+
+def testCallsLinked():
+	parser = Parser()
+	ast = parser.parse("def f(a) { return f(a); } f(1);")
+	fns: dict = {}
+
+	program = FlatAst.fromProgram(ast).toProgram(fns)
+
+	assert program.body[1].expression.fn is fns["f"]
+	assert fns["f"]["body"] is program.body[0].body
+
+
+def testDeepTree():
+	depth = 25_000
+	flat = FlatAst.fromProgram(IterativeParser().parse("x = " + "-" * depth + "1;"))
+
+	argument = flat.toProgram().body[0].expression.right
+	for _ in range(depth):
+		argument = argument.argument
+	assert argument.value == 1
+
+
+class _Evaluator(FlatVisitor):
+	""" Evaluates constant arithmetic """
+
+	def visitProgram(self, index: int) -> list:
+		return [self.visit(statement) for statement in self.ast.field(index, "body")]
+
+	def visitExpressionStatement(self, index: int):
+		return self.visit(self.ast.field(index, "expression"))
+
+	def visitComplexExpression(self, index: int):
+		left = self.visit(self.ast.field(index, "left"))
+		right = self.visit(self.ast.field(index, "right"))
+		return {"+": left + right, "*": left * right}[self.ast.field(index, "operator")]
+
+	def visitUnaryExpression(self, index: int):
+		return -self.visit(self.ast.field(index, "argument"))
+
+	def visitLiteral(self, index: int):
+		return self.ast.field(index, "value")
+
+
+def testVisitor():
+	flat = FlatAst.fromProgram(Parser().parse("1 + 2 * 3; -(4 + 1);"))
+
+	assert _Evaluator(flat).visit(0) == [7, -5]
+
+
+@pytest.mark.parametrize(
+	("data"), (
+		pytest.param(b"", id="empty"),
+		pytest.param(b"not an ast", id="garbage"),
+		pytest.param(FlatAst.fromProgram(Parser().parse(CODE)).toBytes()[:-8], id="truncated"),
+		pytest.param(pickle.dumps((0, b"")), id="otherData"),
+	),
+)
+def testInvalidData(data: bytes):
+	with pytest.raises(ValueError, match="Invalid flat AST"):
+		FlatAst.fromBytes(data)
@@ -0,0 +1,137 @@
+import json
+import random
+
+import pytest
+
+from nyr.parser import node
+from nyr.parser.incremental import IncrementalParser
+from nyr.parser.parser import Parser
+
+CODE = """def square(x) { return x * x; }
+let a = square(2);
+if (a) { a = 1; }
+def twice(x) { return square(x) * 2; }
+let b = twice(a);
+while (b < 10) b = twice(b);
+"""
+
+
+def _dump(ast: node.Program, fns: dict) -> tuple[str, list[tuple[str, int, int]], str, list[int]]:
+	spans = []
+	# which `fns` entries the calls are linked to, by their first appearance
+	entries: list[dict] = []
+	links = []
+	stack = [ast]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, node.Node):
+			spans.append((value.type, value.start, value.end))
+			if isinstance(value, node.CallExpression) and value.fn is not None:
+				index = next((i for i, entry in enumerate(entries) if entry is value.fn), len(entries))
+				entries[index:index + 1] = [value.fn]
+				links.append(index)
+			stack.extend(getattr(value, field) for field in reversed(value._fields))
+		elif isinstance(value, list):
+			stack.extend(reversed(value))
+	links.extend(next((i for i, entry in enumerate(entries) if entry is fn), -1) for fn in fns.values())
+
+	return json.dumps(ast, cls=node.ComplexEncoder), spans, json.dumps(fns, cls=node.ComplexEncoder), links
+
+
+def _assertSameAsParse(parser: IncrementalParser, ast: node.Program, source: str):
+	expectedParser = Parser()
+	assert _dump(ast, parser.fns) == _dump(expectedParser.parse(source), expectedParser.fns)
+
+
+@pytest.mark.parametrize(
+	("marker", "deletedLength", "insertedText"), (
+		pytest.param("x * x", 5, "x + x", id="functionBody"),
+		pytest.param("a = 1", 5, "a = 12345", id="lengthChange"),
+		pytest.param("let b", 0, "let c = square(3);\n", id="insertStatement"),
+		pytest.param("let b", 17, "", id="deleteStatement"),
+		pytest.param("def square", 10, "def cube", id="renameFunction"),
+		pytest.param("def twice", 0, "def square(y) { return y; }\n", id="redefineFunction"),
+		pytest.param("if (a) { a = 1; }", 17, "", id="deleteBeforeCalls"),
+		pytest.param("\nlet a", 0, " /* x */", id="comment"),
+		pytest.param("square(2)", 9, "square(2); a = square(3)", id="splitStatement"),
+		pytest.param("if (a) { a = 1; }\n", 18, "if (a) { a = 1; }\nelse a = 2;\n", id="else"),
+		pytest.param("if (a)", 0, "/* if (b) b; */", id="commentOut"),
+		pytest.param("def square", 0, "let z;\n", id="atStart"),
+		pytest.param("while (b", 28, "", id="atEnd"),
+	),
+)
+def testReparse(marker: str, deletedLength: int, insertedText: str):
+	offset = CODE.index(marker)
+	edited = CODE[:offset] + insertedText + CODE[offset + deletedLength:]
+
+	parser = IncrementalParser()
+	ast = parser.reparse(parser.parse(CODE), offset, deletedLength, insertedText)
+
+	_assertSameAsParse(parser, ast, edited)
+
+
+def testReusesUntouchedStatements():
+	parser = IncrementalParser()
+	previous = parser.parse(CODE)
+	statements = list(previous.body)
+
+	offset = CODE.index("x * x")
+	ast = parser.reparse(previous, offset, 5, "x + x + 1")
+
+	assert ast.body[0] is not statements[0]
+	assert all(new is old for new, old in zip(ast.body[1:], statements[1:]))
+	# the calls behind the edit see the new body
+	call = ast.body[1].declarations[0].init
+	assert call.fn is parser.fns["square"]
+	assert call.fn["body"] is ast.body[0].body
+	assert ast.body[5].start == CODE.index("while") + 4
+
+
+def testSyntaxError():
+	parser = IncrementalParser()
+	previous = parser.parse(CODE)
+	expected = _dump(previous, parser.fns)
+
+	with pytest.raises(SyntaxError):
+		parser.reparse(previous, CODE.index("x * x"), 5, "x *")
+
+	assert _dump(previous, parser.fns)[:2] == expected[:2]
+	with pytest.raises(ValueError, match="can be reparsed"):
+		parser.reparse(previous, 0, 0, " ")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def testRandomEdits(seed: int):
+	statements = (
+		"def f(a) { return a + 1; }\n", "def g(b) { return f(b) * 2; }\n", "let x = f(1);\n", "x = g(x);\n",
+		"if (x) { f(x); } else g(2);\n", "if (y) z;\n", "else w;\n", "/* c */\n", "while (x < 3) x += 1;\n",
+		"def f() { def f(q) {} f(); }\n", "class A : B { def m() { f(); } }\n", "h(1)(2);\n", ";\n",
+	)
+	fragments = ("f", "g", "(", ")", "{", "}", ";", "x", "1", "def ", "let ", " ", "\n", "/*", "*/", "\"", "else ", "=", "h(")
+	rng = random.Random(seed)
+
+	def randomProgram() -> tuple[str, node.Program]:
+		while True:
+			source = "".join(rng.choice(statements) for _ in range(10))
+			try:
+				return source, parser.parse(source)
+			except SyntaxError:
+				pass
+
+	parser = IncrementalParser()
+	source, ast = randomProgram()
+	for _ in range(300):
+		offset = rng.randint(0, len(source))
+		deletedLength = rng.randint(0, min(6, len(source) - offset))
+		insertedText = rng.choice(statements) if rng.random() < 0.3 else "".join(rng.choice(fragments) for _ in range(rng.randint(0, 3)))
+		source = source[:offset] + insertedText + source[offset + deletedLength:]
+
+		try:
+			ast = parser.reparse(ast, offset, deletedLength, insertedText)
+		except SyntaxError:
+			with pytest.raises(SyntaxError):
+				Parser().parse(source)
+			source, ast = randomProgram()
+			continue
+
+		_assertSameAsParse(parser, ast, source)
@@ -0,0 +1,86 @@
+import pytest
+
+from benchmarks.corpus import SHAPES
+from nyr.interpreter.interpreter import Interpreter
+from nyr.parser import astjson
+from nyr.parser.interning import InternTable
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.parser import Parser
+from tests.parser.test_Serialize import CODE
+
+
+@pytest.mark.parametrize("expressions", (False, True), ids=("leaves", "expressions"))
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(CODE, id="code"),
+		pytest.param("", id="empty"),
+		*(pytest.param(generate(5_000), id=shape) for shape, generate in SHAPES.items()),
+	),
+)
+def testSameTree(code: str, expressions: bool):
+	assert astjson.dumps(Parser(internTable=InternTable(expressions)).parse(code)) == astjson.dumps(Parser().parse(code))
+
+
+def testLeavesShared():
+	table = InternTable()
+	ast = Parser(internTable=table).parse("x = a + a; let y = 1, z = 1.0, w = true, v = 1;")
+	expression = ast.body[0].expression
+	declarations = ast.body[1].declarations
+
+	assert expression.right.left is expression.right.right
+	assert declarations[0].init is declarations[3].init
+	# 1, 1.0 and true are equal in Python, but different literals
+	assert len({id(declaration.init) for declaration in declarations}) == 3
+	assert expression.right.left in table and expression.right not in table
+	assert len(table) == 9
+
+
+def testExpressionsShared():
+	ast = Parser(internTable=InternTable(expressions=True)).parse("x = a.b * -c + 1; y = a.b * -c + 1; f(a.b); f(a.b); z = x = 1; z = x = 1;")
+	first, second, call, otherCall, assignment, otherAssignment = (statement.expression for statement in ast.body)
+
+	assert first.right is second.right
+	assert first is not second
+	assert call is not otherCall and call.arguments[0] is otherCall.arguments[0]
+	# assignments have effects, so are not shared, even if they are inside other expressions
+	assert assignment.right is not otherAssignment.right
+
+
+def testExpressionsOnlyWhenAsked():
+	ast = Parser(internTable=InternTable()).parse("x = a * b; y = a * b;")
+
+	assert ast.body[0].expression.right is not ast.body[1].expression.right
+	assert ast.body[0].expression.right.left is ast.body[1].expression.right.left
+
+
+def testSharedBetweenParses():
+	table = InternTable(expressions=True)
+	first = Parser(internTable=table).parse("let x = a + 1;")
+	second = IterativeParser(internTable=table).parse("let y = a + 1;")
+
+	assert first.body[0].declarations[0].init is second.body[0].declarations[0].init
+	# the first copy keeps its span
+	assert second.body[0].declarations[0].init.start == 8
+
+
+def testIterStatements():
+	statements = list(Parser(internTable=InternTable(expressions=True)).iterStatements("x = a * 2; y = a * 2;"))
+
+	assert statements[0].expression.right is statements[1].expression.right
+
+
+def testDeepTree():
+	depth = 25_000
+	ast = IterativeParser(internTable=InternTable(expressions=True)).parse("x = " + "-" * depth + "1; y = " + "-" * depth + "1;")
+
+	assert ast.body[0].expression.right is ast.body[1].expression.right
+
+
+def testInterpretedTheSame():
+	code = """
+		def fib(n) { if (n < 2) { return n; } else { return fib(n - 1) + fib(n - 2); } }
+		let a = fib(10), b = fib(10) * 2, c = "s" + "s";
+		a = a + 1;
+	"""
+
+	assert Interpreter().interpret(Parser(internTable=InternTable(expressions=True)).parse(code)) == Interpreter().interpret(Parser().parse(code))
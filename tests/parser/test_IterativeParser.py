@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import SHAPES
+from nyr.parser import node
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.parser import Parser
+
+CODE = """
+class Point : Base {
+	def constructor(x, y) {
+		this.x = x;
+		super(x)(y);
+	}
+}
+
+def fib(n) {
+	if (n <= 1) {
+		return n;
+	} else if (n == 2) return 1;
+	else {
+		return fib(n - 1) + fib(n - 2);
+	}
+}
+
+let a = 1, b, c = "s" + -a * !(b || a && c);
+for (let i = 0; i < 10; i += 1) a[i] = a.b[c].d;
+for (;;) ;
+while (a != null) do { a = b = c; } while (false);
+"""
+
+
+def _dump(parser: Parser, code: str) -> tuple[str, list[tuple[str, int, int]], str]:
+	ast = parser.parse(code)
+
+	spans = []
+	stack = [ast]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, node.Node):
+			spans.append((value.type, value.start, value.end))
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+
+	return json.dumps(ast, cls=node.ComplexEncoder), spans, json.dumps(parser.fns, cls=node.ComplexEncoder)
+
+
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(CODE, id="code"),
+		*(pytest.param(generate(10_000), id=shape) for shape, generate in SHAPES.items()),
+	),
+)
+def testSameAstAsParser(code: str):
+	assert _dump(IterativeParser(), code) == _dump(Parser(), code)
+
+
+def _depth(ast: node.Node) -> int:
+	depth = 0
+	stack = [(ast, 0)]
+	while stack:
+		value, level = stack.pop()
+		if isinstance(value, node.Node):
+			depth = max(depth, level)
+			stack.extend((getattr(value, field), level + 1) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend((child, level) for child in value)
+	return depth
+
+
+# far beyond the recursion limit, `python -m benchmarks.nesting` goes deeper
+DEPTH = 25_000
+
+
+@pytest.mark.parametrize(
+	("code", "minDepth"), (
+		pytest.param("x = " + "(" * DEPTH + "1" + ")" * DEPTH + ";", 0, id="parentheses"),
+		pytest.param("{" * DEPTH + "x;" + "}" * DEPTH, DEPTH, id="blocks"),
+		pytest.param("if (a) x; " + "else if (a) x; " * DEPTH, DEPTH, id="elseIf"),
+		pytest.param("x = " + "-" * DEPTH + "1;", DEPTH, id="unary"),
+		pytest.param("x = " + "a[" * DEPTH + "1" + "]" * DEPTH + ";", DEPTH, id="members"),
+	),
+)
+def testDeepNesting(code: str, minDepth: int):
+	with pytest.raises(RecursionError):
+		Parser().parse(code)
+
+	ast = IterativeParser().parse(code)
+
+	assert _depth(ast) >= minDepth
+
+
+@pytest.mark.parametrize(
+	("code", "message"), (
+		pytest.param("let x = ;", r'Unexpected token: ";", expected an expression \(1:8\)', id="token"),
+		pytest.param("let x = ", r"Unexpected end of input, expected an expression \(1:8\)", id="end"),
+		pytest.param("{ x;", r'Unexpected end of input, expected "}" \(1:4\)', id="block"),
+	),
+)
+def testSyntaxError(code: str, message: str):
+	for parser in (Parser(), IterativeParser()):
+		with pytest.raises(SyntaxError, match=message):
+			parser.parse(code)
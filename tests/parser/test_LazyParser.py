@@ -0,0 +1,140 @@
+import json
+import mmap
+import random
+import re
+
+import pytest
+
+from nyr.interpreter.interpreter import Interpreter
+from nyr.parser import node
+from nyr.parser.lazy import LazyBlockStatement
+from nyr.parser.lazy import LazyParser
+from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import Tokenizer
+
+CODE = """def square(x) { return x * x; }
+def twice(x) { if (x) { return square(x) * 2; } return later(x); }
+def later(y) { return y; }
+def outer(a) { def inner(b) { return square(b); } return inner(a); }
+def square(x) { return twice(x) + inner(x); }
+let a = twice(3), b = outer(2), c = square(4);
+class A : B { def m() { return twice(1); } }
+"""
+
+
+def _dump(ast: node.Program, fns: dict) -> tuple[str, list[tuple[str, int, int]], list[int]]:
+	spans = []
+	# which `fns` entries the calls are linked to, by their first appearance
+	entries: list[dict] = []
+	links = []
+	stack = [ast]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, LazyBlockStatement):
+			value = value.parse()
+		if isinstance(value, node.Node):
+			spans.append((value.type, value.start, value.end))
+			if isinstance(value, node.CallExpression) and value.fn is not None:
+				index = next((i for i, entry in enumerate(entries) if entry is value.fn), len(entries))
+				entries[index:index + 1] = [value.fn]
+				links.append(index)
+			stack.extend(getattr(value, field) for field in reversed(value._fields))
+		elif isinstance(value, list):
+			stack.extend(reversed(value))
+	links.extend(next((i for i, entry in enumerate(entries) if entry is fn), -1) for fn in fns.values())
+
+	return json.dumps(ast, cls=node.ComplexEncoder), spans, links
+
+
+def _assertSameAsParse(source: str):
+	parser = LazyParser()
+	ast = parser.parse(source)
+	expectedParser = Parser()
+	expected = expectedParser.parse(source)
+
+	assert _dump(ast, parser.fns) == _dump(expected, expectedParser.fns)
+
+
+def testSameAstAsParser():
+	_assertSameAsParse(CODE)
+
+
+def testBodiesAreParsedOnFirstCall():
+	parser = LazyParser()
+	ast = parser.parse("def f(a) { return a * 2; }\ndef unused() { return 1; }\nlet x = f(21);")
+
+	assert all(isinstance(statement.body, LazyBlockStatement) for statement in ast.body[:2])
+	assert ast.body[0].body.block is None
+	assert (ast.body[0].body.start, ast.body[0].body.end) == (9, 26)
+
+	env = Interpreter().interpret(ast)
+
+	assert env == {"x": 42}
+	assert isinstance(parser.fns["f"]["body"], node.BlockStatement)
+	assert parser.fns["f"]["body"] is ast.body[0].body.block
+	assert ast.body[1].body.block is None
+
+
+def testNestedDeclarationsAreParsedInPlace():
+	parser = LazyParser()
+	ast = parser.parse(CODE)
+
+	assert isinstance(ast.body[3].body, node.BlockStatement)
+	assert isinstance(ast.body[3].body.body[0].body, LazyBlockStatement)
+	assert list(parser.fns) == ["square", "twice", "later", "outer", "inner", "m"]
+
+
+def testSyntaxErrorOnFirstCall():
+	code = "def f() {\n\treturn 1 +;\n}\n"
+	with pytest.raises(SyntaxError) as expected:
+		Parser().parse(code)
+
+	assert Interpreter().interpret(LazyParser().parse(code + "let x = 1;")) == {"x": 1}
+	with pytest.raises(SyntaxError, match=re.escape(str(expected.value))):
+		Interpreter().interpret(LazyParser().parse(code + "f();"))
+
+
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param("def f() {", id="empty"),
+		pytest.param("def f() { if (x) { return 1; }", id="unbalanced"),
+	),
+)
+def testUnterminatedBody(code: str):
+	with pytest.raises(SyntaxError) as expected:
+		Parser().parse(code)
+
+	with pytest.raises(SyntaxError, match=re.escape(str(expected.value))):
+		LazyParser().parse(code)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def testRandomPrograms(seed: int):
+	statements = (
+		"def f(a) { return a + 1; }\n", "def g(b) { return f(b) * 2; }\n", "def h() { return g(1) + k(2); }\n",
+		"def k(c) { { c; } return f(c); }\n", "def f() { def g(q) { return f(); } g(); }\n", "let x = f(1);\n",
+		"x = g(x) + h();\n", "class A : B { def k() { f(); } }\n", "if (x) { g(x); }\n",
+	)
+	rng = random.Random(seed)
+
+	for _ in range(50):
+		_assertSameAsParse("".join(rng.choice(statements) for _ in range(10)))
+
+
+def testMmapInput(tmp_path):
+	path = tmp_path / "script.nyr"
+	path.write_text("def f(a) { return a * 2; }\nlet x = f(21);")
+
+	with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+		ast = LazyParser().parse(text)
+
+	# the body is parsed after the input has been closed
+	assert Interpreter().interpret(ast) == {"x": 42}
+
+
+def testOtherTokenIterables():
+	parser = LazyParser()
+	ast = parser.parseTokens(Tokenizer().tokenize(CODE))
+
+	assert not any(isinstance(statement.body, LazyBlockStatement) for statement in ast.body[:5])
+	assert list(parser.iterStatements(CODE))[0].body.type == "BlockStatement"
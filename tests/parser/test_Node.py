@@ -0,0 +1,31 @@
+import pytest
+
+from nyr.parser import node
+from nyr.parser.lazy import LazyBlockStatement
+from nyr.parser.parser import Parser
+
+
+@pytest.mark.parametrize("cls", (*node.nodeClasses, LazyBlockStatement), ids=lambda cls: cls.__name__)
+def testNoInstanceDict(cls: type[node.Node]):
+	assert cls.__dictoffset__ == 0
+	assert set(cls._fields) <= {slot for klass in cls.__mro__ for slot in getattr(klass, "__slots__", ())}
+
+
+@pytest.mark.parametrize("cls", [cls for cls in node.nodeClasses if cls not in (node.ComplexExpression, node.Literal)], ids=lambda cls: cls.__name__)
+def testClassTypeTag(cls: type[node.Node]):
+	assert cls.type == cls.__name__
+
+
+def testKinds():
+	assert [cls.kind for cls in node.nodeClasses] == list(range(len(node.nodeClasses)))
+	assert LazyBlockStatement.kind == node.Node.kind == -1
+	assert Parser().parse("x;").body[0].kind == node.ExpressionStatement.kind
+
+
+def testInstanceTypes():
+	ast = Parser().parse("x = a + b * 2; y = !true && null; let s = \"s\";")
+	expression = ast.body[0].expression
+
+	assert (expression.type, expression.right.type, expression.right.right.right.type) == ("AssignmentExpression", "BinaryExpression", "IntegerLiteral")
+	assert ast.body[1].expression.right.type == "LogicalExpression"
+	assert ast.toJSON()["type"] == "Program"
@@ -0,0 +1,108 @@
+import re
+
+import pytest
+
+from nyr.parser import parallel
+from nyr.parser.limits import ParserLimitError
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parallel import ParallelParser
+from nyr.parser.parser import Parser
+from tests.parser.test_IncrementalParser import _dump
+
+CODE = """// generated
+let a = g(1);
+def f(x) { return g(x) * 2; }
+def g(y) { return f(y); }
+let b = f(2) + g(3);
+def f(z) { def g(q) {} return g(z); }
+class A : B {
+	def m() { f(1); }
+}
+h(1)(2);
+def h() { return f(h()); }
+if (b) { h(); }
+"""
+
+
+@pytest.fixture(autouse=True)
+def parallelAlways(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(parallel, "MIN_PARALLEL_LENGTH", 0)
+	# split at every declaration at the start of a line
+	monkeypatch.setattr(parallel, "CHUNKS_PER_JOB", len(CODE))
+
+
+def _assertSameAsParse(source, limits: ParserLimits = None):
+	parser = ParallelParser(limits, jobs=2)
+	ast = parser.parse(source)
+	expectedParser = Parser()
+	expected = expectedParser.parse(source)
+
+	assert _dump(ast, parser.fns) == _dump(expected, expectedParser.fns)
+	assert (ast.start, ast.end) == (expected.start, expected.end)
+
+
+def testChunks():
+	chunks = ParallelParser(jobs=2)._chunks(CODE)
+
+	assert len(chunks) > 2
+	assert chunks[0][0] == 0 and chunks[-1][1] == len(CODE)
+	assert all(re.match(r"def|class", CODE[start:]) for start, _ in chunks[1:])
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param(CODE, id="str"),
+		pytest.param(CODE.encode(), id="bytes"),
+		pytest.param(bytearray(CODE.encode()), id="bytearray"),
+	),
+)
+def testSameAstAsParser(source):
+	_assertSameAsParse(source)
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param('let s = "\ndef f() {}\n";\n' + CODE, id="string"),
+		pytest.param("/* comment\ndef f() {}\n*/\n" + CODE, id="blockComment"),
+		pytest.param("if (a)\ndef f() {}\nelse\nclass C {}\n" + CODE, id="ifBody"),
+	),
+)
+def testNotAStatementBoundary(source: str):
+	_assertSameAsParse(source)
+
+
+def testSyntaxError():
+	source = CODE + "def broken() { let x = ; }\n" + CODE
+
+	with pytest.raises(SyntaxError) as expected:
+		Parser().parse(source)
+	with pytest.raises(SyntaxError, match=re.escape(str(expected.value))):
+		ParallelParser(jobs=2).parse(source)
+
+
+def testSmallInput(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(parallel, "MIN_PARALLEL_LENGTH", len(CODE) + 1)
+	monkeypatch.setattr(parallel, "ProcessPoolExecutor", None)
+
+	_assertSameAsParse(CODE)
+
+
+def testSourceBytesLimit():
+	_assertSameAsParse(CODE, ParserLimits(sourceBytes=len(CODE)))
+	with pytest.raises(ParserLimitError, match="sourceBytes"):
+		ParallelParser(ParserLimits(sourceBytes=len(CODE) - 1), jobs=2).parse(CODE)
+
+
+@pytest.mark.parametrize(
+	("within", "exceeded"), (
+		pytest.param(ParserLimits(nodes=1000), ParserLimits(nodes=5), id="nodes"),
+		pytest.param(ParserLimits(tokens=1000), ParserLimits(tokens=5), id="tokens"),
+		pytest.param(ParserLimits(depth=10), ParserLimits(depth=1), id="depth"),
+	),
+)
+def testLimitsParseInProcess(monkeypatch: pytest.MonkeyPatch, within: ParserLimits, exceeded: ParserLimits):
+	monkeypatch.setattr(parallel, "ProcessPoolExecutor", None)
+
+	_assertSameAsParse(CODE, within)
+	with pytest.raises(ParserLimitError):
+		ParallelParser(exceeded, jobs=2).parse(CODE)
@@ -1,7 +1,12 @@
 import json
 
+import pytest
+
+from nyr.parser.iterative import IterativeParser
 from nyr.parser.node import ComplexEncoder
 from nyr.parser.parser import Parser
+from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import Tokenizer
 
 
 def testParseEmpty():
@@ -52,3 +57,129 @@ def testParseMultiple():
 				},
 			],
 		}
+
+
+def testParseBuffer():
+	code = 'let s = "Grüße"; def f(x) { return x * 2; } s = f(1.5);'
+
+	expected = json.dumps(Parser().parse(code), cls=ComplexEncoder)
+	ast = json.dumps(Parser().parse(code.encode()), cls=ComplexEncoder)
+
+	assert ast == expected
+
+
+def testParseTokenBuffer():
+	code = 'let s = "Grüße"; def f(x) { return x * 2; } s = f(1.5);'
+
+	tokenizer = Tokenizer()
+	tokenizer.init(code.encode())
+
+	expected = json.dumps(Parser().parse(code), cls=ComplexEncoder)
+	ast = json.dumps(Parser().parseTokens(tokenizer.getTokenBuffer()), cls=ComplexEncoder)
+
+	assert ast == expected
+
+
+def testParseStreamsTokens():
+	pulled = []
+	tokenizer = Tokenizer()
+
+	def tokens():
+		for tk in tokenizer.tokenize("let x = 1; let y = 2;"):
+			pulled.append(tk)
+			yield tk
+
+	parser = Parser()
+	original = parser.VariableStatement
+
+	def VariableStatement():
+		# only the lookahead of the statement has been pulled so far
+		assert pulled[-1].type == "let"
+		return original()
+
+	parser.VariableStatement = VariableStatement
+	parser.parseTokens(tokens())
+
+	assert len(pulled) == 11
+
+
+def testParseReleasesInput():
+	parser = Parser()
+	parser.parse("def f() { return 1; } f();")
+
+	assert parser.string == ""
+	assert parser.lookahead is None
+	assert parser.tokens.next() == Token("EOF", None)
+	assert list(parser.fns) == ["f"]
+
+
+def testNodeSpans():
+	code = 'let x = 1 + foo(2) * -a.b[3];\nif (x) { x.y = "s"; }'
+	ast = Parser().parse(code)
+
+	declaration = ast.body[0].declarations[0]
+	addition = declaration.init
+	multiplication = addition.right
+	ifStatement = ast.body[1]
+
+	assert (ast.start, ast.end) == (0, len(code))
+	assert code[ast.body[0].start:ast.body[0].end] == "let x = 1 + foo(2) * -a.b[3];"
+	assert code[declaration.start:declaration.end] == "x = 1 + foo(2) * -a.b[3]"
+	assert code[addition.start:addition.end] == "1 + foo(2) * -a.b[3]"
+	assert code[multiplication.left.start:multiplication.left.end] == "foo(2)"
+	assert code[multiplication.right.start:multiplication.right.end] == "-a.b[3]"
+	assert code[multiplication.right.argument.object.start:multiplication.right.argument.object.end] == "a.b"
+	assert code[ifStatement.start:ifStatement.end] == 'if (x) { x.y = "s"; }'
+	assert code[ifStatement.consequent.start:ifStatement.consequent.end] == '{ x.y = "s"; }'
+
+
+STREAM_CODE = """def f(a) { return a * 2; }
+let x = f(21); /* c */
+if (x) {
+	x = g(x);
+}
+def g(b) { return b; }
+"""
+
+
+@pytest.mark.parametrize("parserClass", (Parser, IterativeParser))
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param(STREAM_CODE, id="string"),
+		pytest.param(STREAM_CODE.splitlines(keepends=True), id="lines"),
+		pytest.param(list(STREAM_CODE), id="characters"),
+	),
+)
+def testIterStatements(parserClass, source):
+	parser = parserClass()
+	statements = list(parser.iterStatements(source))
+	expected = Parser().parse(STREAM_CODE)
+
+	assert json.dumps(statements, cls=ComplexEncoder) == json.dumps(expected.body, cls=ComplexEncoder)
+	assert [(s.start, s.end) for s in statements] == [(s.start, s.end) for s in expected.body]
+	assert statements[1].declarations[0].init.fn["body"] is statements[0].body
+	# a call in front of the declaration is not linked, just as in `parse`
+	assert statements[2].consequent.body[0].expression.right.fn is None
+	assert list(parser.fns) == ["f", "g"]
+
+
+def testIterStatementsIsLazy():
+	read = []
+
+	def lines():
+		for line in STREAM_CODE.splitlines(keepends=True):
+			read.append(line)
+			yield line
+
+	statements = Parser().iterStatements(lines())
+	next(statements)
+
+	assert len(read) < len(STREAM_CODE.splitlines())
+
+
+def testIterStatementsSyntaxError():
+	statements = Parser().iterStatements(iter(("let x = 1;\n", "let y = ;\n")))
+
+	assert next(statements).type == "VariableStatement"
+	with pytest.raises(SyntaxError):
+		next(statements)
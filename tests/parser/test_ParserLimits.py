@@ -0,0 +1,151 @@
+import json
+
+import pytest
+
+from nyr import batch
+from nyr.parser import limits
+from nyr.parser import node
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.lazy import LazyParser
+from nyr.parser.limits import ParserLimitError
+from nyr.parser.limits import ParserLimits
+from nyr.parser.parallel import ParallelParser
+from nyr.parser.parser import Parser
+
+parsers = pytest.mark.parametrize("parserClass", (Parser, IterativeParser, LazyParser, ParallelParser))
+
+
+def _limitHit(parser: Parser, source) -> str:
+	with pytest.raises(ParserLimitError) as e:
+		parser.parse(source)
+	return e.value.limit
+
+
+@parsers
+@pytest.mark.parametrize(
+	("limit", "code"), (
+		# Identifier, ExpressionStatement, Program
+		pytest.param(ParserLimits(nodes=3), "x;", id="nodes"),
+		# Identifier, VariableDeclaration, VariableStatement, Program
+		pytest.param(ParserLimits(nodes=4), "let x;", id="nodesVariable"),
+		# the end of the input is not counted
+		pytest.param(ParserLimits(tokens=2), "x;", id="tokens"),
+		pytest.param(ParserLimits(depth=3), "f(a[(x)]);", id="depth"),
+		pytest.param(ParserLimits(sourceBytes=6), 'x="a";', id="sourceBytes"),
+	),
+)
+def testWithinLimits(parserClass: type[Parser], limit: ParserLimits, code: str):
+	ast = parserClass(limit).parse(code)
+
+	assert json.dumps(ast, cls=node.ComplexEncoder) == json.dumps(Parser().parse(code), cls=node.ComplexEncoder)
+
+
+@parsers
+@pytest.mark.parametrize(
+	("limit", "code", "name"), (
+		pytest.param(ParserLimits(nodes=2), "x;", "nodes", id="nodes"),
+		pytest.param(ParserLimits(nodes=3), "let x;", "nodes", id="nodesVariable"),
+		pytest.param(ParserLimits(tokens=1), "x;", "tokens", id="tokens"),
+		pytest.param(ParserLimits(depth=2), "f(a[(x)]);", "depth", id="depth"),
+		# 6 characters, but 7 bytes
+		pytest.param(ParserLimits(sourceBytes=6), 'x="ö";', "sourceBytes", id="sourceBytes"),
+		pytest.param(ParserLimits(sourceBytes=4), b'x="";', "sourceBytes", id="sourceBytesBuffer"),
+	),
+)
+def testExceeded(parserClass: type[Parser], limit: ParserLimits, code: str, name: str):
+	assert _limitHit(parserClass(limit), code) == name
+
+
+@parsers
+def testDeepNesting(parserClass: type[Parser]):
+	code = "x = " + "(" * 25_000 + "1" + ")" * 25_000 + ";"
+
+	assert _limitHit(parserClass(ParserLimits(depth=100)), code) == "depth"
+
+
+def testTime(monkeypatch: pytest.MonkeyPatch):
+	monkeypatch.setattr(limits, "TIME_CHECK_INTERVAL", 1)
+
+	assert _limitHit(Parser(ParserLimits(seconds=-1)), "x;") == "seconds"
+
+
+def testMessage():
+	with pytest.raises(ParserLimitError, match=r"^Parser limit exceeded: more than 2 nodes \(1:2\)$"):
+		Parser(ParserLimits(nodes=2)).parse("x;")
+
+
+def testLimitsApplyToEachParse():
+	parser = Parser(ParserLimits(nodes=3, tokens=2))
+
+	for _ in range(3):
+		parser.parse("x;")
+
+
+def testIterStatements():
+	parser = Parser(ParserLimits(sourceBytes=10))
+	statements = parser.iterStatements(iter(("x;\n", "y;\n", "ä;\n" * 10)))
+
+	# the statements in front of the limit are still yielded
+	assert next(statements).expression.name == "x"
+	with pytest.raises(ParserLimitError, match="sourceBytes"):
+		list(statements)
+
+
+def testLazyParser():
+	assert _limitHit(LazyParser(ParserLimits(sourceBytes=8)), "def f() { x; }") == "sourceBytes"
+	assert _limitHit(LazyParser(ParserLimits(nodes=2)), "def f() {}") == "nodes"
+
+
+LAZY_CODE = "def f0(x) { return x; }\n" * 10
+
+
+@pytest.mark.parametrize(
+	("limit"), (
+		pytest.param(ParserLimits(depth=1), id="depth"),
+		# 10 tokens per function
+		pytest.param(ParserLimits(tokens=100), id="tokens"),
+	),
+)
+def testLazyParserWithinLimits(limit: ParserLimits):
+	ast = LazyParser(limit).parse(LAZY_CODE)
+
+	assert json.dumps(ast, cls=node.ComplexEncoder) == json.dumps(Parser().parse(LAZY_CODE), cls=node.ComplexEncoder)
+
+
+def testLazyParserCountsBodies():
+	assert _limitHit(LazyParser(ParserLimits(tokens=99)), LAZY_CODE) == "tokens"
+
+
+def testLazyParserDeferredBodyLimited():
+	body = LazyParser(ParserLimits(nodes=6)).parse("def f() { x; y; z; }").body[0].body
+
+	with pytest.raises(ParserLimitError):
+		body.parse()
+
+
+# 9 nodes per function and the Program, 91 in all
+MANY_BODIES = "".join(f"def f{i}() {{ x; y; z; }}\n" for i in range(10))
+
+
+@pytest.mark.parametrize(("nodes"), (91, 90))
+def testLazyParserBodiesShareNodes(nodes: int):
+	ast = LazyParser(ParserLimits(nodes=nodes)).parse(MANY_BODIES)
+	for declaration in ast.body[:-1]:
+		declaration.body.parse()
+
+	if nodes < 91:
+		assert _limitHit(Parser(ParserLimits(nodes=nodes)), MANY_BODIES) == "nodes"
+		with pytest.raises(ParserLimitError):
+			ast.body[-1].body.parse()
+	else:
+		ast.body[-1].body.parse()
+
+
+def testBatchReportsLimits(tmp_path):
+	path = tmp_path / "a.nyr"
+	path.write_text("x = " + "(" * 100 + "1" + ")" * 100 + ";")
+
+	assert batch.parseFile(path, useCache=False).ok
+	result = batch.parseFile(path, useCache=False, limits=ParserLimits(depth=10))
+
+	assert result.error == "ParserLimitError: Parser limit exceeded: more than 10 depth (1:14)"
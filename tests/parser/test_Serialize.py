@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import SHAPES
+from nyr.parser import node
+from nyr.parser import serialize
+from nyr.parser.iterative import IterativeParser
+from nyr.parser.parser import linkFunctions
+from nyr.parser.parser import Parser
+
+CODE = """
+class Point : Base {
+	def constructor(x, y) {
+		this.x = x;
+		super(x)(y);
+	}
+}
+
+def fib(n) {
+	if (n <= 1) return n;
+	return fib(n - 1) + later(n - 2);
+}
+def later(n) { def later(m) {} return fib(n); }
+
+let a = 1, b = 1.0, c = true, d = null, e = "1";
+for (let i = 0; i < 10; i += 1) a[i] = a.b[c].d;
+for (;;) ;
+while (a != null) do { a = b = -c; } while (!false);
+"""
+
+
+def _dump(ast: node.Program) -> tuple[str, list[tuple[str, int, int]], list[object]]:
+	spans = []
+	fns = []
+	stack = [ast]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, node.Node):
+			spans.append((value.type, value.start, value.end, type(getattr(value, "value", None))))
+			if isinstance(value, node.CallExpression):
+				fns.append(json.dumps(value.fn, cls=node.ComplexEncoder))
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+
+	return json.dumps(ast, cls=node.ComplexEncoder), spans, fns
+
+
+@pytest.mark.parametrize(
+	("code"), (
+		pytest.param(CODE, id="code"),
+		pytest.param("", id="empty"),
+		*(pytest.param(generate(10_000), id=shape) for shape, generate in SHAPES.items()),
+	),
+)
+def testRoundTrip(code: str):
+	ast = Parser().parse(code)
+
+	assert _dump(serialize.loads(serialize.dumps(ast))) == _dump(ast)
+
+
+def testFunctionsLinked():
+	parser = Parser()
+	ast = serialize.loads(serialize.dumps(parser.parse(CODE)))
+
+	fnsByCall = {}
+	stack = [ast]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, node.CallExpression) and isinstance(value.callee, node.Identifier):
+			fnsByCall.setdefault(value.callee.name, []).append(value.fn)
+		if isinstance(value, node.Node):
+			stack.extend(getattr(value, field) for field in value._fields)
+		elif isinstance(value, list):
+			stack.extend(value)
+
+	# recursive calls share the entry of their function, forward references are not linked
+	assert fnsByCall["fib"][0] is fnsByCall["fib"][1]
+	assert fnsByCall["fib"][0]["body"] is ast.body[1].body
+	assert fnsByCall["later"] == [None]
+	assert json.dumps(linkFunctions(ast), cls=node.ComplexEncoder) == json.dumps(parser.fns, cls=node.ComplexEncoder)
+
+
+def testDeepTree():
+	depth = 25_000
+	ast = IterativeParser().parse("x = " + "-" * depth + "1;")
+
+	back = serialize.loads(serialize.dumps(ast))
+
+	argument = back.body[0].expression.right
+	for _ in range(depth):
+		argument = argument.argument
+	assert argument.value == 1
+
+
+@pytest.mark.parametrize(
+	("data"), (
+		pytest.param(b"", id="empty"),
+		pytest.param(b"not an ast", id="garbage"),
+		pytest.param(serialize.dumps(Parser().parse(CODE))[:-8], id="truncated"),
+		pytest.param(serialize.dumps(Parser().parse("1;")).replace(b"x", b"y"), id="corrupted"),
+	),
+)
+def testInvalidData(data: bytes):
+	with pytest.raises(ValueError, match="Invalid serialized AST"):
+		serialize.loads(data)
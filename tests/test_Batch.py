@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from nyr import batch
+from nyr.parser import cache
+from nyr.parser import node
+from nyr.parser.parser import Parser
+
+SOURCES = {
+	"a.nyr": "def f(a) { return a * 2; }\nlet x = f(21);\n",
+	"sub/b.nyr": "let y = \"s\";\nwhile (y) y = false;\n",
+	"sub/deeper/c.nyr": "class A : B { def m() {} }\n",
+	"broken.nyr": "let x = ;\n",
+	"sub/notes.txt": "not nyr",
+}
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> Path:
+	for name, source in SOURCES.items():
+		path = tmp_path / "src" / name
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_text(source)
+	return tmp_path / "src"
+
+
+def _json(ast: node.Program) -> str:
+	return json.dumps(ast, cls=node.ComplexEncoder)
+
+
+def testCollectFiles(files: Path):
+	collected = batch.collectFiles([files / "sub", files / "a.nyr"])
+
+	assert collected == [files / "sub/b.nyr", files / "sub/deeper/c.nyr", files / "a.nyr"]
+
+
+@pytest.mark.parametrize("jobs", (1, 2))
+def testParseFiles(files: Path, jobs: int):
+	paths = batch.collectFiles([files])
+	results = list(batch.parseFiles(paths, jobs, useCache=False, keepProgram=True))
+
+	assert [result.path for result in results] == [str(path) for path in paths]
+	assert [result.ok for result in results] == [True, False, True, True]
+	assert results[1].error.startswith("SyntaxError: ")
+	for path, result in zip(paths, results):
+		if result.ok:
+			assert result.size == path.stat().st_size
+			assert _json(result.program()) == _json(Parser().parse(path.read_text()))
+	assert results[0].program().body[1].declarations[0].init.fn is not None
+	assert not (files / cache.CACHE_DIRECTORY).exists()
+
+
+def testPrecompile(files: Path, tmp_path: Path):
+	paths = batch.collectFiles([files])
+
+	first = list(batch.parseFiles(paths, 2, cacheDirectory=tmp_path / "cache"))
+	second = list(batch.parseFiles(paths, 2, cacheDirectory=tmp_path / "cache", keepProgram=True))
+
+	assert not any(result.cached for result in first)
+	assert [result.cached for result in second] == [True, False, True, True]
+	assert first[0].payload is None
+	assert _json(second[0].program()) == _json(Parser().parse(SOURCES["a.nyr"]))
+	# the interpreter finds them in the cache as well
+	assert cache.load(cache.entryPath(paths[0], tmp_path / "cache"), cache.cacheKey(paths[0].read_bytes())) is not None
+
+
+def testMissingFile(tmp_path: Path):
+	result = batch.parseFile(tmp_path / "missing.nyr")
+
+	assert result.error.startswith("FileNotFoundError: ")
+	with pytest.raises(ValueError, match="No program"):
+		result.program()
+
+
+@pytest.mark.parametrize(
+	("names", "status"), (
+		pytest.param(["a.nyr", "sub"], 0, id="ok"),
+		pytest.param(["."], 1, id="errors"),
+	),
+)
+def testCommandLine(files: Path, capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch, names: list[str], status: int):
+	monkeypatch.chdir(files)
+
+	assert batch.main(["-j", "2", "--no-cache", *names]) == status
+
+	lines = capsys.readouterr().out.splitlines()
+	assert len(lines) == (4 if status == 0 else 5)
+	assert lines[0].startswith("ok     a.nyr (")
+	assert lines[-1].startswith(f"{len(lines) - 1} files, {status} with errors")
+
+
+def testCommandLineLimits(files: Path, capsys: pytest.CaptureFixture):
+	assert batch.main(["-q", "--no-cache", "--max-nodes", "10", str(files / "a.nyr"), str(files / "sub/deeper")]) == 1
+
+	lines = capsys.readouterr().out.splitlines()
+	assert lines[0].startswith(f"error  {files / 'a.nyr'}: ParserLimitError: Parser limit exceeded: more than 10 nodes")
+	assert lines[1].startswith("2 files, 1 with errors")
+
+
+def testCommandLineBadFiles(files: Path, capsys: pytest.CaptureFixture):
+	(files / "long.nyr").write_text("let x = " + "9" * 5000 + ";\n")
+	(files / "binary.nyr").write_bytes(b"let x = \xff;\n")
+
+	assert batch.main(["-q", "--no-cache", "-j", "1", str(files)]) == 1
+
+	lines = capsys.readouterr().out.splitlines()
+	assert lines[0].startswith(f"error  {files / 'binary.nyr'}: UnicodeDecodeError: ")
+	assert lines[1].startswith(f"error  {files / 'broken.nyr'}: SyntaxError: ")
+	assert lines[2].startswith(f"error  {files / 'long.nyr'}: ValueError: ")
+	assert lines[3].startswith("6 files, 3 with errors")
@@ -1,7 +1,16 @@
+import mmap
+import random
+import re
+
 import pytest
 
+from nyr.parser.tokenizer import LineIndex
+from nyr.parser.tokenizer import MAX_EXCERPT_LENGTH
 from nyr.parser.tokenizer import Token
+from nyr.parser.tokenizer import TokenBuffer
 from nyr.parser.tokenizer import Tokenizer
+from nyr.parser.tokenizer import TokenStream
+from nyr.parser.tokenizer import tokenTypes
 
 
 def testEmptyInput():
@@ -64,3 +73,369 @@ def testInput():
 
 def testTokenRepr():
 	assert repr(Token("EOF", None)) == "nyr.parser.tokenizer.Token('EOF')"
+
+
+@pytest.mark.parametrize(
+	("code", "expected"), (
+		pytest.param("let letx", (("let", "let"), ("IDENTIFIER", "letx")), id="keyword prefix"),
+		pytest.param("1let", (("INTEGER", "1"), ("IDENTIFIER", "let")), id="keyword after number"),
+		pytest.param("1.5if", (("FLOAT", "1.5"), ("IDENTIFIER", "if")), id="keyword after float"),
+		pytest.param("(if)", (("(", "("), ("if", "if"), (")", ")")), id="keyword between symbols"),
+	),
+)
+def testKeywords(code: str, expected: tuple[tuple[str, str], ...]):
+	t = Tokenizer()
+	t.init(code)
+	tks = t.getTokens()
+
+	assert tuple((tk.type, tk.value) for tk in tks[:-1]) == expected
+
+
+def testNewlineDoesNotSkipCharacter():
+	t = Tokenizer()
+	t.init("x;\ny;\n\nz;")
+	tks = t.getTokens()
+
+	assert [tk.value for tk in tks if tk.type == "IDENTIFIER"] == ["x", "y", "z"]
+
+
+def testManyCommentLines():
+	t = Tokenizer()
+	t.init("// comment\n" * 100_000 + "x")
+	tks = t.getTokens()
+
+	assert tks == (Token("IDENTIFIER", "x"), Token("EOF", None))
+
+
+def testSyntaxErrorPosition():
+	t = Tokenizer()
+	t.init("let x;\n  // comment\n  x = $;")
+
+	with pytest.raises(SyntaxError, match=r"\(3:6\):\n  \$;"):
+		t.getTokens()
+
+
+BUFFER_CODE = """
+	// comment
+	let s = "Grüße", größe = 4.5;
+	/* block
+		comment */
+	def f(a, b) { return a != b && !(a >= 1); }
+"""
+
+
+@pytest.mark.parametrize(
+	("toBuffer"), (
+		pytest.param(lambda s: s.encode(), id="bytes"),
+		pytest.param(lambda s: bytearray(s.encode()), id="bytearray"),
+		pytest.param(lambda s: memoryview(s.encode()), id="memoryview"),
+	),
+)
+def testBufferInput(toBuffer):
+	t = Tokenizer()
+	t.init(BUFFER_CODE)
+	expected = t.getTokens()
+
+	t.init(toBuffer(BUFFER_CODE))
+	tks = t.getTokens()
+
+	assert tks == expected
+	assert all(type(tk.value) is str for tk in tks[:-1])
+
+
+def testMmapInput(tmp_path):
+	path = tmp_path.joinpath("code.nyr")
+	path.write_text(BUFFER_CODE, encoding="utf-8")
+
+	t = Tokenizer()
+	t.init(BUFFER_CODE)
+	expected = t.getTokens()
+
+	with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+		t.init(buffer)
+		tks = t.getTokens()
+
+	assert tks == expected
+
+
+def testBufferSyntaxError():
+	t = Tokenizer()
+	t.init(b"let x;\n  x = $;")
+
+	with pytest.raises(SyntaxError, match=r"\(2:6\):\n  \$;"):
+		t.getTokens()
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param(BUFFER_CODE, id="str"),
+		pytest.param(BUFFER_CODE.encode(), id="bytes"),
+		pytest.param(bytearray(BUFFER_CODE.encode()), id="bytearray"),
+		pytest.param(memoryview(BUFFER_CODE.encode()), id="memoryview"),
+	),
+)
+def testTokenBuffer(source):
+	t = Tokenizer()
+	t.init(BUFFER_CODE)
+	expected = t.getTokens()
+
+	t.init(source)
+	buffer = t.getTokenBuffer()
+
+	assert isinstance(buffer, TokenBuffer)
+	assert len(buffer) == len(expected)
+	assert tuple(buffer) == expected
+	assert buffer[-1] == Token("EOF", None)
+	assert [tokenTypes[kind] for kind in buffer.kinds] == [tk.type for tk in expected]
+
+
+def testTokenBufferInternsIdentifiers():
+	t = Tokenizer()
+	t.init("".join(["some", "Name"]) + " = " + "".join(["some", "Name"]) + ";")
+	buffer = t.getTokenBuffer()
+
+	assert buffer[0].value is buffer[2].value
+
+
+def testTokenBufferSyntaxError():
+	t = Tokenizer()
+	t.init("let x;\n  x = $;")
+
+	with pytest.raises(SyntaxError, match=r"\(2:6\):\n  \$;"):
+		t.getTokenBuffer()
+
+
+def testTokenStream():
+	pulled = []
+
+	def tokens():
+		for i in range(5):
+			pulled.append(i)
+			yield Token("INTEGER", str(i))
+
+	stream = TokenStream(tokens())
+
+	assert pulled == []
+	assert stream.next() == Token("INTEGER", "0")
+	assert pulled == [0]
+	assert [stream.next().value for _ in range(4)] == ["1", "2", "3", "4"]
+	assert stream.next() == Token("EOF", None)
+	assert stream.next() == Token("EOF", None)
+
+
+def _fullTokenBuffer(source):
+	t = Tokenizer()
+	t.init(source)
+	return t.getTokenBuffer()
+
+
+def _assertSameTokens(buffer: TokenBuffer, expected: TokenBuffer):
+	assert buffer.source == expected.source
+	assert tuple(buffer) == tuple(expected)
+	assert [(buffer.start(i), buffer.end(i)) for i in range(len(buffer))] == list(zip(expected.starts, expected.ends))
+	assert list(buffer.kinds) == list(expected.kinds)
+	assert list(buffer.starts) == list(expected.starts)
+	assert list(buffer.ends) == list(expected.ends)
+	assert list(buffer.openers) == list(expected.openers)
+
+
+@pytest.mark.parametrize(
+	("source", "edit"), (
+		pytest.param("let x = 1;\nlet y = 2;", ("let y", 0, "let yy"), id="identifier"),
+		pytest.param("let x = 1;\nlet y = 2;", ("1;", 1, "0"), id="integer"),
+		pytest.param("let x = 1;\nlet y = 2;", ("1;", 1, ".5"), id="float"),
+		pytest.param("let x = 1;\nlet y = 2;", ("let y", 3, ""), id="joinIdentifiers"),
+		pytest.param("let x = 1;\nlet y = 2;", ("\nlet y", 0, "/*"), id="openBlockComment"),
+		pytest.param("let x = /* a */ 1;\nlet y = 2;", ("*/", 0, ""), id="closeBlockComment"),
+		pytest.param("let x = /* a */ 1;\nlet y = 2;", ("/* a */", 2, ""), id="removeBlockComment"),
+		pytest.param("let x = \"a\";\nlet y = 1; // \"", ("\";\n", 1, ""), id="openString"),
+		pytest.param("let x = \"a;\nlet y = 1; // \"", (";\n", 0, "\""), id="closeString"),
+		pytest.param("let x = 1; // x\nlet y = 2;", ("\nlet y", 0, " "), id="extendLineComment"),
+		pytest.param("let x = 1 / 2;\nlet y = 2;", ("/ 2", 1, "*"), id="unterminatedBlockComment"),
+		pytest.param("let x = 1 /* 2;\nlet y = 2;", ("/* 2", 0, "=="), id="dropUnterminatedBlockComment"),
+		pytest.param("let x = 1; ", ("let", 0, "x"), id="atStart"),
+		pytest.param("let x = 1;", ("1;", 2, "\nx++;"), id="atEnd"),
+	),
+)
+def testRetokenize(source: str, edit: tuple[str, int, str]):
+	marker, deletedLength, insertedText = edit
+	offset = source.index(marker)
+	edited = source[:offset] + insertedText + source[offset + deletedLength:]
+
+	t = Tokenizer()
+	t.init(source)
+	buffer = t.retokenize(t.getTokenBuffer(), offset, deletedLength, insertedText)
+
+	_assertSameTokens(buffer, _fullTokenBuffer(edited))
+
+
+def testRetokenizeSyntaxError():
+	t = Tokenizer()
+	t.init("let x = 1;")
+
+	with pytest.raises(SyntaxError, match=r"\(1:8\):\n  \$1;"):
+		t.retokenize(t.getTokenBuffer(), 8, 0, "$")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def testRetokenizeRandomEdits(seed: int):
+	atoms = ("let", "x", "1", "2.5", " ", "\n", "// c\n", "/* a\n b */", "/*", "*/", "\"s\"", "\"", "=", "==", "/", "*", "(", ")", "{", "}", ";", "é")
+	rng = random.Random(seed)
+
+	t = Tokenizer()
+	t.init("")
+	buffer = t.getTokenBuffer()
+	for _ in range(500):
+		source = buffer.source
+		offset = rng.randint(0, len(source))
+		deletedLength = rng.randint(0, min(3, len(source) - offset))
+		insertedText = "".join(rng.choice(atoms) for _ in range(rng.randint(0, 2)))
+		edited = source[:offset] + insertedText + source[offset + deletedLength:]
+
+		try:
+			expected = _fullTokenBuffer(edited)
+		except SyntaxError:
+			continue
+
+		previous = [(token.type, token.value, token.start, token.end) for token in buffer]
+		buffer = t.retokenize(buffer, offset, deletedLength, insertedText)
+		_assertSameTokens(buffer, expected)
+
+		delta = len(insertedText) - deletedLength
+		tokens = [(token.type, token.value, token.start, token.end) for token in buffer]
+		head = buffer.unchangedHead
+		tail = len(tokens) - buffer.unchangedTail
+		assert head <= tail
+		assert tokens[:head] == previous[:head]
+		assert tokens[tail:] == [(kind, value, start + delta, end + delta) for kind, value, start, end in previous[len(previous) - buffer.unchangedTail:]]
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param("let x = /* a\n b */\n  \"s\";", id="str"),
+		pytest.param("let x = /* a\n b */\n  \"s\";".encode(), id="bytes"),
+	),
+)
+def testTokenSpans(source):
+	t = Tokenizer()
+	t.init(source)
+	tokens = t.getTokens()
+
+	t.init(source)
+	assert tuple(t.getTokenBuffer()) == tokens
+
+	assert [(tk.start, tk.end) for tk in tokens] == [(0, 3), (4, 5), (6, 7), (21, 24), (24, 25), (25, 25)]
+	assert [source[tk.start:tk.end] for tk in tokens[:-1]] == [tk.value if isinstance(source, str) else tk.value.encode() for tk in tokens[:-1]]
+	assert [t.lines.lineCol(tk.start) for tk in tokens] == [(1, 0), (1, 4), (1, 6), (3, 2), (3, 5), (3, 6)]
+
+
+def testTokenEqualityIgnoresSpan():
+	assert Token("IDENTIFIER", "x", 0, 1) == Token("IDENTIFIER", "x", 5, 6)
+	assert hash(Token("IDENTIFIER", "x", 0, 1)) == hash(Token("IDENTIFIER", "x"))
+	assert Token("IDENTIFIER", "x") != Token("IDENTIFIER", "y")
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param("ab\n\ncd\n", id="str"),
+		pytest.param(b"ab\n\ncd\n", id="bytes"),
+	),
+)
+def testLineIndex(source):
+	lines = LineIndex(source)
+
+	assert [lines.lineCol(offset) for offset in range(len(source) + 1)] == [
+		(1, 0), (1, 1), (1, 2),
+		(2, 0),
+		(3, 0), (3, 1), (3, 2),
+		(4, 0),
+	]
+	assert lines.position(5) == "3:1"
+	assert list(lines.lineStarts) == [0, 3, 4, 7]
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param("a /* b /* c", id="str"),
+		pytest.param(b"a /* b /* c", id="bytes"),
+	),
+)
+def testUnterminatedBlockComments(source):
+	expected = ("IDENTIFIER", "MULTIPLICATIVE_OPERATOR", "MULTIPLICATIVE_OPERATOR", "IDENTIFIER", "MULTIPLICATIVE_OPERATOR", "MULTIPLICATIVE_OPERATOR", "IDENTIFIER", "EOF")
+
+	t = Tokenizer()
+	t.init(source)
+	assert tuple(tk.type for tk in t.getTokens()) == expected
+
+	t.init(source)
+	buffer = t.getTokenBuffer()
+	assert tuple(tk.type for tk in buffer) == expected
+	assert list(buffer.openers) == [2, 7]
+
+
+@pytest.mark.parametrize(
+	("source"), (
+		pytest.param('let x = "' + "x" * 10_000, id="str"),
+		pytest.param(b'let x = "' + b"x" * 10_000, id="bytes"),
+	),
+)
+def testSyntaxErrorExcerptIsCapped(source):
+	t = Tokenizer()
+	t.init(source)
+
+	with pytest.raises(SyntaxError) as error:
+		t.getTokens()
+
+	assert str(error.value) == f'Could not parse input correctly. starting here (1:8):\n  "{"x" * (MAX_EXCERPT_LENGTH - 1)}...'
+
+
+def _chunks(source: str, rng: random.Random):
+	offset = 0
+	while offset < len(source):
+		size = rng.randint(1, 8)
+		yield source[offset:offset + size]
+		offset += size
+
+
+@pytest.mark.parametrize("seed", range(3))
+def testTokenizeChunks(seed: int):
+	rng = random.Random(seed)
+	fragments = (
+		"let ", "x", "1.5", " ", "\n", "// c\n", "/* b\n */", "\"s t\"", "==", "=", "!", "(", ")", "{", "}", ";",
+		"def ", "else", "a.b", "+=", "&&", "<=",
+	)
+
+	for _ in range(200):
+		source = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 30)))
+		t = Tokenizer()
+		try:
+			expected = [(tk, tk.start, tk.end) for tk in t.tokenize(source)]
+		except SyntaxError as e:
+			with pytest.raises(SyntaxError, match=re.escape(str(e))):
+				list(t.tokenizeChunks(_chunks(source, rng)))
+			continue
+
+		assert [(tk, tk.start, tk.end) for tk in t.tokenizeChunks(_chunks(source, rng))] == expected
+		assert t.lines.position(len(source)) == LineIndex(source).position(len(source))
+
+
+def testTokenizeChunksReadsLazily():
+	read = []
+
+	def chunks():
+		for line in ("let x = 1;\n", "let y = 2;\n", "let z = 3;\n"):
+			read.append(line)
+			yield line
+
+	tokens = Tokenizer().tokenizeChunks(chunks())
+	for _ in range(5):
+		next(tokens)
+
+	assert len(read) < 3
+
+
+def testTokenizeChunksSyntaxErrorPosition():
+	chunks = iter(("let x;\n", "  // comment\n", "  x = $;"))
+
+	with pytest.raises(SyntaxError, match=r"\(3:6\):\n  \$;"):
+		list(Tokenizer().tokenizeChunks(chunks))